@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Fake RealWorld telnet host for load and soak runs.
+
+Speaks just enough of the SCO RealWorld screens for reset_order() to run
+end to end: telnet login, company-ID / employee prompts, the main menu,
+3/2 View Order with the F3 totals screen, and the 8/22 reset. Screens are
+answered after a configurable delay, and a share of orders can be made
+"not on file" or fail to reset.
+
+Usage:
+    python3 bench/fake_realworld.py [--port 2323] [--latency-ms 150] [--not-on-file-rate 0.05]
+
+Point the worker at it with RW_HOST=127.0.0.1 RW_PORT=2323.
+"""
+
+import argparse
+import random
+import socketserver
+import threading
+import time
+import zlib
+
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+ECHO, SGA = 1, 3
+
+CLEAR = '\x1b[H\x1b[2J'
+ENTER = 'ENTER'
+BACK = 'BACK'
+F3 = 'F3'
+
+
+class HostConfig:
+    """Behaviour of the fake host, shared by every connection"""
+
+    def __init__(self, latency_ms=150, jitter_ms=100, login_ms=1500, not_on_file_rate=0.05, fail_rate=0.0,
+                 seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.login_ms = login_ms
+        self.not_on_file_rate = not_on_file_rate
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ship_totals = {}  # (dc, order) -> ship total still on the order
+        self.stats = {'connections': 0, 'logins': 0, 'lookups': 0, 'resets': 0}
+
+    def delay(self, base_ms=None):
+        base_ms = self.latency_ms if base_ms is None else base_ms
+        with self.lock:
+            jitter = self.random.uniform(0, self.jitter_ms)
+        time.sleep((base_ms + jitter) / 1000.0)
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def order(self, dc, order_number):
+        """Ship total of an order, or None if it is not on file (stable per order)"""
+        key = (dc, order_number)
+        with self.lock:
+            if key not in self.ship_totals:
+                digest = zlib.crc32(f'{dc}:{order_number}'.encode())
+                if (digest % 10000) / 10000.0 < self.not_on_file_rate:
+                    self.ship_totals[key] = None
+                else:
+                    self.ship_totals[key] = f'{(digest % 90000) / 100.0 + 10:.2f}'
+            return self.ship_totals[key]
+
+    def reset(self, dc, order_number):
+        """Apply a reset; True if it went through"""
+        with self.lock:
+            if self.random.random() < self.fail_rate:
+                return False
+            self.ship_totals[(dc, order_number)] = '0.00'
+            return True
+
+
+class RealWorldHandler(socketserver.BaseRequestHandler):
+    """One telnet connection running the screen state machine"""
+
+    def setup(self):
+        self.config = self.server.config
+        self.state = 'login'
+        self.fields = []
+        self.dc = None
+        self.order_number = None
+        self.pending = b''
+
+    def write(self, text, delay=True):
+        if delay:
+            self.config.delay()
+        self.request.sendall(text.replace('\n', '\r\n').encode('utf-8'))
+
+    def keys(self, data):
+        """Split client input into ENTER, BACK, F3 and text tokens (telnet commands dropped)"""
+        data = self.pending + data
+        self.pending = b''
+        text = bytearray()
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte == IAC:
+                if i + 1 >= len(data):
+                    self.pending = data[i:]
+                    break
+                command = data[i + 1]
+                if command in (DO, DONT, WILL, WONT):
+                    i += 3
+                elif command == SB:
+                    end = data.find(bytes([IAC, SE]), i)
+                    i = len(data) if end < 0 else end + 2
+                else:
+                    i += 2
+                continue
+            text.append(byte)
+            i += 1
+
+        tokens = []
+        buffer = ''
+        chars = text.decode('utf-8', errors='ignore')
+        i = 0
+        while i < len(chars):
+            char = chars[i]
+            if chars.startswith('\x1b[13~', i):
+                tokens.append(F3)
+                i += 5
+                continue
+            if char == '\x1b':
+                tokens.append(BACK)
+            elif char in '\r\n':
+                tokens.append((ENTER, buffer.strip()))
+                buffer = ''
+                # CR LF and CR NUL are one Enter
+                if char == '\r' and i + 1 < len(chars) and chars[i + 1] in '\n\0':
+                    i += 1
+            elif char in '\t\0':
+                pass
+            else:
+                buffer += char
+            i += 1
+        if buffer:
+            tokens.append(('TEXT', buffer))
+        return tokens
+
+    def handle(self):
+        self.config.count('connections')
+        # Character mode: the server echoes and suppresses go-ahead
+        self.request.sendall(bytes([IAC, WILL, ECHO, IAC, WILL, SGA]))
+        self.write('\nSCO OpenServer (fake RealWorld)\n\nlogin: ', delay=False)
+
+        while True:
+            try:
+                data = self.request.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            for token in self.keys(data):
+                if self.step(token) is False:
+                    return
+
+    def main_menu(self):
+        self.state = 'main'
+        self.write(f'{CLEAR}RealWorld Accounting - Company {self.dc}\n\n'
+                   ' 3. Order entry\n 8. Order processing\n\nEnter your selection: ')
+
+    def top_menu(self):
+        self.state = 'top'
+        self.write(f'{CLEAR}RealWorld\n\n 1. Accounting\n\nEnter your selection: ')
+
+    def step(self, token):
+        """Advance the screen state machine by one key token"""
+        kind, value = token if isinstance(token, tuple) else (token, None)
+        if kind == 'TEXT':
+            self.fields.append(value)  # Partial field, completed by the next Enter
+            return True
+        if kind == ENTER and self.fields:
+            value = ''.join(self.fields) + value
+            self.fields = []
+
+        state = self.state
+
+        if state == 'login' and kind == ENTER:
+            self.state = 'password'
+            self.write('Password: ', delay=False)
+        elif state == 'password' and kind == ENTER:
+            self.config.count('logins')
+            self.config.delay(self.config.login_ms)
+            self.top_menu()
+
+        elif state == 'top':
+            if kind == ENTER and value == '1':
+                self.state = 'company'
+                self.write(f'{CLEAR}Enter company-ID: ')
+            elif kind == BACK:
+                self.write('\nlogout\n', delay=False)
+                return False
+        elif state == 'company' and kind == ENTER:
+            self.dc = value
+            self.state = 'right_company'
+            self.write(f'\n{value} Distribution Center\nRight company? ')
+        elif state == 'right_company' and kind == ENTER:
+            self.state = 'press_enter'
+            self.write('\nPress ENTER to continue')
+        elif state == 'press_enter' and kind == ENTER:
+            self.state = 'employee'
+            self.write(f'{CLEAR}Enter employee #: ')
+        elif state == 'employee' and kind == ENTER:
+            self.state = 'any_change'
+            self.write('\nAny change? ')
+        elif state == 'any_change' and kind == ENTER:
+            self.state = 'employee_password'
+            self.write('\nPlease enter password: ')
+        elif state == 'employee_password' and kind == ENTER:
+            self.main_menu()
+
+        elif state == 'main':
+            if kind == BACK:
+                self.top_menu()
+            elif kind == ENTER and value == '3':
+                self.state = 'order_entry'
+                self.write(f'{CLEAR}Order Entry\n\n 2. View order\n\nEnter your selection: ')
+            elif kind == ENTER and value == '8':
+                self.state = 'reset_menu'
+                self.write(f'{CLEAR}Order Processing\n\n22. Reset order\n\nEnter your selection: ')
+
+        elif state == 'order_entry':
+            if kind == BACK:
+                self.main_menu()
+            elif kind == ENTER and value == '2':
+                self.state = 'view_order'
+                self.write(f'{CLEAR}View Order\n\nWarehouse: \nType: \nOrder #: ')
+        elif state == 'view_order':
+            if kind == BACK:
+                self.state = 'order_entry'
+                self.write(f'{CLEAR}Order Entry\n\n 2. View order\n\nEnter your selection: ')
+            elif kind == ENTER and value:
+                self.order_number = value
+                self.config.count('lookups')
+                if self.config.order(self.dc, value) is None:
+                    self.state = 'not_on_file'
+                    self.write('\nOrder not on file')
+                else:
+                    self.state = 'order'
+                    self.write(f'{CLEAR}View Order {value}\n\nCustomer: FAKE CUSTOMER\nStatus: Open\n')
+        elif state == 'not_on_file' and kind == ENTER:
+            self.state = 'view_order'
+            self.write('\nOrder #: ')
+        elif state == 'order':
+            if kind == F3:
+                self.state = 'totals'
+                ship_total = self.config.order(self.dc, self.order_number)
+                self.write(f'{CLEAR}Order totals {self.order_number}\n\nMerchandise  {ship_total}\n'
+                           f'Ship total   {ship_total}\n')
+            elif kind == BACK:
+                self.state = 'view_order'
+                self.write(f'{CLEAR}View Order\n\nOrder #: ')
+        elif state == 'totals' and kind == ENTER:
+            # TAB TAB ENTER TAB TAB leaves View Order for the main menu
+            self.main_menu()
+
+        elif state == 'reset_menu':
+            if kind == BACK:
+                self.main_menu()
+            elif kind == ENTER and value == '22':
+                self.state = 'reset'
+                self.reset_fields = []
+                self.write(f'{CLEAR}Reset Order\n\nWarehouse: ')
+        elif state == 'reset':
+            if kind == BACK:
+                self.state = 'reset_menu'
+                self.write(f'{CLEAR}Order Processing\n\n22. Reset order\n\nEnter your selection: ')
+            elif kind == ENTER and value:
+                self.reset_fields.append(value)
+                # order number, Y, ship total, Y
+                if len(self.reset_fields) == 1:
+                    self.write(f'\nOrder {value}\nReset this order? ')
+                elif len(self.reset_fields) == 2:
+                    self.write('\nShip total: ')
+                elif len(self.reset_fields) == 3:
+                    self.write('\nAre you sure? ')
+                else:
+                    order_number, _, ship_total, _ = self.reset_fields[:4]
+                    self.config.count('resets')
+                    expected = self.config.order(self.dc, order_number)
+                    if expected == ship_total and self.config.reset(self.dc, order_number):
+                        self.state = 'complete'
+                        self.write('\nProcedure complete\n')
+                    else:
+                        self.state = 'complete'
+                        self.write('\nShip total does not match, order not reset\n')
+        elif state == 'complete' and kind == ENTER:
+            self.state = 'reset'
+            self.reset_fields = []
+            self.write(f'{CLEAR}Reset Order\n\nWarehouse: ')
+        elif state == 'complete' and kind == BACK:
+            self.state = 'reset'
+            self.step(BACK)
+
+        return True
+
+
+class FakeRealWorld(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, config):
+        self.config = config
+        super().__init__(address, RealWorldHandler)
+
+def start(port=2323, config=None):
+    """Start a fake host in a background thread and return it"""
+    server = FakeRealWorld(('127.0.0.1', port), config or HostConfig())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=2323)
+    parser.add_argument('--latency-ms', type=float, default=150, help='Base delay before each screen')
+    parser.add_argument('--jitter-ms', type=float, default=100, help='Random extra delay per screen')
+    parser.add_argument('--login-ms', type=float, default=1500, help='Delay after the telnet password')
+    parser.add_argument('--not-on-file-rate', type=float, default=0.05)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of resets that do not complete')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config = HostConfig(args.latency_ms, args.jitter_ms, args.login_ms, args.not_on_file_rate, args.fail_rate,
+                        args.seed)
+    server = FakeRealWorld(('127.0.0.1', args.port), config)
+    print(f"Fake RealWorld listening on 127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(config.stats)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for rw_automate.py cold start.
+
+Runs each target in a fresh interpreter several times, reports the median
+wall time and the slowest modules from `python -X importtime`, and compares
+against a stored baseline.
+
+Usage:
+    python3 bench/import_time.py [--runs 10] [--baseline bench/import_baseline.json] [--save]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a cold job start pays: the entry point itself, and the modules a reset imports
+TARGETS = {
+    'rw_automate': 'import rw_automate',
+    'reset_order': 'import lib.processes.reset_order',
+    'reset_order_job': 'import lib.jobs, lib.processes.reset_order, pexpect, pyodbc',
+}
+
+def time_target(code, runs):
+    """Median wall time in ms of running `code` in a fresh interpreter"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def slowest_imports(code, limit=8):
+    """Top modules by cumulative import time (microseconds) from -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        modules.append((int(fields[1]), fields[2].strip()))
+    modules.sort(reverse=True)
+    return modules[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--baseline', default=os.path.join(APP_DIR, 'bench', 'import_baseline.json'))
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown vs baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name, code in TARGETS.items():
+        try:
+            results[name] = round(time_target(code, args.runs), 1)
+        except subprocess.CalledProcessError:
+            print(f"{name:<18} import failed (missing dependency?)")
+            continue
+
+        line = f"{name:<18} {results[name]:>8.1f} ms"
+        if name in baseline:
+            change = (results[name] - baseline[name]) / baseline[name]
+            line += f"   baseline {baseline[name]:>8.1f} ms  ({change:+.0%})"
+            if change > args.tolerance:
+                regressions.append(name)
+        print(line)
+
+        for cumulative_us, module in slowest_imports(code):
+            print(f"    {cumulative_us / 1000:>8.1f} ms  {module}")
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        print(f"Import time regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
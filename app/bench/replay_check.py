@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of session recording and replay with a real reset.
+
+Runs reset_order() against the fake host (bench/fake_realworld.py) with
+session recording on, then runs the same reset against bench/replay_realworld.py
+serving that recording. The check passes when both resets succeed and the
+replay completes without a divergence, so the replay keeps in step with
+everything reset_order() sends (several Enters in one write included), not
+only with hand-made recordings.
+
+Uses the configured credentials and job store; for a local run:
+    RW_DB_BACKEND=sqlite RW_SQLITE_PATH=/tmp/replay_check.db python3 bench/replay_check.py
+
+Usage:
+    python3 bench/replay_check.py [--order 100234] [--dc 00] [--speed 0] [--keep DIR]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from bench import fake_realworld, replay_realworld  # noqa: E402
+
+def record_reset(order_number, distribution_center, port, directory):
+    """Reset an order on the fake host with recording on; returns (success, message, recording path)"""
+    from lib.processes.reset_order import reset_order
+
+    config = fake_realworld.HostConfig(latency_ms=20, jitter_ms=0, login_ms=100, not_on_file_rate=0, seed=1)
+    host = fake_realworld.start(port, config)
+    os.environ.update(RW_HOST='127.0.0.1', RW_PORT=str(port), RW_SESSION_RECORD_DIR=directory)
+    try:
+        success, message = reset_order(order_number, distribution_center)
+    finally:
+        del os.environ['RW_SESSION_RECORD_DIR']
+        host.shutdown()
+        host.server_close()
+    recordings = sorted(glob.glob(os.path.join(directory, 'session_*.jsonl')))
+    return success, message, recordings[-1] if recordings else None
+
+def replay_reset(order_number, distribution_center, port, recording, speed):
+    """Reset the order against the replayed recording; returns (success, message, replay result)"""
+    from lib.processes.reset_order import reset_order
+
+    server = replay_realworld.start([recording], port, speed)
+    os.environ['RW_PORT'] = str(port)
+    try:
+        success, message = reset_order(order_number, distribution_center)
+    finally:
+        server.shutdown()
+        server.server_close()
+    results = server.config.results
+    return success, message, results[-1] if results else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--order', default='100234')
+    parser.add_argument('--dc', default='00')
+    parser.add_argument('--port', type=int, default=2325, help='Fake host port; the replay uses the next one')
+    parser.add_argument('--speed', type=float, default=0, help='Replay speed; 0 answers without delay')
+    parser.add_argument('--keep', help='Directory to keep the recording in (a temporary one by default)')
+    args = parser.parse_args()
+
+    # Both runs must read the ship total from the screens, not from the cache
+    os.environ['RW_ORDER_CACHE_TTL'] = '0'
+    os.environ['RW_ORDER_CACHE_NEGATIVE_TTL'] = '0'
+
+    directory = args.keep or tempfile.mkdtemp(prefix='replay_check_')
+    os.makedirs(directory, exist_ok=True)
+    try:
+        success, message, recording = record_reset(args.order, args.dc, args.port, directory)
+        print(f"Recorded reset: {message} ({recording})")
+        if not success or not recording:
+            sys.exit(1)
+
+        success, message, result = replay_reset(args.order, args.dc, args.port + 1, recording, args.speed)
+        print(f"Replayed reset: {message}")
+        if not result:
+            print("The replay server never saw the session")
+            sys.exit(1)
+        if not success or result['outcome'] != 'complete' or result['divergences']:
+            print(f"Replay out of step: {result['outcome']}, {result['divergences']} divergences")
+            sys.exit(1)
+        print("Replay matched the recorded reset")
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Replay recorded RealWorld telnet sessions.
+
+Serves session recordings (lib/session_recording.py, captured with
+RW_SESSION_RECORD_DIR) on a local telnet port, so reset_order(), the
+navigator and the screen parsers run against authentic SCO output, odd
+repaints included, without touching the production host.
+
+Each connection plays the next recording (cycling through them). Host output
+is sent with its recorded timing, divided by --speed; --speed 0 sends it as
+soon as the client has answered. Wherever the recording has the automation
+typing, the replay waits for the client to send its keys, so accelerated runs
+stay in step with the client. Keys that differ from the recording (other than
+masked passwords) are counted as divergences: the flow under test no longer
+matches the one that was recorded. After the last recorded event the line is
+kept open, as the host would, until the client hangs up.
+
+Usage:
+    python3 bench/replay_realworld.py recordings/ [--port 2424] [--speed 10] [--input-timeout 30]
+
+Point the worker or a bench run at it with RW_HOST=127.0.0.1 RW_PORT=2424.
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from bench.fake_realworld import IAC, DO, DONT, WILL, WONT, SB, SE, ECHO, SGA  # noqa: E402
+from lib.session_recording import IN, OUT, load_recording  # noqa: E402
+
+
+def strip_telnet(data, pending=b''):
+    """
+    Client bytes without telnet commands
+
+    Returns:
+        tuple: (bytes data, bytes pending) where pending is an incomplete command to prepend to the next read
+    """
+    data = pending + data
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != IAC:
+            out.append(byte)
+            i += 1
+            continue
+        if i + 1 >= len(data):
+            return bytes(out), data[i:]
+        command = data[i + 1]
+        if command in (DO, DONT, WILL, WONT):
+            if i + 2 >= len(data):
+                return bytes(out), data[i:]
+            i += 3
+        elif command == SB:
+            end = data.find(bytes([IAC, SE]), i)
+            if end < 0:
+                return bytes(out), data[i:]
+            i = end + 2
+        else:
+            i += 2
+    return bytes(out), b''
+
+def normalize_keys(text):
+    """Keys as typed, whatever line ending the telnet client turned Enter into"""
+    return text.replace('\0', '').replace('\r\n', '\r').replace('\n', '\r')
+
+
+class ReplayConfig:
+    """Recordings and pacing, shared by every connection"""
+
+    def __init__(self, paths, speed=1.0, input_timeout=30.0):
+        self.recordings = [load_recording(path) + (path,) for path in paths]
+        self.speed = speed
+        self.input_timeout = input_timeout
+        self.lock = threading.Lock()
+        self.next_index = itertools.cycle(range(len(self.recordings)))
+        self.results = []
+
+    def next_recording(self):
+        with self.lock:
+            return self.recordings[next(self.next_index)]
+
+    def report(self, result):
+        with self.lock:
+            self.results.append(result)
+        print(f"{os.path.basename(result['recording'])}: {result['outcome']}, "
+              f"{result['events']} events in {result['seconds']:.2f}s "
+              f"(recorded {result['recorded_seconds']:.2f}s), {result['divergences']} divergences")
+
+
+class ReplayHandler(socketserver.BaseRequestHandler):
+    """Plays one recording to one client"""
+
+    def setup(self):
+        self.config = self.server.config
+        self.pending = b''
+        self.received = ''
+        self.split_cr = False  # The last read ended in CR; a LF starting the next read belongs to it
+
+    def _ready(self, expected):
+        """Length of the client keys that answer the recorded ones, or None while more are due"""
+        if expected.endswith('\r'):
+            # A typed line (masked passwords included) ends at the client's Enter,
+            # and keys sent with several Enters in one write at as many of them
+            end = -1
+            for _ in range(expected.count('\r')):
+                end = self.received.find('\r', end + 1)
+                if end < 0:
+                    return None
+            return end + 1
+        return len(expected) if len(self.received) >= len(expected) else None
+
+    def read_keys(self, expected, deadline):
+        """Read client keys until they answer what the recording typed"""
+        expected = normalize_keys(expected)
+        while self._ready(expected) is None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self.request.settimeout(remaining)
+            try:
+                data = self.request.recv(4096)
+            except socket.timeout:
+                return None
+            if not data:
+                return None
+            data, self.pending = strip_telnet(data, self.pending)
+            text = data.decode('utf-8', errors='replace').replace('\0', '')
+            if self.split_cr and text.startswith('\n'):
+                text = text[1:]
+            if text:
+                self.split_cr = text.endswith('\r')
+            self.received = normalize_keys(self.received + text)
+        want = self._ready(expected)
+        keys, self.received = self.received[:want], self.received[want:]
+        return keys
+
+    def hold(self):
+        """Keep the line open after the recording, as the host would, until the client hangs up"""
+        deadline = time.time() + self.config.input_timeout
+        while time.time() < deadline:
+            self.request.settimeout(max(deadline - time.time(), 0.01))
+            try:
+                if not self.request.recv(4096):
+                    return
+            except (socket.timeout, OSError):
+                return
+
+    def handle(self):
+        header, events, path = self.config.next_recording()
+        speed = self.config.speed
+        # Character mode, as the real host negotiates it; the recording holds the screens only
+        self.request.sendall(bytes([IAC, WILL, ECHO, IAC, WILL, SGA]))
+
+        start = time.time()
+        recorded_ref, real_ref = 0.0, start
+        divergences = 0
+        outcome = 'complete'
+        played = 0
+
+        for event in events:
+            if event['dir'] == OUT:
+                if speed > 0:
+                    wait = real_ref + (event['t'] - recorded_ref) / speed - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
+                try:
+                    self.request.sendall(event['data'].encode('utf-8'))
+                except OSError:
+                    outcome = 'client disconnected'
+                    break
+            elif event['dir'] == IN:
+                keys = self.read_keys(event['data'], time.time() + self.config.input_timeout)
+                if keys is None:
+                    outcome = 'client stopped sending keys'
+                    break
+                if not event.get('redacted') and keys != normalize_keys(event['data']):
+                    divergences += 1
+                # Host think time is measured from the client's keys, not from the start
+                recorded_ref, real_ref = event['t'], time.time()
+            played += 1
+
+        seconds = time.time() - start
+        if outcome == 'complete':
+            self.hold()
+
+        self.config.report({
+            'recording': path,
+            'outcome': outcome,
+            'events': played,
+            'divergences': divergences,
+            'seconds': seconds,
+            'recorded_seconds': events[-1]['t'] if events else 0.0,
+        })
+
+
+class ReplayServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, config):
+        self.config = config
+        super().__init__(address, ReplayHandler)
+
+def find_recordings(paths):
+    """Recording files named on the command line, directories expanded"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, 'session_*.jsonl'))))
+        else:
+            found.append(path)
+    return found
+
+def start(paths, port=2424, speed=1.0, input_timeout=30.0):
+    """Start a replay server in a background thread and return it"""
+    server = ReplayServer(('127.0.0.1', port), ReplayConfig(find_recordings(paths), speed, input_timeout))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recordings', nargs='+', help='Recording files or directories of them')
+    parser.add_argument('--port', type=int, default=2424)
+    parser.add_argument('--speed', type=float, default=1.0, help='Playback speed; 0 answers without delay')
+    parser.add_argument('--input-timeout', type=float, default=30.0,
+                        help='Seconds to wait for the client to type what the recording typed')
+    args = parser.parse_args()
+
+    paths = find_recordings(args.recordings)
+    if not paths:
+        parser.error('no session recordings found')
+
+    config = ReplayConfig(paths, args.speed, args.input_timeout)
+    server = ReplayServer(('127.0.0.1', args.port), config)
+    print(f"Replaying {len(paths)} recording(s) at {args.speed or 'full'}x on 127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        complete = sum(1 for r in config.results if r['outcome'] == 'complete')
+        diverged = sum(1 for r in config.results if r['divergences'])
+        print(f"{len(config.results)} sessions replayed, {complete} complete, {diverged} diverged")
+
+if __name__ == '__main__':
+    main()
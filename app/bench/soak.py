@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Load and soak run for the API and the job pipeline.
+
+Starts a fake RealWorld host (bench/fake_realworld.py) and worker.py pointed
+at it, then drives the Flask API in-process for --duration seconds:
+
+    - submitters post a mix of single and batch resets to /api/reset
+    - --dashboards simulated dashboards poll /api/currentjobs and
+      /api/jobstatuses every --poll-seconds, like the browser does
+
+and reports per-endpoint latency percentiles, DB queries per request, job
+outcomes and end-to-end latency, and memory growth of the API and worker
+processes, compared against a stored baseline.
+
+The job tables must be a throwaway database. Without any infrastructure, use
+the SQLite backend; the API, which runs in this process, and the worker share
+the file:
+
+    RW_DB_BACKEND=sqlite RW_SQLITE_PATH=/tmp/soak.db python3 bench/soak.py --log-dir /tmp
+
+Otherwise point MSSQL_* at a local SQL Server (e.g. the
+mcr.microsoft.com/mssql/server container) with the sql/ migrations applied.
+Every job is tagged with a SOAK-<run id> ticket number.
+
+No baseline is shipped: latencies and memory depend on the machine and the
+backend. Record one on the machine that will run the comparisons, with the
+same options the later runs will use, by adding --save:
+
+    python3 bench/soak.py --duration 600 --save   # writes bench/soak_baseline.json
+    python3 bench/soak.py --duration 600          # exits 1 on a regression
+
+Usage:
+    python3 bench/soak.py [--duration 3600] [--dashboards 20] [--baseline bench/soak_baseline.json] [--save]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from bench import fake_realworld  # noqa: E402
+
+# Metrics compared against the baseline; all are "higher is worse"
+BASELINE_METRICS = ['p95_ms', 'queries_per_request']
+MEMORY_METRICS = ['api_growth_mb_per_hour', 'worker_growth_mb_per_hour']
+
+# Job statuses the drain waits on; 'error' jobs are waiting for a retry
+UNFINISHED_STATUSES = ['pending', 'processing', 'error']
+
+
+class QueryCounter:
+    """Counts DB statements per thread by wrapping the job store backend's connect()"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def install(self):
+        from lib.backends import get_backend
+        backend = get_backend()
+        connect = backend.connect
+        counter = self
+
+        class CountingCursor:
+            def __init__(self, cursor):
+                self._cursor = cursor
+
+            def execute(self, *args, **kwargs):
+                counter.add()
+                return self._cursor.execute(*args, **kwargs)
+
+            def executemany(self, *args, **kwargs):
+                counter.add()
+                return self._cursor.executemany(*args, **kwargs)
+
+            def __getattr__(self, name):
+                return getattr(self._cursor, name)
+
+        class CountingConnection:
+            def __init__(self, conn):
+                self._conn = conn
+
+            def cursor(self):
+                return CountingCursor(self._conn.cursor())
+
+            def __getattr__(self, name):
+                return getattr(self._conn, name)
+
+        backend.connect = lambda *args, **kwargs: CountingConnection(connect(*args, **kwargs))
+
+    def add(self):
+        self.local.count = getattr(self.local, 'count', 0) + 1
+
+    def reset(self):
+        self.local.count = 0
+
+    def read(self):
+        return getattr(self.local, 'count', 0)
+
+
+class Recorder:
+    """Latency and query samples per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, endpoint, ms, queries, ok):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append((ms, queries))
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self):
+        report = {}
+        with self.lock:
+            for endpoint, samples in sorted(self.samples.items()):
+                latencies = sorted(ms for ms, _ in samples)
+                report[endpoint] = {
+                    'requests': len(samples),
+                    'errors': self.errors.get(endpoint, 0),
+                    'p50_ms': round(percentile(latencies, 0.5), 1),
+                    'p95_ms': round(percentile(latencies, 0.95), 1),
+                    'p99_ms': round(percentile(latencies, 0.99), 1),
+                    'queries_per_request': round(statistics.mean(q for _, q in samples), 2),
+                }
+        return report
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def rss_mb(pid):
+    """Resident memory of a process in MB (Linux /proc)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return 0.0
+
+def process_tree(pid):
+    """pid and all its descendants"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = [pid]
+    for p in pids:
+        pids.extend(children.get(p, []))
+    return pids
+
+def growth_per_hour(samples):
+    """Least squares slope of (seconds, MB) samples, in MB per hour"""
+    if len(samples) < 2:
+        return 0.0
+    xs = [t for t, _ in samples]
+    ys = [mb for _, mb in samples]
+    mean_x, mean_y = statistics.mean(xs), statistics.mean(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+    return slope * 3600
+
+
+class Soak:
+    def __init__(self, args):
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:8]
+        self.ticket = f'SOAK-{self.run_id}'
+        self.stop = threading.Event()
+        self.counter = QueryCounter()
+        self.recorder = Recorder()
+        self.job_ids = []
+        self.job_ids_lock = threading.Lock()
+        self.memory = {'api': [], 'worker': []}
+        self.worker = None
+        self.order_seq = 0
+
+    def client(self):
+        from interface import app
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['authenticated_user'] = 'soak'
+        return client
+
+    def call(self, client, endpoint, method, path, **kwargs):
+        self.counter.reset()
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        ms = (time.perf_counter() - start) * 1000
+        body = response.get_json(silent=True) or {}
+        self.recorder.add(endpoint, ms, self.counter.read(),
+                          response.status_code < 400 and body.get('status') != 'error')
+        return body
+
+    def next_orders(self, count):
+        with self.job_ids_lock:
+            start = self.order_seq
+            self.order_seq += count
+        return [f'S{self.run_id[:4].upper()}{n:06d}' for n in range(start + 1, start + count + 1)]
+
+    def submitter(self):
+        client = self.client()
+        dcs = self.args.dcs.split(',')
+        per_minute = self.args.singles_per_minute + self.args.batches_per_minute
+        rate = per_minute / 60.0
+        batch_share = self.args.batches_per_minute / per_minute if per_minute else 0
+
+        while not self.stop.wait(random.expovariate(rate) if rate else 60):
+            dc = random.choice(dcs)
+            if random.random() < batch_share:
+                size = random.randint(max(self.args.batch_size // 2, 1), self.args.batch_size)
+                payload = {'order_number': '\n'.join(self.next_orders(size)), 'distribution_center': dc,
+                           'ticket_number': self.ticket, 'job_type': 'Reset Batch Order'}
+                body = self.call(client, 'POST /api/reset (batch)', 'POST', '/api/reset', json=payload)
+                ids = body.get('job_ids', [])
+            else:
+                payload = {'order_number': self.next_orders(1)[0], 'distribution_center': dc,
+                           'ticket_number': self.ticket, 'job_type': 'Reset Single Order'}
+                body = self.call(client, 'POST /api/reset (single)', 'POST', '/api/reset', json=payload)
+                ids = [body['job_id']] if body.get('job_id') else []
+            with self.job_ids_lock:
+                self.job_ids.extend(ids)
+
+    def dashboard(self):
+        client = self.client()
+        # Spread the dashboards over the poll interval
+        self.stop.wait(random.uniform(0, self.args.poll_seconds))
+        while not self.stop.is_set():
+            self.call(client, 'GET /api/currentjobs', 'GET', '/api/currentjobs')
+            with self.job_ids_lock:
+                watched = self.job_ids[-50:]
+            if watched:
+                self.call(client, 'POST /api/jobstatuses', 'POST', '/api/jobstatuses', json={'job_ids': watched})
+            self.stop.wait(self.args.poll_seconds)
+
+    def sample_memory(self, started):
+        while True:
+            elapsed = time.time() - started
+            self.memory['api'].append((elapsed, rss_mb(os.getpid())))
+            if self.worker:
+                self.memory['worker'].append((elapsed, sum(rss_mb(p) for p in process_tree(self.worker.pid))))
+            if self.stop.wait(self.args.memory_seconds):
+                return
+
+    def start_worker(self, port):
+        env = dict(os.environ, RW_HOST='127.0.0.1', RW_PORT=str(port), PYTHONUNBUFFERED='1')
+        log = open(os.path.join(self.args.log_dir, f'soak_worker_{self.run_id}.log'), 'w')
+        self.worker = subprocess.Popen([sys.executable, os.path.join(APP_DIR, 'worker.py')], cwd=APP_DIR, env=env,
+                                       stdout=log, stderr=subprocess.STDOUT)
+
+    def job_outcomes(self):
+        from lib.db import get_connection
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT status, DATEDIFF(millisecond, requested_at, completed_at)
+            FROM RwAutomator_Log
+            WHERE ticket_number = ?
+        """, (self.ticket,))
+        rows = cursor.fetchall()
+        conn.close()
+
+        statuses = {}
+        latencies = []
+        for status, ms in rows:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 'success' and ms is not None:
+                latencies.append(ms / 1000.0)
+        latencies.sort()
+        return {
+            'submitted': len(rows),
+            'statuses': statuses,
+            'end_to_end_p50_s': round(percentile(latencies, 0.5), 1),
+            'end_to_end_p95_s': round(percentile(latencies, 0.95), 1),
+        }
+
+    def run(self):
+        args = self.args
+        config = fake_realworld.HostConfig(args.latency_ms, args.jitter_ms, args.login_ms, args.not_on_file_rate,
+                                           args.fail_rate)
+        host = fake_realworld.start(args.port, config)
+        print(f"Run {self.run_id}: fake RealWorld on port {args.port}, tickets tagged {self.ticket}")
+
+        self.counter.install()
+        if not args.no_worker:
+            self.start_worker(args.port)
+
+        started = time.time()
+        threads = [threading.Thread(target=self.sample_memory, args=(started,), daemon=True)]
+        threads += [threading.Thread(target=self.submitter, daemon=True) for _ in range(args.submitters)]
+        threads += [threading.Thread(target=self.dashboard, daemon=True) for _ in range(args.dashboards)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while time.time() - started < args.duration:
+                time.sleep(min(60, args.duration))
+                elapsed = int(time.time() - started)
+                print(f"  {elapsed}s: {len(self.job_ids)} jobs submitted, host {config.stats}")
+        except KeyboardInterrupt:
+            print("Interrupted, reporting what we have")
+
+        self.stop.set()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        # Let the worker finish what is queued, retries of failed attempts
+        # ('error' until they succeed or run out of attempts) included
+        drain_until = time.time() + args.drain_seconds
+        while self.worker and time.time() < drain_until:
+            outcomes = self.job_outcomes()
+            if not any(outcomes['statuses'].get(status) for status in UNFINISHED_STATUSES):
+                break
+            time.sleep(5)
+        else:
+            if self.worker:
+                print(f"Jobs still unfinished after --drain-seconds {args.drain_seconds}; they are reported by status")
+
+        if self.worker:
+            self.worker.terminate()
+            self.worker.wait(timeout=30)
+        host.shutdown()
+
+        return {
+            'run_id': self.run_id,
+            'duration_s': round(time.time() - started),
+            'endpoints': self.recorder.summary(),
+            'jobs': self.job_outcomes(),
+            'host': config.stats,
+            'memory': {
+                'api_start_mb': round(self.memory['api'][0][1], 1) if self.memory['api'] else None,
+                'api_end_mb': round(self.memory['api'][-1][1], 1) if self.memory['api'] else None,
+                'api_growth_mb_per_hour': round(growth_per_hour(self.memory['api'][1:]), 2),
+                'worker_start_mb': round(self.memory['worker'][0][1], 1) if self.memory['worker'] else None,
+                'worker_end_mb': round(self.memory['worker'][-1][1], 1) if self.memory['worker'] else None,
+                'worker_growth_mb_per_hour': round(growth_per_hour(self.memory['worker'][1:]), 2),
+            },
+        }
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against a baseline, as printable strings"""
+    regressions = []
+    for endpoint, stats in results['endpoints'].items():
+        base = baseline.get('endpoints', {}).get(endpoint)
+        if not base:
+            continue
+        for metric in BASELINE_METRICS:
+            if base.get(metric) and stats[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{endpoint} {metric} {stats[metric]} (baseline {base[metric]})")
+    for metric in MEMORY_METRICS:
+        base = baseline.get('memory', {}).get(metric)
+        value = results['memory'][metric]
+        # Small absolute growth is noise, whatever the baseline says
+        if base is not None and value > max(base * (1 + tolerance), base + 5):
+            regressions.append(f"{metric} {value} (baseline {base})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=int, default=600, help='Seconds of load')
+    parser.add_argument('--dashboards', type=int, default=20)
+    parser.add_argument('--poll-seconds', type=float, default=3, help='Dashboard refresh interval')
+    parser.add_argument('--submitters', type=int, default=1)
+    parser.add_argument('--singles-per-minute', type=float, default=6)
+    parser.add_argument('--batches-per-minute', type=float, default=0.5)
+    parser.add_argument('--batch-size', type=int, default=50, help='Largest batch (batches are half to full size)')
+    parser.add_argument('--dcs', default='00,01,02,03,04,05', help='Comma separated DCs to spread orders over')
+    parser.add_argument('--port', type=int, default=2323, help='Fake RealWorld port')
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--jitter-ms', type=float, default=100)
+    parser.add_argument('--login-ms', type=float, default=1500)
+    parser.add_argument('--not-on-file-rate', type=float, default=0.05)
+    parser.add_argument('--fail-rate', type=float, default=0.02)
+    parser.add_argument('--no-worker', action='store_true', help='Only load the API (worker runs elsewhere)')
+    parser.add_argument('--drain-seconds', type=int, default=300, help='How long to wait for queued jobs at the end')
+    parser.add_argument('--memory-seconds', type=int, default=30, help='Memory sampling interval')
+    parser.add_argument('--log-dir', default='/app/process-logs')
+    parser.add_argument('--output', help='Write the full report as JSON')
+    parser.add_argument('--baseline', default=os.path.join(APP_DIR, 'bench', 'soak_baseline.json'))
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown vs baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    results = Soak(args).run()
+
+    print(f"\n{'endpoint':<28} {'requests':>8} {'errors':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}")
+    for endpoint, stats in results['endpoints'].items():
+        print(f"{endpoint:<28} {stats['requests']:>8} {stats['errors']:>6} {stats['p50_ms']:>6.1f}ms "
+              f"{stats['p95_ms']:>6.1f}ms {stats['p99_ms']:>6.1f}ms {stats['queries_per_request']:>8}")
+    jobs = results['jobs']
+    print(f"\nJobs: {jobs['submitted']} submitted, {jobs['statuses']}, "
+          f"end to end p50 {jobs['end_to_end_p50_s']}s / p95 {jobs['end_to_end_p95_s']}s")
+    memory = results['memory']
+    print(f"Memory: API {memory['api_start_mb']} -> {memory['api_end_mb']} MB "
+          f"({memory['api_growth_mb_per_hour']:+} MB/h), worker {memory['worker_start_mb']} -> "
+          f"{memory['worker_end_mb']} MB ({memory['worker_growth_mb_per_hour']:+} MB/h)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    elif not args.save:
+        print(f"\nNo baseline at {args.baseline}; nothing compared. Run again with --save to record one.")
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print(f"    {regression}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
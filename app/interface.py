@@ -1,11 +1,27 @@
 import re
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+import os
+import json
+import hashlib
+from flask import (Flask, Response, request, jsonify, render_template, session, redirect, url_for, g, send_file,
+                   make_response)
 from functools import wraps
 import time
 import uuid
 import sys
 sys.path.insert(0, '/app')
-from lib.db import create_job_record, get_job_status, get_job_history, get_pending_jobs
+from lib.db import create_job_record, create_job_records, get_job_status, get_job_history, get_pending_jobs, get_change_version
+from lib.scheduler import job_priority, parse_schedule
+from lib.host_guard import get_host_status, get_credential_status, host_accepting_sessions
+from lib.order_cache import get_cached_orders
+from lib.watchdog import get_workers
+from lib.batch_import import import_reset_batch
+from lib.history_export import FORMATS, export_job_history
+from lib.batches import create_batch, get_batch_progress, queue_orders, get_batch_results
+from lib.analytics import get_analytics
+from lib.timing import get_screen_timings
+from lib.snapshots import get_job_snapshots
+from lib.profiling import REQUESTS, should_profile, save_profile, list_profiles, get_profile_path
+from lib.functions import get_valid_distribution_centers
 
 # Import SAML blueprint
 from saml_auth import saml_bp
@@ -19,6 +35,85 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 # Register SAML blueprint
 app.register_blueprint(saml_bp)
 
+# Opt-in request profiling (lib.profiling): RW_PROFILE=requests, or an X-Profile header from a signed-in user
+@app.before_request
+def start_profile():
+    requested = request.headers.get('X-Profile', '').lower() in ('1', 'true', 'yes') and 'authenticated_user' in session
+    if should_profile(REQUESTS, requested):
+        import cProfile
+        g.profile = cProfile.Profile()
+        g.profile_started = time.time()
+        g.profile.enable()
+
+@app.teardown_request
+def finish_profile(exc=None):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+    profile.disable()
+    try:
+        save_profile(profile, REQUESTS, f'{request.method}_{request.path}', time.time() - g.profile_started)
+    except Exception as e:
+        print(f"Warning: Could not write profile: {e}")
+
+# Static assets are linked with a content hash (?v=...), so they can be cached for a year
+ASSET_MAX_AGE = 365 * 24 * 3600
+_asset_hashes = {}  # (filename, mtime) -> hash
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a file under static/ with its content hash, for long-lived caching"""
+    path = os.path.join(app.static_folder, filename)
+    key = (filename, os.path.getmtime(path))
+    if key not in _asset_hashes:
+        with open(path, 'rb') as f:
+            _asset_hashes[key] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return url_for('static', filename=filename, v=_asset_hashes[key])
+
+@app.after_request
+def cache_static_assets(response):
+    if request.endpoint == 'static' and request.args.get('v') and response.status_code in (200, 304):
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+def conditional_on_jobs(host_state=None):
+    """
+    Answer polling with 304 Not Modified while the job table hasn't changed
+
+    The ETag is the job table's version (lib.db.get_change_version), plus a
+    digest of host_state() for views that include host state, and is checked
+    before the view runs, so an unchanged poll costs the version query (and
+    the host state query) and no serialization. host_state() is called once
+    per request; the view reads its result from g.host_state.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                etag = f'jobs-{get_change_version()}'
+                if host_state:
+                    g.host_state = host_state()
+                    host = json.dumps(g.host_state, sort_keys=True, default=str)
+                    etag += '-' + hashlib.sha1(host.encode()).hexdigest()[:12]
+            except Exception:
+                # Let the view report the database error
+                return f(*args, **kwargs)
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
 # Authentication decorator
 def require_auth(f):
     """Decorator to require SAML authentication"""
@@ -31,6 +126,21 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def parse_order_numbers(value):
+    """
+    Order numbers from a request: a list (of strings or numbers) or one
+    string separated by commas or whitespace
+
+    Returns:
+        list: Non-empty order numbers as strings, or None if value is neither
+    """
+    if isinstance(value, str):
+        value = re.split(r'[\s,]+', value)
+    if not isinstance(value, list):
+        return None
+    order_numbers = [str(o).strip() for o in value if o is not None and not isinstance(o, (dict, list, bool))]
+    return [o for o in order_numbers if o]
+
 @app.route('/')
 @require_auth
 def home():
@@ -40,19 +150,28 @@ def home():
         'user_id': session.get('user_id', ''),
         'authenticated': 'authenticated_user' in session
     }
-    return render_template('dashboard.html', user_data=user_data)
+    # Assets are separate files now; the page itself is small and revalidated by ETag
+    response = make_response(render_template('dashboard.html', user_data=user_data))
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/status/<job_id>', methods=['GET'])
+@conditional_on_jobs(host_state=host_accepting_sessions)
 def check_status(job_id):
-    # This route is public - no authentication required
+    # This route is public - no authentication required, so the host's
+    # address and limits stay behind /api/currentjobs
     job_status = get_job_status(job_id)
     if job_status:
+        job_status['host_available'] = g.get('host_state', True)
         return jsonify(job_status)
     return jsonify({'status': 'error', 'message': 'Job not found'}), 404
 
 # Protected routes - require authentication
 @app.route('/api/history', methods=['GET'])
 @require_auth
+@conditional_on_jobs()
 def history():
     try:
         # Pagination parameters
@@ -85,14 +204,48 @@ def history():
             'message': f'Database error: {str(e)}'
         }), 500
 
+@app.route('/api/history/export', methods=['GET'])
+@require_auth
+def history_export():
+    """
+    Stream the whole filtered job history as CSV (format=csv, the default) or
+    NDJSON (format=ndjson), with the same filters as /api/history
+    """
+    export_format = request.args.get('format', 'csv').strip().lower()
+    if export_format not in FORMATS:
+        return jsonify({
+            'status': 'error',
+            'message': f"format must be one of {', '.join(FORMATS)}"
+        }), 400
+
+    try:
+        chunks = export_job_history(
+            export_format,
+            order_number=request.args.get('order_number', '').strip(),
+            start_date=request.args.get('start_date', '').strip(),
+            end_date=request.args.get('end_date', '').strip(),
+            status=request.args.get('status', '').strip()
+        )
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    filename = f"job-history-{time.strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return Response(chunks, mimetype=FORMATS[export_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @app.route('/api/currentjobs', methods=['GET'])
 @require_auth
+@conditional_on_jobs(host_state=get_host_status)
 def current_jobs():
     try:
         jobs = get_pending_jobs()
         return jsonify({
             'status': 'success',
-            'jobs': jobs
+            'jobs': jobs,
+            'host': g.get('host_state') or get_host_status()
         })
     except Exception as e:
         return jsonify({
@@ -100,6 +253,88 @@ def current_jobs():
             'message': f'Database error: {str(e)}'
         }), 500
         
+@app.route('/api/workers', methods=['GET'])
+@require_auth
+def workers():
+    try:
+        return jsonify({
+            'status': 'success',
+            'workers': get_workers()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+@app.route('/api/analytics', methods=['GET'])
+@require_auth
+def analytics():
+    """Throughput, latency and success rate from the hourly rollups"""
+    try:
+        hours = min(max(int(request.args.get('hours', 24)), 1), 24 * 90)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'hours must be a number'
+        }), 400
+
+    try:
+        stats = get_analytics(
+            hours,
+            distribution_center=request.args.get('distribution_center') or None,
+            job_type=request.args.get('job_type') or None
+        )
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    return jsonify({
+        'status': 'success',
+        'analytics': stats
+    })
+
+@app.route('/api/credentials', methods=['GET'])
+@require_auth
+def credentials():
+    """RealWorld credential pool with active sessions and usage per credential"""
+    try:
+        pool = get_credential_status()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    return jsonify({
+        'status': 'success',
+        'credentials': pool
+    })
+
+@app.route('/api/timings', methods=['GET'])
+@require_auth
+def screen_timings():
+    """RealWorld response times learned per host, DC and screen step"""
+    try:
+        timings = get_screen_timings(request.args.get('host') or None)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    return jsonify({
+        'status': 'success',
+        'timings': timings
+    })
+
 @app.route('/api/jobstatus/<job_id>', methods=['GET'])
 @require_auth
 def job_status(job_id):
@@ -107,13 +342,42 @@ def job_status(job_id):
     if job_status:
         return jsonify({
             'status': 'success',
-            'job_status': job_status
+            'job_status': job_status,
+            'host': get_host_status()
         })
     return jsonify({
         'status': 'error',
         'message': 'Job not found'
     }), 404
     
+@app.route('/api/jobsnapshots/<job_id>', methods=['GET'])
+@require_auth
+def job_snapshots(job_id):
+    """
+    Screens captured for a job, in capture order. format=text shows them as
+    plain text, one after another, for reading in the browser.
+    """
+    try:
+        snapshots = get_job_snapshots(job_id)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    if request.args.get('format') == 'text':
+        text = ''.join(
+            f"=== {snapshot['seq']}. {snapshot['step']} ({snapshot['captured_at']}) ===\n{snapshot['screen']}\n\n"
+            for snapshot in snapshots
+        )
+        return Response(text or 'No snapshots for this job\n', mimetype='text/plain')
+
+    return jsonify({
+        'status': 'success',
+        'job_id': job_id,
+        'snapshots': snapshots
+    })
+
 @app.route('/api/jobstatuses', methods=['POST'])
 @require_auth
 def job_statuses():
@@ -127,7 +391,8 @@ def job_statuses():
             statuses[job_id] = {'status': 'error', 'message': 'Job not found'}
     return jsonify({
         'status': 'success',
-        'job_statuses': statuses
+        'job_statuses': statuses,
+        'host': get_host_status()
     })  
 
 @app.route('/api/reset', methods=['POST'])
@@ -141,26 +406,72 @@ def reset():
     
     job_type = request.json.get('job_type', 'reset_order')
     ticket_number = request.json.get('ticket_number', '')
+    priority = job_priority(job_type, urgent=bool(request.json.get('urgent', False)))
+    
+    # Optional client idempotency key, so a retried or double-clicked submit returns the same job(s)
+    idempotency_key = request.headers.get('Idempotency-Key') or request.json.get('idempotency_key')
+
+    # Optional cProfile capture of the job's run (lib.profiling)
+    profile_job = bool(request.json.get('profile', False))
+
+    # Optional deferral: earliest start, daily execution window, or the off-peak window
+    try:
+        not_before, execution_window = parse_schedule(request.json.get('not_before'),
+                                                      request.json.get('execution_window'),
+                                                      bool(request.json.get('off_peak', False)))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
 
     # check if job_type has keyword "Batch"
     if "Batch" in job_type:
         # split order numbers by space, line breaks, or commas
-        order_numbers = re.split(r'[\s,]+', order_number.strip())
-        for order_num in order_numbers:
-            if order_num:
-                # trim whitespace from order_num
-                order_num = order_num.strip()
-                job_id = str(uuid.uuid4())
-                try:
-                    create_job_record(job_id, job_type, order_num, dc, username, ticket_number)
-                except Exception as e:
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Database error: {str(e)}'
-                    }), 500
+        order_numbers = re.split(r'[\s,]+', (order_number or '').strip())
+        batch_id = str(uuid.uuid4())
+        jobs = [
+            {
+                'job_id': str(uuid.uuid4()),
+                'job_type': job_type,
+                'order_number': order_num,
+                'distribution_center': dc,
+                'rw_user': username,
+                'ticket_number': ticket_number,
+                'priority': priority,
+                'idempotency_key': f'{idempotency_key}:{order_num}' if idempotency_key else None,
+                'batch_id': batch_id,
+                'not_before': not_before,
+                'execution_window': execution_window,
+                'profile': profile_job,
+            }
+            # Unique, in submitted order
+            for order_num in dict.fromkeys(o.strip() for o in order_numbers if o.strip())
+        ]
+        try:
+            # One transaction; the batch is only created if some order is new
+            _, duplicates = create_job_records(jobs, batch={
+                'batch_id': batch_id, 'job_type': job_type, 'rw_user': username,
+                'distribution_center': dc, 'ticket_number': ticket_number,
+            })
+        except Exception as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Database error: {str(e)}'
+            }), 500
+        job_ids = [job['job_id'] for job in jobs]
+        if len(job_ids) == duplicates:
+            batch_id = None
+
+        message = f'Batch reset job created for {len(job_ids) - duplicates} orders'
+        if duplicates:
+            message += f' ({duplicates} already queued)'
         return jsonify({
             'status': 'pending',
-            'message': f'Batch reset job created for {len(order_numbers)} orders'
+            'message': message,
+            'job_ids': job_ids,
+            'duplicates': duplicates,
+            'batch_id': batch_id
         })
 
     if not order_number:
@@ -172,18 +483,271 @@ def reset():
     # Create job record in database
     job_id = str(uuid.uuid4())
     try:
-        create_job_record(job_id, job_type, order_number, dc, username, ticket_number)
+        job_id, created = create_job_record(job_id, job_type, order_number, dc, username, ticket_number,
+                                            priority, idempotency_key, not_before=not_before,
+                                            execution_window=execution_window, profile=profile_job)
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': f'Database error: {str(e)}'
         }), 500
+    
+    if not created:
+        return jsonify({
+            'status': 'pending',
+            'message': f'Order {order_number} is already queued',
+            'job_id': job_id,
+            'duplicate': True
+        })
         
     return jsonify({
         'status': 'pending',
-        'message': f'Order {order_number} reset job created'
+        'message': f'Order {order_number} reset job created',
+        'job_id': job_id,
+        'duplicate': False
+    })
+
+@app.route('/api/reset/upload', methods=['POST'])
+@require_auth
+def reset_upload():
+    """
+    Queue a reset backfill from an uploaded CSV (order, DC, ticket per row).
+    Form fields distribution_center and ticket_number fill in missing columns.
+    """
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({
+            'status': 'error',
+            'message': 'file is required'
+        }), 400
+
+    username = session.get('authenticated_user', 'unknown')
+    job_type = request.form.get('job_type', 'Reset Batch Order')
+    priority = job_priority(job_type)
+
+    try:
+        not_before, execution_window = parse_schedule(request.form.get('not_before', '').strip(),
+                                                      request.form.get('execution_window', '').strip(),
+                                                      request.form.get('off_peak', '').lower() in ('1', 'true', 'yes'))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+    try:
+        summary = import_reset_batch(
+            upload.stream,
+            job_type,
+            username,
+            priority,
+            default_dc=request.form.get('distribution_center', '').strip(),
+            default_ticket=request.form.get('ticket_number', '').strip(),
+            not_before=not_before,
+            execution_window=execution_window
+        )
+    except UnicodeDecodeError:
+        return jsonify({
+            'status': 'error',
+            'message': 'File must be a UTF-8 CSV'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    return jsonify({
+        'status': 'pending',
+        'message': f"Queued {summary['queued']} of {summary['rows']} rows "
+                   f"({summary['duplicates']} already queued, {summary['rejected']} rejected)",
+        **summary
     })
 
+@app.route('/api/batches/<batch_id>', methods=['GET'])
+@require_auth
+def batch_progress(batch_id):
+    """Progress, throughput and ETA of a batch"""
+    try:
+        batch = get_batch_progress(batch_id)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    if not batch:
+        return jsonify({
+            'status': 'error',
+            'message': 'Batch not found'
+        }), 404
+
+    return jsonify({
+        'status': 'success',
+        'batch': batch
+    })
+
+@app.route('/api/orders/validate', methods=['POST'])
+@require_auth
+def validate_orders():
+    """Pre-validate order numbers against cached RealWorld lookups (no telnet session)"""
+    dc = request.json.get('distribution_center', '00')
+    order_numbers = parse_order_numbers(request.json.get('order_numbers', []))
+    if order_numbers is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'order_numbers must be a list or a string'
+        }), 400
+
+    if dc not in get_valid_distribution_centers():
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid company / distribution center'
+        }), 400
+
+    try:
+        cached = get_cached_orders(dc, order_numbers)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    orders = {}
+    for order_num in order_numbers:
+        entry = cached.get(order_num)
+        if not entry:
+            orders[order_num] = {'status': 'unknown'}
+        elif entry['not_on_file']:
+            orders[order_num] = {'status': 'not_on_file', 'cached_at': entry['cached_at']}
+        else:
+            orders[order_num] = {'status': 'found', 'ship_total': entry['ship_total'], 'cached_at': entry['cached_at']}
+
+    return jsonify({
+        'status': 'success',
+        'distribution_center': dc,
+        'orders': orders
+    })
+
+@app.route('/api/inspect', methods=['POST'])
+@require_auth
+def inspect_orders():
+    """
+    Queue a read-only inspection of many orders (on file? ship total?).
+    The worker walks them on warm sessions, so a batch costs one login per executor.
+    """
+    dc = request.json.get('distribution_center', '00')
+    ticket_number = request.json.get('ticket_number', '')
+    order_numbers = parse_order_numbers(request.json.get('order_numbers', []))
+    if order_numbers is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'order_numbers must be a list or a string'
+        }), 400
+    # Unique, in submitted order
+    order_numbers = list(dict.fromkeys(order_numbers))
+
+    if dc not in get_valid_distribution_centers():
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid company / distribution center'
+        }), 400
+    if not order_numbers:
+        return jsonify({
+            'status': 'error',
+            'message': 'order_numbers is required'
+        }), 400
+
+    username = session.get('authenticated_user', 'unknown')
+    job_type = 'Inspect Batch Order'
+    batch_id = str(uuid.uuid4())
+    try:
+        create_batch(batch_id, job_type, username, dc, ticket_number)
+        queued, duplicates = queue_orders(batch_id, job_type, order_numbers, dc, username, ticket_number,
+                                          job_priority(job_type))
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    message = f'Inspection queued for {queued} orders'
+    if duplicates:
+        message += f' ({duplicates} already being inspected)'
+    return jsonify({
+        'status': 'pending',
+        'message': message,
+        'batch_id': batch_id,
+        'queued': queued,
+        'duplicates': duplicates
+    })
+
+@app.route('/api/inspect/<batch_id>', methods=['GET'])
+@require_auth
+def inspection_results(batch_id):
+    """Per-order results of an inspection batch: found, not_on_file, error, or still pending/processing"""
+    try:
+        batch = get_batch_progress(batch_id)
+        jobs = get_batch_results(batch_id) if batch else []
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+    if not batch:
+        return jsonify({
+            'status': 'error',
+            'message': 'Batch not found'
+        }), 404
+
+    orders = []
+    for job in jobs:
+        result = job['result'] or {}
+        if job['status'] == 'success':
+            status = result.get('status', 'found')
+        elif job['status'] == 'failed':
+            status = 'error'
+        else:
+            status = job['status']  # pending, processing, or error with a retry to come
+        orders.append({
+            'order_number': job['order_number'],
+            'status': status,
+            'ship_total': result.get('ship_total'),
+            'message': job['result_message'],
+            'job_id': job['job_id']
+        })
+
+    return jsonify({
+        'status': 'success',
+        'batch': batch,
+        'orders': orders
+    })
+
+@app.route('/api/profiles', methods=['GET'])
+@require_auth
+def profiles():
+    """Profiles written by lib.profiling, newest first"""
+    return jsonify({
+        'status': 'success',
+        'profiles': list_profiles()
+    })
+
+@app.route('/api/profiles/<name>', methods=['GET'])
+@require_auth
+def profile(name):
+    """A profile's text summary, or the .prof file itself with format=prof"""
+    extension = 'prof' if request.args.get('format') == 'prof' else 'txt'
+    path = get_profile_path(name, extension)
+    if not path:
+        return jsonify({
+            'status': 'error',
+            'message': 'Profile not found'
+        }), 404
+    if extension == 'prof':
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True)
+    return send_file(path, mimetype='text/plain')
+
 # Optional: Add a user info endpoint
 @app.route('/api/userinfo', methods=['GET'])
 @require_auth
@@ -0,0 +1,263 @@
+"""
+Analytics
+Hourly throughput and latency rollups per DC and job type, built from the
+RwAutomator_Log timestamps.
+
+The worker calls refresh_rollups() every RW_ANALYTICS_ROLLUP_SECONDS. Each
+refresh only rebuilds the hours touched since the previous one, so the API
+reads a few small rollup rows instead of scanning the job log. Latencies are
+kept as fixed-bucket histograms, which can be merged across hours and DCs to
+estimate percentiles.
+"""
+
+import os
+from datetime import timedelta
+from lib.db import get_connection
+
+ROLLUP_NAME = 'hourly_stats'
+
+# Histogram bucket upper bounds in seconds; the last bucket counts everything above
+WAIT_BUCKETS = [10, 30, 60, 120, 300, 600, 1800, 3600]
+EXEC_BUCKETS = [5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300]
+
+# Jobs finishing around a refresh may commit late, so re-read a little history
+ROLLUP_OVERLAP = timedelta(minutes=5)
+
+def get_analytics_settings():
+    """
+    Rollup settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'rollup_seconds': int(os.getenv('RW_ANALYTICS_ROLLUP_SECONDS', '300')),
+        'backfill_days': int(os.getenv('RW_ANALYTICS_BACKFILL_DAYS', '30')),
+    }
+
+def _bucket(seconds, bounds):
+    """Index of the histogram bucket a duration falls in"""
+    for i, bound in enumerate(bounds):
+        if seconds <= bound:
+            return i
+    return len(bounds)
+
+def _parse_histogram(value, bounds):
+    counts = [int(c) for c in value.split(',')] if value else []
+    return counts + [0] * (len(bounds) + 1 - len(counts))
+
+def _percentile(counts, bounds, fraction):
+    """
+    Estimate a percentile from histogram counts
+
+    Returns the upper bound of the bucket holding the percentile (the last
+    bound when it falls in the overflow bucket), or None without data.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    target = total * fraction
+    running = 0
+    for i, count in enumerate(counts):
+        running += count
+        if running >= target:
+            return bounds[min(i, len(bounds) - 1)]
+    return bounds[-1]
+
+def refresh_rollups():
+    """
+    Bring the hourly rollups up to date
+
+    Rebuilds every hour from the last refresh (minus ROLLUP_OVERLAP) to now
+    from the jobs that reached a final status (success or failed) in it.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    settings = get_analytics_settings()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Lock the state row so concurrent workers don't rebuild the same hours
+        cursor.execute("""
+            SELECT rolled_up_to, GETDATE()
+            FROM RwAutomator_RollupState WITH (UPDLOCK, HOLDLOCK)
+            WHERE name = ?
+        """, (ROLLUP_NAME,))
+        row = cursor.fetchone()
+        if row:
+            rolled_up_to, now = row
+        else:
+            cursor.execute("SELECT GETDATE()")
+            now = cursor.fetchone()[0]
+            rolled_up_to = now - timedelta(days=settings['backfill_days'])
+            cursor.execute("""
+                INSERT INTO RwAutomator_RollupState (name, rolled_up_to) VALUES (?, ?)
+            """, (ROLLUP_NAME, rolled_up_to))
+
+        from_hour = (rolled_up_to - ROLLUP_OVERLAP).replace(minute=0, second=0, microsecond=0)
+
+        cursor.execute("""
+            SELECT distribution_center, job_type, status, requested_at, started_at, completed_at, send_attempts
+            FROM RwAutomator_Log
+            WHERE completed_at >= ? AND status IN ('success', 'failed')
+        """, (from_hour,))
+
+        rollups = {}
+        for dc, job_type, status, requested_at, started_at, completed_at, send_attempts in cursor.fetchall():
+            hour = completed_at.replace(minute=0, second=0, microsecond=0)
+            key = (hour, dc or '', job_type or '')
+            stats = rollups.get(key)
+            if not stats:
+                stats = rollups[key] = {
+                    'jobs': 0, 'succeeded': 0, 'failed': 0, 'attempts': 0,
+                    'wait_seconds_sum': 0, 'exec_seconds_sum': 0,
+                    'wait_histogram': [0] * (len(WAIT_BUCKETS) + 1),
+                    'exec_histogram': [0] * (len(EXEC_BUCKETS) + 1),
+                }
+
+            stats['jobs'] += 1
+            stats['succeeded' if status == 'success' else 'failed'] += 1
+            stats['attempts'] += send_attempts or 1
+
+            # started_at is the start of the last attempt, so the wait includes retry backoff
+            started_at = started_at or completed_at
+            wait_seconds = max(int((started_at - requested_at).total_seconds()), 0) if requested_at else 0
+            exec_seconds = max(int((completed_at - started_at).total_seconds()), 0)
+            stats['wait_seconds_sum'] += wait_seconds
+            stats['exec_seconds_sum'] += exec_seconds
+            stats['wait_histogram'][_bucket(wait_seconds, WAIT_BUCKETS)] += 1
+            stats['exec_histogram'][_bucket(exec_seconds, EXEC_BUCKETS)] += 1
+
+        cursor.execute("DELETE FROM RwAutomator_HourlyStats WHERE hour_start >= ?", (from_hour,))
+        rows = [
+            (hour, dc, job_type, s['jobs'], s['succeeded'], s['failed'], s['attempts'],
+             s['wait_seconds_sum'], s['exec_seconds_sum'],
+             ','.join(str(c) for c in s['wait_histogram']),
+             ','.join(str(c) for c in s['exec_histogram']))
+            for (hour, dc, job_type), s in rollups.items()
+        ]
+        if rows:
+            cursor.executemany("""
+                INSERT INTO RwAutomator_HourlyStats
+                (hour_start, distribution_center, job_type, jobs, succeeded, failed, attempts,
+                 wait_seconds_sum, exec_seconds_sum, wait_histogram, exec_histogram)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+        cursor.execute("UPDATE RwAutomator_RollupState SET rolled_up_to = ? WHERE name = ?", (now, ROLLUP_NAME))
+        conn.commit()
+        return len(rows)
+
+    finally:
+        conn.close()
+
+def _summarize(rows, hours):
+    """Merge rollup rows into one summary"""
+    jobs = sum(r['jobs'] for r in rows)
+    succeeded = sum(r['succeeded'] for r in rows)
+    attempts = sum(r['attempts'] for r in rows)
+    wait_counts = [sum(c) for c in zip(*(r['wait_histogram'] for r in rows))] if rows else []
+    exec_counts = [sum(c) for c in zip(*(r['exec_histogram'] for r in rows))] if rows else []
+
+    return {
+        'jobs': jobs,
+        'succeeded': succeeded,
+        'failed': jobs - succeeded,
+        'success_rate': round(succeeded * 100.0 / jobs, 1) if jobs else None,
+        'retries_per_job': round((attempts - jobs) / jobs, 2) if jobs else None,
+        'orders_per_hour': round(jobs / hours, 2) if hours else None,
+        'wait_seconds': {
+            'avg': round(sum(r['wait_seconds_sum'] for r in rows) / jobs, 1) if jobs else None,
+            'p50': _percentile(wait_counts, WAIT_BUCKETS, 0.5),
+            'p95': _percentile(wait_counts, WAIT_BUCKETS, 0.95),
+        },
+        'exec_seconds': {
+            'avg': round(sum(r['exec_seconds_sum'] for r in rows) / jobs, 1) if jobs else None,
+            'p50': _percentile(exec_counts, EXEC_BUCKETS, 0.5),
+            'p90': _percentile(exec_counts, EXEC_BUCKETS, 0.9),
+            'p95': _percentile(exec_counts, EXEC_BUCKETS, 0.95),
+            'p99': _percentile(exec_counts, EXEC_BUCKETS, 0.99),
+        },
+    }
+
+def get_analytics(hours=24, distribution_center=None, job_type=None):
+    """
+    Throughput and latency over the last N hours, from the rollups
+
+    Percentiles are bucket upper bounds (see WAIT_BUCKETS / EXEC_BUCKETS).
+
+    Args:
+        hours: Window size in hours
+        distribution_center: Only this DC (optional)
+        job_type: Only this job type (optional)
+
+    Returns:
+        dict: Overall summary, one summary per DC/job type, an hourly series,
+              and how far the rollups are up to date
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    query = """
+        SELECT hour_start, distribution_center, job_type, jobs, succeeded, failed, attempts,
+               wait_seconds_sum, exec_seconds_sum, wait_histogram, exec_histogram
+        FROM RwAutomator_HourlyStats
+        WHERE hour_start >= DATEADD(hour, -?, GETDATE())
+    """
+    params = [hours]
+    if distribution_center:
+        query += " AND distribution_center = ?"
+        params.append(distribution_center)
+    if job_type:
+        query += " AND job_type = ?"
+        params.append(job_type)
+    query += " ORDER BY hour_start"
+
+    cursor.execute(query, params)
+    rows = []
+    for row in cursor.fetchall():
+        rows.append({
+            'hour_start': row[0],
+            'distribution_center': row[1],
+            'job_type': row[2],
+            'jobs': row[3],
+            'succeeded': row[4],
+            'failed': row[5],
+            'attempts': row[6],
+            'wait_seconds_sum': row[7],
+            'exec_seconds_sum': row[8],
+            'wait_histogram': _parse_histogram(row[9], WAIT_BUCKETS),
+            'exec_histogram': _parse_histogram(row[10], EXEC_BUCKETS),
+        })
+
+    cursor.execute("SELECT rolled_up_to FROM RwAutomator_RollupState WHERE name = ?", (ROLLUP_NAME,))
+    state = cursor.fetchone()
+    conn.close()
+
+    groups = {}
+    by_hour = {}
+    for row in rows:
+        groups.setdefault((row['distribution_center'], row['job_type']), []).append(row)
+        by_hour.setdefault(row['hour_start'], []).append(row)
+
+    by_group = []
+    for (dc, group_job_type), group_rows in sorted(groups.items()):
+        summary = _summarize(group_rows, hours)
+        summary.update({'distribution_center': dc, 'job_type': group_job_type})
+        by_group.append(summary)
+
+    hourly = []
+    for hour_start, hour_rows in sorted(by_hour.items()):
+        summary = _summarize(hour_rows, 1)
+        summary['hour_start'] = hour_start.isoformat()
+        hourly.append(summary)
+
+    return {
+        'hours': hours,
+        'rolled_up_to': state[0].isoformat() if state else None,
+        'totals': _summarize(rows, hours),
+        'by_group': by_group,
+        'hourly': hourly,
+    }
@@ -0,0 +1,33 @@
+"""
+Storage Backends
+Where the job store lives, picked with RW_DB_BACKEND:
+
+    mssql  - SQL Server through pyodbc (default)
+    sqlite - embedded SQLite database in WAL mode, for small sites,
+             benchmarks and local runs without a remote database
+
+Every module writes its queries in the SQL Server dialect against the
+connection from lib.db.get_connection(); the SQLite backend translates them.
+"""
+
+import os
+
+def get_backend_name():
+    """Configured backend name"""
+    return os.getenv('RW_DB_BACKEND', 'mssql').lower()
+
+def get_backend():
+    """
+    Backend module for RW_DB_BACKEND
+
+    Returns:
+        module: Module with connect(), integrity_error() and load_driver()
+    """
+    name = get_backend_name()
+    if name == 'sqlite':
+        from lib.backends import sqlite
+        return sqlite
+    if name == 'mssql':
+        from lib.backends import mssql
+        return mssql
+    raise ValueError(f'Unknown RW_DB_BACKEND "{name}" (expected mssql or sqlite)')
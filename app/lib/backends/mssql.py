@@ -0,0 +1,29 @@
+"""
+SQL Server Backend
+The production job store, reached through pyodbc and ODBC Driver 18
+"""
+
+import os
+
+def load_driver():
+    """Import the database driver (pyodbc is imported on first use so importing lib.db stays cheap)"""
+    import pyodbc
+    return pyodbc
+
+def connect():
+    """Create and return a SQL Server connection"""
+    pyodbc = load_driver()
+
+    conn_str = (
+        f"DRIVER={{ODBC Driver 18 for SQL Server}};"
+        f"SERVER={os.getenv('MSSQL_SERVER')};"
+        f"DATABASE={os.getenv('MSSQL_DATABASE')};"
+        f"UID={os.getenv('MSSQL_USERNAME')};"
+        f"PWD={os.getenv('MSSQL_PASSWORD')};"
+        f"TrustServerCertificate=yes;"  # Allowing self-signed cert
+    )
+    return pyodbc.connect(conn_str)
+
+def integrity_error():
+    """Exception raised on unique constraint violations"""
+    return load_driver().IntegrityError
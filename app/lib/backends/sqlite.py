@@ -0,0 +1,241 @@
+"""
+SQLite Backend
+Embedded job store in a single SQLite file (RW_SQLITE_PATH), in WAL mode so
+the API can read while the worker writes.
+
+Queries arrive in the SQL Server dialect used throughout lib/ and are
+translated on the way in:
+
+    GETDATE()                        -> local time, millisecond precision
+    DATEADD(unit, n, expr)           -> strftime(..., expr, n || ' units');
+                                        n and expr may not both be parameters
+    DATEDIFF(unit, a, b)             -> julianday arithmetic
+    OFFSET x ROWS FETCH NEXT y ...   -> LIMIT y OFFSET x
+    WITH (UPDLOCK, HOLDLOCK)         -> dropped; the transaction starts with
+                                        BEGIN IMMEDIATE instead
+
+Timestamps are stored as 'YYYY-MM-DD HH:MM:SS.fff' text, which sorts and
+compares correctly, and come back out as datetime objects like pyodbc's.
+The schema is created from sqlite_migrations/ on first use.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sqlite_migrations')
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%f'
+TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d{3}|\.\d{6})?$')
+
+DATEADD_UNITS = {'second': 'seconds', 'minute': 'minutes', 'hour': 'hours', 'day': 'days'}
+DATEDIFF_FACTORS = {'millisecond': 86400000, 'second': 86400, 'minute': 1440, 'hour': 24, 'day': 1}
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+def _adapt_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S.') + f'{value.microsecond // 1000:03d}'
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+
+def load_driver():
+    """sqlite3 ships with Python"""
+    return sqlite3
+
+def integrity_error():
+    """Exception raised on unique constraint violations"""
+    return sqlite3.IntegrityError
+
+def get_path():
+    return os.getenv('RW_SQLITE_PATH', '/app/data/rwautomator.db')
+
+def _split_args(sql, start):
+    """Split the arguments of a function call whose '(' ends at start; returns (args, end)"""
+    depth = 1
+    args = []
+    arg_start = start
+    i = start
+    while depth:
+        char = sql[i]
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if not depth:
+                args.append(sql[arg_start:i].strip())
+        elif char == ',' and depth == 1:
+            args.append(sql[arg_start:i].strip())
+            arg_start = i + 1
+        i += 1
+    return args, i
+
+def _replace_calls(sql, name, render):
+    """Replace every name(...) call with render(args), innermost arguments first"""
+    pattern = re.compile(rf'\b{name}\s*\(', re.IGNORECASE)
+    out = []
+    i = 0
+    while True:
+        match = pattern.search(sql, i)
+        if not match:
+            out.append(sql[i:])
+            return ''.join(out)
+        out.append(sql[i:match.start()])
+        args, i = _split_args(sql, match.end())
+        out.append(render([_replace_calls(arg, name, render) for arg in args]))
+
+def _render_dateadd(args):
+    unit, amount, expr = args
+    # strftime takes the date before the amount, which would swap the two parameters
+    if '?' in amount and '?' in expr:
+        raise ValueError('DATEADD with parameters in both amount and date is not supported on SQLite')
+    return f"strftime('{TIMESTAMP_FORMAT}', {expr}, ({amount}) || ' {DATEADD_UNITS[unit.lower()]}')"
+
+def _render_datediff(args):
+    unit, start, end = args
+    factor = DATEDIFF_FACTORS[unit.lower()]
+    # Keeps start before end so '?' placeholders stay in order
+    return f"CAST(ROUND((- julianday({start}) + julianday({end})) * {factor}) AS INTEGER)"
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """
+    Translate a SQL Server statement to SQLite
+
+    Returns:
+        tuple: (sql, locking, swap) where locking asks for BEGIN IMMEDIATE and
+               swap is the index of an OFFSET/FETCH parameter pair to swap, or None
+    """
+    locking = bool(re.search(r'\bUPDLOCK\b', sql, re.IGNORECASE))
+    sql = re.sub(r'\s+WITH\s*\((?:\s*(?:UPDLOCK|HOLDLOCK|ROWLOCK|NOLOCK)\s*,?)+\)', '', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bGETDATE\(\)', f"strftime('{TIMESTAMP_FORMAT}', 'now', 'localtime')", sql, flags=re.IGNORECASE)
+    sql = _replace_calls(sql, 'DATEDIFF', _render_datediff)
+    sql = _replace_calls(sql, 'DATEADD', _render_dateadd)
+
+    swap = None
+    match = re.search(r'\bOFFSET\s+(\S+)\s+ROWS\s+FETCH\s+NEXT\s+(\S+)\s+ROWS\s+ONLY', sql, re.IGNORECASE)
+    if match:
+        offset, limit = match.groups()
+        if offset == '?' and limit == '?':
+            swap = sql[:match.start()].count('?')
+        sql = f"{sql[:match.start()]}LIMIT {limit} OFFSET {offset}{sql[match.end():]}"
+
+    return sql, locking, swap
+
+def _convert(row):
+    """Timestamps back to datetime, like pyodbc returns them"""
+    if row is None:
+        return None
+    return tuple(
+        datetime.fromisoformat(value) if isinstance(value, str) and TIMESTAMP_PATTERN.match(value) else value
+        for value in row
+    )
+
+
+class Cursor:
+    """sqlite3 cursor that accepts the SQL Server dialect"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.cursor()
+        self.fast_executemany = False  # pyodbc option, meaningless here
+
+    def _prepare(self, sql, params):
+        sql, locking, swap = translate(sql)
+        params = list(params or ())
+        if swap is not None:
+            params[swap], params[swap + 1] = params[swap + 1], params[swap]
+        if locking and not self._conn.in_transaction:
+            self._conn.execute('BEGIN IMMEDIATE')
+        return sql, params
+
+    def execute(self, sql, params=()):
+        sql, params = self._prepare(sql, params)
+        self._cursor.execute(sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        sql, locking, _ = translate(sql)
+        if locking and not self._conn.in_transaction:
+            self._conn.execute('BEGIN IMMEDIATE')
+        self._cursor.executemany(sql, [list(params) for params in seq_of_params])
+        return self
+
+    def fetchone(self):
+        return _convert(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [_convert(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return [_convert(row) for row in rows]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield _convert(row)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """sqlite3 connection with the pyodbc surface lib/ uses"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return Cursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+def migrate(conn, path):
+    """Apply sqlite_migrations/NNN_*.sql newer than the database's user_version"""
+    with _migrate_lock:
+        if path in _migrated:
+            return
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if not name.endswith('.sql'):
+                continue
+            number = int(name.split('_', 1)[0])
+            if number <= version:
+                continue
+            with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+                conn.executescript(f.read())
+            conn.execute(f'PRAGMA user_version = {number}')
+        _migrated.add(path)
+
+def connect():
+    """Open the SQLite job store, creating it on first use"""
+    path = get_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Writers wait for each other rather than failing with "database is locked"
+    busy_timeout_ms = int(os.getenv('RW_SQLITE_BUSY_TIMEOUT_MS', '30000'))
+    conn = sqlite3.connect(path, timeout=busy_timeout_ms / 1000.0)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    migrate(conn, path)
+    return Connection(conn)
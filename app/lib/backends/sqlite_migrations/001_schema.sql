@@ -0,0 +1,117 @@
+-- Embedded job store: the SQL Server schema (base table plus sql/001-010) in SQLite types.
+-- Timestamps are 'YYYY-MM-DD HH:MM:SS.fff' local time text.
+
+CREATE TABLE IF NOT EXISTS RwAutomator_Log (
+    job_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,
+    order_number VARCHAR(50) NULL,
+    distribution_center VARCHAR(10) NULL,
+    rw_user VARCHAR(100) NULL,
+    ticket_number VARCHAR(50) NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    requested_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+    started_at DATETIME NULL,
+    completed_at DATETIME NULL,
+    result_message TEXT NULL,
+    response_data TEXT NULL,
+    log_file_path VARCHAR(500) NULL,
+    send_attempts INT NOT NULL DEFAULT 0,
+    priority TINYINT NOT NULL DEFAULT 1,
+    next_attempt_at DATETIME NULL,
+    failure_class VARCHAR(20) NULL,
+    dedupe_key VARCHAR(100) NULL,
+    idempotency_key VARCHAR(200) NULL,
+    worker_id VARCHAR(36) NULL,
+    checkpoint_step VARCHAR(30) NULL,
+    checkpoint_ship_total VARCHAR(20) NULL,
+    checkpoint_at DATETIME NULL,
+    batch_id VARCHAR(36) NULL
+);
+
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_Log_queue ON RwAutomator_Log (status, priority, requested_at);
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_Log_requested_at ON RwAutomator_Log (requested_at);
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_Log_order_number ON RwAutomator_Log (order_number);
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_Log_processing ON RwAutomator_Log (status, started_at);
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_Log_completed_at ON RwAutomator_Log (completed_at);
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_Log_batch_id ON RwAutomator_Log (batch_id) WHERE batch_id IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS UX_RwAutomator_Log_dedupe_key
+    ON RwAutomator_Log (dedupe_key) WHERE dedupe_key IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS UX_RwAutomator_Log_idempotency_key
+    ON RwAutomator_Log (idempotency_key) WHERE idempotency_key IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS RwAutomator_HostState (
+    host VARCHAR(100) NOT NULL PRIMARY KEY,
+    breaker_state VARCHAR(10) NOT NULL DEFAULT 'closed',
+    consecutive_failures INT NOT NULL DEFAULT 0,
+    opened_at DATETIME NULL,
+    open_until DATETIME NULL,
+    login_tokens FLOAT NOT NULL DEFAULT 0,
+    tokens_updated_at DATETIME NULL,
+    updated_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS RwAutomator_HostSession (
+    session_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    host VARCHAR(100) NOT NULL,
+    job_id VARCHAR(36) NULL,
+    leased_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_HostSession_host ON RwAutomator_HostSession (host, leased_at);
+
+CREATE TABLE IF NOT EXISTS RwAutomator_OrderCache (
+    distribution_center VARCHAR(10) NOT NULL,
+    order_number VARCHAR(50) NOT NULL,
+    not_on_file BIT NOT NULL DEFAULT 0,
+    ship_total VARCHAR(20) NULL,
+    cached_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+    PRIMARY KEY (distribution_center, order_number)
+);
+
+CREATE TABLE IF NOT EXISTS RwAutomator_Worker (
+    worker_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    hostname VARCHAR(100) NULL,
+    pid INT NULL,
+    concurrency INT NOT NULL DEFAULT 1,
+    jobs_running INT NOT NULL DEFAULT 0,
+    jobs_completed INT NOT NULL DEFAULT 0,
+    started_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+    heartbeat_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS RwAutomator_Batch (
+    batch_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    job_type VARCHAR(50) NULL,
+    distribution_center VARCHAR(10) NULL,
+    rw_user VARCHAR(100) NULL,
+    ticket_number VARCHAR(50) NULL,
+    total INT NOT NULL DEFAULT 0,
+    pending INT NOT NULL DEFAULT 0,
+    processing INT NOT NULL DEFAULT 0,
+    success INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+    first_started_at DATETIME NULL,
+    last_completed_at DATETIME NULL,
+    updated_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS RwAutomator_HourlyStats (
+    hour_start DATETIME NOT NULL,
+    distribution_center VARCHAR(10) NOT NULL,
+    job_type VARCHAR(50) NOT NULL,
+    jobs INT NOT NULL DEFAULT 0,
+    succeeded INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    wait_seconds_sum BIGINT NOT NULL DEFAULT 0,
+    exec_seconds_sum BIGINT NOT NULL DEFAULT 0,
+    wait_histogram VARCHAR(200) NOT NULL DEFAULT '',
+    exec_histogram VARCHAR(200) NOT NULL DEFAULT '',
+    PRIMARY KEY (hour_start, distribution_center, job_type)
+);
+
+CREATE TABLE IF NOT EXISTS RwAutomator_RollupState (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    rolled_up_to DATETIME NOT NULL
+);
@@ -0,0 +1,11 @@
+-- sql/011_screen_timing.sql
+CREATE TABLE IF NOT EXISTS RwAutomator_ScreenTiming (
+    host VARCHAR(100) NOT NULL,
+    distribution_center VARCHAR(10) NOT NULL,
+    step VARCHAR(60) NOT NULL,
+    histogram VARCHAR(400) NOT NULL DEFAULT '',
+    observations INT NOT NULL DEFAULT 0,
+    timeouts INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+    PRIMARY KEY (host, distribution_center, step)
+);
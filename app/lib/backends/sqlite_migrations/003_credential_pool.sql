@@ -0,0 +1,12 @@
+-- sql/012_credential_pool.sql
+ALTER TABLE RwAutomator_HostSession ADD COLUMN credential VARCHAR(50) NULL;
+
+CREATE TABLE IF NOT EXISTS RwAutomator_Credential (
+    host VARCHAR(100) NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    logins INT NOT NULL DEFAULT 0,
+    jobs INT NOT NULL DEFAULT 0,
+    failures INT NOT NULL DEFAULT 0,
+    last_used_at DATETIME NULL,
+    PRIMARY KEY (host, name)
+);
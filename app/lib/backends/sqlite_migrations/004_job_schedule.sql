@@ -0,0 +1,3 @@
+-- sql/013_job_schedule.sql
+ALTER TABLE RwAutomator_Log ADD COLUMN not_before DATETIME NULL;
+ALTER TABLE RwAutomator_Log ADD COLUMN execution_window VARCHAR(11) NULL;
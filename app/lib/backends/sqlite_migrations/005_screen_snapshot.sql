@@ -0,0 +1,16 @@
+-- sql/014_screen_snapshot.sql
+CREATE TABLE IF NOT EXISTS RwAutomator_Snapshot (
+    content_hash CHAR(64) NOT NULL PRIMARY KEY,
+    content BLOB NOT NULL,
+    length INT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS RwAutomator_JobSnapshot (
+    job_id VARCHAR(36) NOT NULL,
+    seq INT NOT NULL,
+    step VARCHAR(100) NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    captured_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+    PRIMARY KEY (job_id, seq)
+);
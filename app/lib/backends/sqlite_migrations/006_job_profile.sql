@@ -0,0 +1,2 @@
+-- sql/015_job_profile.sql
+ALTER TABLE RwAutomator_Log ADD COLUMN profile BIT NOT NULL DEFAULT 0;
@@ -0,0 +1,26 @@
+-- sql/016_change_version.sql
+CREATE TABLE IF NOT EXISTS RwAutomator_ChangeVersion (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+INSERT OR IGNORE INTO RwAutomator_ChangeVersion (name, version) VALUES ('jobs', 0);
+
+CREATE TRIGGER IF NOT EXISTS TR_RwAutomator_Log_ChangeVersion_Insert AFTER INSERT ON RwAutomator_Log
+BEGIN
+    UPDATE RwAutomator_ChangeVersion SET version = version + 1,
+        changed_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') WHERE name = 'jobs';
+END;
+
+CREATE TRIGGER IF NOT EXISTS TR_RwAutomator_Log_ChangeVersion_Update AFTER UPDATE ON RwAutomator_Log
+BEGIN
+    UPDATE RwAutomator_ChangeVersion SET version = version + 1,
+        changed_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') WHERE name = 'jobs';
+END;
+
+CREATE TRIGGER IF NOT EXISTS TR_RwAutomator_Log_ChangeVersion_Delete AFTER DELETE ON RwAutomator_Log
+BEGIN
+    UPDATE RwAutomator_ChangeVersion SET version = version + 1,
+        changed_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') WHERE name = 'jobs';
+END;
@@ -0,0 +1,21 @@
+-- sql/017_job_row_version.sql; SQLite has no rowversion, so triggers stamp the written row with the next version
+DROP TRIGGER IF EXISTS TR_RwAutomator_Log_ChangeVersion_Insert;
+DROP TRIGGER IF EXISTS TR_RwAutomator_Log_ChangeVersion_Update;
+DROP TRIGGER IF EXISTS TR_RwAutomator_Log_ChangeVersion_Delete;
+DROP TABLE IF EXISTS RwAutomator_ChangeVersion;
+
+ALTER TABLE RwAutomator_Log ADD COLUMN row_version BIGINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_Log_row_version ON RwAutomator_Log (row_version);
+
+CREATE TRIGGER IF NOT EXISTS TR_RwAutomator_Log_RowVersion_Insert AFTER INSERT ON RwAutomator_Log
+BEGIN
+    UPDATE RwAutomator_Log SET row_version = (SELECT MAX(row_version) + 1 FROM RwAutomator_Log)
+    WHERE job_id = NEW.job_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS TR_RwAutomator_Log_RowVersion_Update AFTER UPDATE ON RwAutomator_Log
+WHEN NEW.row_version = OLD.row_version
+BEGIN
+    UPDATE RwAutomator_Log SET row_version = (SELECT MAX(row_version) + 1 FROM RwAutomator_Log)
+    WHERE job_id = NEW.job_id;
+END;
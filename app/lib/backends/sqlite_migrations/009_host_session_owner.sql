@@ -0,0 +1,3 @@
+-- sql/018_host_session_owner.sql
+ALTER TABLE RwAutomator_HostSession ADD COLUMN owner VARCHAR(100) NULL;
+CREATE INDEX IF NOT EXISTS IX_RwAutomator_HostSession_owner ON RwAutomator_HostSession (owner);
@@ -0,0 +1,122 @@
+"""
+Batch Import
+Streams a CSV of orders (order, DC, ticket) into pending reset jobs, chunk by chunk,
+without holding the file in memory.
+"""
+
+import csv
+import codecs
+import os
+import re
+import uuid
+from lib.db import create_job_records
+from lib.batches import create_batch
+from lib.functions import get_valid_distribution_centers
+
+ORDER_NUMBER_PATTERN = re.compile(r'^[A-Za-z0-9-]{1,50}$')
+
+# Rejected rows reported back to the caller; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+def iter_csv_rows(stream, default_dc='', default_ticket=''):
+    """
+    Parse and validate CSV rows one at a time
+
+    Columns are order number, then optional distribution center and ticket
+    number (falling back to the defaults). A header row is skipped.
+
+    Args:
+        stream: Binary file-like object (e.g. an uploaded file's stream)
+        default_dc: DC for rows without one
+        default_ticket: Ticket number for rows without one
+
+    Yields:
+        tuple: (line_number, order_number, distribution_center, ticket_number, error)
+    """
+    valid_distribution_centers = get_valid_distribution_centers()
+    # Not io.TextIOWrapper: uploads spooled to SpooledTemporaryFile lack .readable() before Python 3.11
+    text = codecs.getreader('utf-8-sig')(stream)
+
+    for line_number, row in enumerate(csv.reader(text), start=1):
+        cells = [cell.strip() for cell in row]
+        if not any(cells):
+            continue
+
+        order_number = cells[0]
+        dc = cells[1] if len(cells) > 1 and cells[1] else default_dc
+        ticket_number = cells[2] if len(cells) > 2 and cells[2] else default_ticket
+
+        if line_number == 1 and order_number.lower().replace(' ', '_') in ('order', 'order_number', 'order#', 'order_#'):
+            continue
+
+        # Spreadsheets like to drop the leading zero of "05"
+        if dc.isdigit() and len(dc) == 1:
+            dc = dc.zfill(2)
+
+        if not ORDER_NUMBER_PATTERN.match(order_number):
+            yield line_number, order_number, dc, ticket_number, f'Invalid order number "{order_number}"'
+        elif dc not in valid_distribution_centers:
+            yield line_number, order_number, dc, ticket_number, f'Invalid distribution center "{dc}"'
+        else:
+            yield line_number, order_number, dc, ticket_number, None
+
+def import_reset_batch(stream, job_type, rw_user, priority, default_dc='', default_ticket='', batch_id=None,
+                       not_before=None, execution_window=None):
+    """
+    Queue reset jobs for every valid row of a CSV upload
+
+    Args:
+        stream: Binary file-like object with the CSV
+        job_type: Job type recorded on every job
+        rw_user: Submitting user
+        priority: Priority class (lib.scheduler)
+        default_dc: DC for rows without one
+        default_ticket: Ticket number for rows without one
+        batch_id: Existing batch to attach the jobs to (a new one is created if omitted)
+        not_before: Earliest start of every job (lib.scheduler.parse_schedule)
+        execution_window: Daily HH:MM-HH:MM window the jobs may start in
+
+    Returns:
+        dict: batch_id and counts of rows, queued, duplicates and rejected jobs
+    """
+    chunk_size = int(os.getenv('RW_IMPORT_CHUNK_SIZE', '500'))
+    if not batch_id:
+        batch_id = str(uuid.uuid4())
+        create_batch(batch_id, job_type, rw_user, default_dc, default_ticket)
+
+    summary = {'batch_id': batch_id, 'rows': 0, 'queued': 0, 'duplicates': 0, 'rejected': 0, 'errors': []}
+    chunk = []
+
+    def flush():
+        created, duplicates = create_job_records(chunk)
+        summary['queued'] += created
+        summary['duplicates'] += duplicates
+        chunk.clear()
+
+    for line_number, order_number, dc, ticket_number, error in iter_csv_rows(stream, default_dc, default_ticket):
+        summary['rows'] += 1
+        if error:
+            summary['rejected'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append({'line': line_number, 'error': error})
+            continue
+
+        chunk.append({
+            'job_id': str(uuid.uuid4()),
+            'job_type': job_type,
+            'order_number': order_number,
+            'distribution_center': dc,
+            'rw_user': rw_user,
+            'ticket_number': ticket_number,
+            'priority': priority,
+            'batch_id': batch_id,
+            'not_before': not_before,
+            'execution_window': execution_window,
+        })
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    return summary
@@ -0,0 +1,160 @@
+"""
+Batches
+A batch groups the jobs of one batch submission or CSV upload.
+
+RwAutomator_Batch keeps pending/processing/success/failed counters that
+update_job_status moves on every transition, so progress is a single-row read.
+"""
+
+import os
+import json
+import uuid
+from lib.db import get_connection, create_job_records
+
+def create_batch(batch_id, job_type, rw_user, distribution_center=None, ticket_number=''):
+    """
+    Create an empty batch; its counters grow as jobs are queued into it
+
+    Args:
+        batch_id: New batch ID
+        job_type: Job type of the batch's jobs
+        rw_user: Submitting user
+        distribution_center: DC, if the whole batch is for one
+        ticket_number: Ticket number, if the whole batch is for one
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    insert_batch(cursor, batch_id, job_type, rw_user, distribution_center, ticket_number)
+    conn.commit()
+    conn.close()
+
+def insert_batch(cursor, batch_id, job_type, rw_user, distribution_center=None, ticket_number=''):
+    """create_batch() in the caller's transaction"""
+    cursor.execute("""
+        INSERT INTO RwAutomator_Batch
+        (batch_id, job_type, distribution_center, rw_user, ticket_number, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, GETDATE(), GETDATE())
+    """, (batch_id, job_type, distribution_center or None, rw_user, ticket_number))
+
+def get_batch_progress(batch_id):
+    """
+    Progress of a batch, with throughput and ETA
+
+    Throughput is completed jobs per minute since the first job started;
+    the ETA assumes the remaining jobs go at the same rate.
+
+    Returns:
+        dict: Batch counters, throughput and ETA, or None if the batch doesn't exist
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT batch_id, job_type, distribution_center, rw_user, ticket_number,
+               total, pending, processing, success, failed,
+               created_at, first_started_at, last_completed_at, updated_at,
+               DATEDIFF(second, first_started_at, GETDATE())
+        FROM RwAutomator_Batch
+        WHERE batch_id = ?
+    """, (batch_id,))
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row:
+        return None
+
+    total, pending, processing, success, failed = row[5:10]
+    completed = success + failed
+    remaining = pending + processing
+    elapsed = row[14]
+
+    throughput = None
+    eta_seconds = None
+    if completed and elapsed:
+        throughput = completed * 60.0 / elapsed
+        eta_seconds = int(remaining * 60 / throughput)
+
+    return {
+        'batch_id': row[0],
+        'job_type': row[1],
+        'distribution_center': row[2],
+        'rw_user': row[3],
+        'ticket_number': row[4],
+        'total': total,
+        'pending': pending,
+        'processing': processing,
+        'success': success,
+        'failed': failed,
+        'completed': completed,
+        'percent_complete': round(completed * 100.0 / total, 1) if total else 0.0,
+        'done': total > 0 and remaining == 0,
+        'throughput_per_minute': round(throughput, 2) if throughput is not None else None,
+        'eta_seconds': eta_seconds if remaining else 0,
+        'created_at': row[10].isoformat() if row[10] else None,
+        'first_started_at': row[11].isoformat() if row[11] else None,
+        'last_completed_at': row[12].isoformat() if row[12] else None,
+        'updated_at': row[13].isoformat() if row[13] else None
+    }
+
+def queue_orders(batch_id, job_type, order_numbers, distribution_center, rw_user, ticket_number='', priority=2):
+    """
+    Queue one job per order into a batch, in chunks of RW_IMPORT_CHUNK_SIZE
+
+    Returns:
+        tuple: (queued, duplicates) counts
+    """
+    chunk_size = int(os.getenv('RW_IMPORT_CHUNK_SIZE', '500'))
+    queued = duplicates = 0
+    for start in range(0, len(order_numbers), chunk_size):
+        created, skipped = create_job_records([
+            {
+                'job_id': str(uuid.uuid4()),
+                'job_type': job_type,
+                'order_number': order_number,
+                'distribution_center': distribution_center,
+                'rw_user': rw_user,
+                'ticket_number': ticket_number,
+                'priority': priority,
+                'batch_id': batch_id,
+            }
+            for order_number in order_numbers[start:start + chunk_size]
+        ])
+        queued += created
+        duplicates += skipped
+    return queued, duplicates
+
+def get_batch_results(batch_id):
+    """
+    Jobs of a batch with their outcome
+
+    Returns:
+        list: Dicts with job_id, order_number, distribution_center, status,
+              result_message and result (the job's response_data, decoded), in order number order
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT job_id, order_number, distribution_center, status, result_message, response_data
+        FROM RwAutomator_Log
+        WHERE batch_id = ?
+        ORDER BY order_number
+    """, (batch_id,))
+
+    results = []
+    for row in cursor.fetchall():
+        try:
+            result = json.loads(row[5]) if row[5] else None
+        except ValueError:
+            result = None
+        results.append({
+            'job_id': row[0],
+            'order_number': row[1],
+            'distribution_center': row[2],
+            'status': row[3],
+            'result_message': row[4],
+            'result': result,
+        })
+
+    conn.close()
+    return results
@@ -0,0 +1,110 @@
+"""
+Credential Pool
+RealWorld logins the automation can run sessions under in parallel.
+
+The host licenses and locks per login, so each telnet/employee credential
+pair has its own session limit. The pool is read from the JSON file named by
+RW_CREDENTIALS_FILE:
+
+    [
+        {"name": "auto1", "username": "rwuser1", "password": "...",
+         "employee_number": "123", "employee_password": "...", "max_sessions": 1},
+        ...
+    ]
+
+Without a file, RW_USERNAME, RW_PASSWORD, RW_EMPLOYEE_NUMBER and
+RW_EMPLOYEE_PASSWORD make up a single 'default' credential limited to
+RW_MAX_SESSIONS, which is how the automation always ran.
+
+The host guard leases a credential with every session (lib.host_guard) and
+keeps per-credential usage in RwAutomator_Credential.
+"""
+
+import os
+import json
+
+DEFAULT = 'default'
+
+_cache = {}  # (path, mtime) -> credentials
+
+def _default_credential():
+    return {
+        'name': DEFAULT,
+        'username': os.getenv('RW_USERNAME', ''),
+        'password': os.getenv('RW_PASSWORD', ''),
+        'employee_number': os.getenv('RW_EMPLOYEE_NUMBER', ''),
+        'employee_password': os.getenv('RW_EMPLOYEE_PASSWORD', ''),
+        'max_sessions': int(os.getenv('RW_MAX_SESSIONS', '2')),
+    }
+
+def load_credentials():
+    """
+    Credentials in the pool, in the order they are configured
+
+    The file is re-read when it changes.
+
+    Returns:
+        list: Dicts with name, username, password, employee_number,
+              employee_password and max_sessions
+
+    Raises:
+        ValueError: If the file is not a list of credentials with unique names
+    """
+    path = os.getenv('RW_CREDENTIALS_FILE', '')
+    if not path:
+        return [_default_credential()]
+
+    key = (path, os.path.getmtime(path))
+    if key in _cache:
+        return _cache[key]
+
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f'{path} must hold a non-empty list of credentials')
+
+    credentials = []
+    for entry in entries:
+        credential = {
+            'name': str(entry.get('name') or entry.get('username') or ''),
+            'username': entry.get('username', ''),
+            'password': entry.get('password', ''),
+            'employee_number': str(entry.get('employee_number', '')),
+            'employee_password': entry.get('employee_password', ''),
+            'max_sessions': int(entry.get('max_sessions', 1)),
+        }
+        if not credential['name'] or not credential['username']:
+            raise ValueError(f'{path}: every credential needs a username')
+        credentials.append(credential)
+
+    names = [c['name'] for c in credentials]
+    if len(set(names)) != len(names):
+        raise ValueError(f'{path}: credential names must be unique')
+
+    _cache.clear()
+    _cache[key] = credentials
+    return credentials
+
+def get_credential(name=None):
+    """
+    One credential by name (the first one without a name)
+
+    Returns:
+        dict: The credential, or None if there is no such name in the pool
+    """
+    credentials = load_credentials()
+    if not name:
+        return credentials[0]
+    for credential in credentials:
+        if credential['name'] == name:
+            return credential
+    return None
+
+def describe(credential):
+    """Credential for logs and the API, without passwords"""
+    return {
+        'name': credential['name'],
+        'username': credential['username'],
+        'employee_number': credential['employee_number'],
+        'max_sessions': credential['max_sessions'],
+    }
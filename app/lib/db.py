@@ -1,33 +1,248 @@
-import pyodbc
 import os
 from datetime import datetime
+from lib.retry import classify_failure, get_max_attempts, get_retry_delay, PERMANENT
 
 def get_connection():
-    """Create and return a SQL Server connection"""
-    conn_str = (
-        f"DRIVER={{ODBC Driver 18 for SQL Server}};"
-        f"SERVER={os.getenv('MSSQL_SERVER')};"
-        f"DATABASE={os.getenv('MSSQL_DATABASE')};"
-        f"UID={os.getenv('MSSQL_USERNAME')};"
-        f"PWD={os.getenv('MSSQL_PASSWORD')};"
-        f"TrustServerCertificate=yes;"  # Allowing self-signed cert
-    )
-    return pyodbc.connect(conn_str)
-
-def create_job_record(job_id, job_type, order_number, distribution_center, rw_user=None, ticket_number=''):
-    """Create initial job record with pending status"""
+    """Create and return a job store connection (SQL Server, or SQLite with RW_DB_BACKEND=sqlite)"""
+    from lib.backends import get_backend
+    return get_backend().connect()
+
+def integrity_error():
+    """Unique constraint violation exception of the configured backend"""
+    from lib.backends import get_backend
+    return get_backend().integrity_error()
+
+def get_change_version():
+    """
+    Version of the job table: the highest row_version, which every insert and update raises
+
+    Returns:
+        int: Version (0 for an empty table)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT CAST(MAX(row_version) AS BIGINT) FROM RwAutomator_Log")
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] or 0
+
+def get_dedupe_key(job_type, distribution_center, order_number):
+    """Key that identifies redundant in-flight work of the same kind for the same order"""
+    from lib.jobs import job_kind
+    return f"{job_kind(job_type)}:{distribution_center}:{order_number}"
+
+def find_existing_job(dedupe_key=None, idempotency_key=None):
+    """
+    Find a job that makes a new submission redundant
+
+    Args:
+        dedupe_key: In-flight key from get_dedupe_key (only set while a job is not terminal)
+        idempotency_key: Client supplied idempotency key (kept for the life of the job)
+
+    Returns:
+        str: Existing job_id, or None
+    """
     conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        INSERT INTO RwAutomator_Log 
-        (job_id, job_type, order_number, distribution_center, rw_user, status, ticket_number)
-        VALUES (?, ?, ?, ?, ?, 'pending', ?)
-    """, (job_id, job_type, order_number, distribution_center, rw_user, ticket_number))
+    row = None
+    if idempotency_key:
+        cursor.execute("SELECT job_id FROM RwAutomator_Log WHERE idempotency_key = ?", (idempotency_key,))
+        row = cursor.fetchone()
+    if not row and dedupe_key:
+        cursor.execute("SELECT job_id FROM RwAutomator_Log WHERE dedupe_key = ?", (dedupe_key,))
+        row = cursor.fetchone()
+    
+    conn.close()
+    return row[0] if row else None
+
+def create_job_record(job_id, job_type, order_number, distribution_center, rw_user=None, ticket_number='', priority=1,
+                      idempotency_key=None, batch_id=None, not_before=None, execution_window=None, profile=False):
+    """
+    Create initial job record with pending status, unless the same order is already in flight
+
+    The unique filtered indexes on dedupe_key and idempotency_key make the
+    check safe against concurrent submissions: a losing insert is answered
+    with the job that won.
+
+    not_before (datetime) and execution_window ('HH:MM-HH:MM') defer the job;
+    see lib.scheduler.releasable_jobs. profile asks for a cProfile capture of
+    the run (lib.profiling). A submission without them that duplicates a
+    deferred job promotes that job (see promote_job) rather than waiting for
+    its window.
+
+    Returns:
+        tuple: (job_id, created) - the existing job_id and False for a duplicate
+    """
+    dedupe_key = get_dedupe_key(job_type, distribution_center, order_number)
+    existing_job_id = find_existing_job(dedupe_key, idempotency_key)
+    if existing_job_id:
+        if not not_before and not execution_window:
+            promote_job(existing_job_id, priority)
+        return existing_job_id, False
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            INSERT INTO RwAutomator_Log 
+            (job_id, job_type, order_number, distribution_center, rw_user, status, ticket_number, priority,
+             dedupe_key, idempotency_key, batch_id, not_before, execution_window, profile)
+            VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (job_id, job_type, order_number, distribution_center, rw_user, ticket_number, priority,
+              dedupe_key, idempotency_key, batch_id, not_before, execution_window, 1 if profile else 0))
+        if batch_id:
+            cursor.execute("""
+                UPDATE RwAutomator_Batch SET total = total + 1, pending = pending + 1, updated_at = GETDATE()
+                WHERE batch_id = ?
+            """, (batch_id,))
+        conn.commit()
+    except integrity_error():
+        conn.rollback()
+        existing_job_id = find_existing_job(dedupe_key, idempotency_key)
+        if existing_job_id:
+            if not not_before and not execution_window:
+                promote_job(existing_job_id, priority)
+            return existing_job_id, False
+        raise
+    finally:
+        conn.close()
     
+    return job_id, True
+
+def promote_job(job_id, priority):
+    """
+    Make a queued job run as soon as possible for an immediate submission of
+    the same order: clear its not_before and execution_window and raise it to
+    the submission's priority class (never lower it)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    _promote_job(cursor, job_id, priority)
     conn.commit()
     conn.close()
 
+def _promote_job(cursor, job_id, priority):
+    """promote_job() in the caller's transaction"""
+    cursor.execute("""
+        UPDATE RwAutomator_Log
+        SET not_before = NULL, execution_window = NULL,
+            priority = CASE WHEN priority > ? THEN ? ELSE priority END
+        WHERE job_id = ? AND status IN ('pending', 'error')
+          AND (not_before IS NOT NULL OR execution_window IS NOT NULL OR priority > ?)
+    """, (priority, priority, job_id, priority))
+
+def create_job_records(jobs, batch=None):
+    """
+    Bulk insert pending jobs, skipping orders that are already in flight
+
+    Each job dict is updated in place: 'created' says whether it was inserted,
+    and a duplicate's job_id becomes the one of the job already in flight (or
+    of the job with the same idempotency key). Immediate duplicates of
+    deferred jobs promote them, as in create_job_record.
+
+    Args:
+        jobs: List of dicts with job_id, job_type, order_number, distribution_center,
+              rw_user, ticket_number, priority and batch_id (the same batch for all),
+              optionally idempotency_key, not_before, execution_window and profile
+        batch: Dict of lib.batches.insert_batch() arguments to create the jobs'
+               batch with, in the same transaction, only if some job is new
+
+    Returns:
+        tuple: (created, duplicates) counts
+    """
+    if not jobs:
+        return 0, 0
+
+    for _ in range(3):
+        counts = _insert_job_records(jobs, batch)
+        if counts is not None:
+            return counts
+
+    # Still losing races with other submissions; one at a time
+    if batch:
+        from lib.batches import create_batch
+        create_batch(**batch)
+    created = 0
+    for job in jobs:
+        job['job_id'], job['created'] = create_job_record(
+            job['job_id'], job['job_type'], job['order_number'], job['distribution_center'], job['rw_user'],
+            job['ticket_number'], job['priority'], job.get('idempotency_key'), job.get('batch_id'),
+            job.get('not_before'), job.get('execution_window'), job.get('profile', False))
+        created += job['created']
+    return created, len(jobs) - created
+
+def _insert_job_records(jobs, batch):
+    """One attempt of create_job_records; None if it lost a race and was rolled back"""
+    from lib.batches import insert_batch
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        # Jobs already in flight or submitted under the same idempotency key
+        keys = list({get_dedupe_key(j['job_type'], j['distribution_center'], j['order_number']) for j in jobs})
+        existing = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor.execute(f"SELECT dedupe_key, job_id FROM RwAutomator_Log WHERE dedupe_key IN ({placeholders})",
+                           chunk)
+            existing.update((row[0], row[1]) for row in cursor.fetchall())
+        idempotency_keys = list({j['idempotency_key'] for j in jobs if j.get('idempotency_key')})
+        replayed = {}
+        for i in range(0, len(idempotency_keys), 500):
+            chunk = idempotency_keys[i:i + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor.execute(f"SELECT idempotency_key, job_id FROM RwAutomator_Log "
+                           f"WHERE idempotency_key IN ({placeholders})", chunk)
+            replayed.update((row[0], row[1]) for row in cursor.fetchall())
+
+        rows = []
+        for job in jobs:
+            key = get_dedupe_key(job['job_type'], job['distribution_center'], job['order_number'])
+            existing_job_id = replayed.get(job.get('idempotency_key')) or existing.get(key)
+            job['created'] = not existing_job_id
+            if existing_job_id:
+                job['job_id'] = existing_job_id
+                if not job.get('not_before') and not job.get('execution_window'):
+                    _promote_job(cursor, existing_job_id, job['priority'])
+                continue
+            # Later jobs for the same order in this call are duplicates of this one
+            existing[key] = job['job_id']
+            rows.append((job['job_id'], job['job_type'], job['order_number'], job['distribution_center'],
+                         job['rw_user'], job['ticket_number'], job['priority'], key, job.get('idempotency_key'),
+                         job.get('batch_id'), job.get('not_before'), job.get('execution_window'),
+                         1 if job.get('profile') else 0))
+
+        if rows and batch:
+            insert_batch(cursor, **batch)
+        if rows:
+            cursor.fast_executemany = True
+            cursor.executemany("""
+                INSERT INTO RwAutomator_Log 
+                (job_id, job_type, order_number, distribution_center, rw_user, status, ticket_number, priority,
+                 dedupe_key, idempotency_key, batch_id, not_before, execution_window, profile)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+            # Every job in one call belongs to the same batch
+            batch_id = jobs[0].get('batch_id')
+            if batch_id:
+                cursor.execute("""
+                    UPDATE RwAutomator_Batch SET total = total + ?, pending = pending + ?, updated_at = GETDATE()
+                    WHERE batch_id = ?
+                """, (len(rows), len(rows), batch_id))
+        conn.commit()
+    except integrity_error():
+        # Lost a race with another submission; the caller tries again
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+    return len(rows), len(jobs) - len(rows)
+
 def get_pending_jobs():
     """Get all pending jobs"""
     conn = get_connection()
@@ -35,10 +250,11 @@ def get_pending_jobs():
     
     cursor.execute("""
         SELECT job_id, job_type, order_number, distribution_center, send_attempts, 
-        response_data , status, requested_at, started_at, completed_at, result_message
+        response_data , status, requested_at, started_at, completed_at, result_message,
+        rw_user, ticket_number, priority
         FROM RwAutomator_Log 
         WHERE status not in('success', 'failed' )
-        ORDER BY requested_at ASC
+        ORDER BY priority ASC, requested_at ASC
     """)
     
     jobs = []
@@ -54,7 +270,50 @@ def get_pending_jobs():
             'requested_at': row[7].isoformat() if row[7] else None,
             'started_at': row[8].isoformat() if row[8] else None,
             'completed_at': row[9].isoformat() if row[9] else None,
-            'result_message': row[10] if row[10] else None 
+            'result_message': row[10] if row[10] else None,
+            'rw_user': row[11],
+            'ticket_number': row[12],
+            'priority': row[13]
+        })
+    
+    conn.close()
+    return jobs
+
+def get_queued_jobs():
+    """
+    Get jobs waiting for a worker (pending, or errored and due for another attempt)
+
+    Jobs deferred with not_before are left out until that time; execution
+    windows and blackouts are applied by lib.scheduler.releasable_jobs.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT job_id, job_type, order_number, distribution_center, rw_user,
+        ticket_number, priority, status, send_attempts, requested_at, not_before, execution_window, profile
+        FROM RwAutomator_Log 
+        WHERE status in('pending', 'error')
+        AND (next_attempt_at IS NULL OR next_attempt_at <= GETDATE())
+        AND (not_before IS NULL OR not_before <= GETDATE())
+    """)
+    
+    jobs = []
+    for row in cursor.fetchall():
+        jobs.append({
+            'job_id': row[0],
+            'job_type': row[1],
+            'order_number': row[2],
+            'distribution_center': row[3],
+            'rw_user': row[4],
+            'ticket_number': row[5],
+            'priority': row[6],
+            'status': row[7],
+            'send_attempts': row[8],
+            'requested_at': row[9].isoformat() if row[9] else None,
+            'not_before': row[10].isoformat() if row[10] else None,
+            'execution_window': row[11],
+            'profile': bool(row[12])
         })
     
     conn.close()
@@ -66,7 +325,7 @@ def get_job_status(job_id):
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT status, result_message, send_attempts
+        SELECT status, result_message, send_attempts, next_attempt_at, failure_class, checkpoint_step
         FROM RwAutomator_Log
         WHERE job_id = ?
     """, (job_id,))
@@ -75,15 +334,21 @@ def get_job_status(job_id):
     conn.close()
     
     if row:
-        return {'status': row[0], 'message': row[1], 'send_attempts': row[2]}
+        return {
+            'status': row[0],
+            'message': row[1],
+            'send_attempts': row[2],
+            'next_attempt_at': row[3].isoformat() if row[3] else None,
+            'failure_class': row[4],
+            'checkpoint': row[5]
+        }
     return None
 
-def get_job_history(page=1, per_page=50, order_number='', start_date='', end_date='', status=''):
-    """Get paginated job history with optional filters"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Build WHERE clause dynamically
+HISTORY_COLUMNS = ['job_id', 'job_type', 'order_number', 'distribution_center', 'rw_user', 'status',
+                   'result_message', 'requested_at', 'started_at', 'completed_at', 'ticket_number', 'send_attempts']
+
+def _history_filters(order_number='', start_date='', end_date='', status=''):
+    """WHERE clause and parameters for the job history filters"""
     where_clauses = []
     params = []
     
@@ -104,6 +369,31 @@ def get_job_history(page=1, per_page=50, order_number='', start_date='', end_dat
         params.append(status)
     
     where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    return where_sql, params
+
+def _history_row(row):
+    """One job history row as a dict"""
+    return {
+        'job_id': row[0],
+        'job_type': row[1],
+        'order_number': row[2],
+        'distribution_center': row[3],
+        'rw_user': row[4],
+        'status': row[5],
+        'result_message': row[6],
+        'requested_at': row[7].isoformat() if row[7] else None,
+        'started_at': row[8].isoformat() if row[8] else None,
+        'completed_at': row[9].isoformat() if row[9] else None,
+        'ticket_number': row[10],
+        'send_attempts': row[11]
+    }
+
+def get_job_history(page=1, per_page=50, order_number='', start_date='', end_date='', status=''):
+    """Get paginated job history with optional filters"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    where_sql, params = _history_filters(order_number, start_date, end_date, status)
     
     # Pagination work
     count_query = f"SELECT COUNT(*) FROM RwAutomator_Log {where_sql}"
@@ -114,10 +404,7 @@ def get_job_history(page=1, per_page=50, order_number='', start_date='', end_dat
     offset = (page - 1) * per_page
     
     data_query = f"""
-        SELECT 
-            job_id, job_type, order_number, distribution_center, rw_user,
-            status, result_message, requested_at, started_at, completed_at, 
-            ticket_number, send_attempts
+        SELECT {', '.join(HISTORY_COLUMNS)}
         FROM RwAutomator_Log
         {where_sql}
         ORDER BY requested_at DESC
@@ -127,22 +414,7 @@ def get_job_history(page=1, per_page=50, order_number='', start_date='', end_dat
     
     cursor.execute(data_query, params + [offset, per_page])
     
-    jobs = []
-    for row in cursor.fetchall():
-        jobs.append({
-            'job_id': row[0],
-            'job_type': row[1],
-            'order_number': row[2],
-            'distribution_center': row[3],
-            'rw_user': row[4],
-            'status': row[5],
-            'result_message': row[6],
-            'requested_at': row[7].isoformat() if row[7] else None,
-            'started_at': row[8].isoformat() if row[8] else None,
-            'completed_at': row[9].isoformat() if row[9] else None,
-            'ticket_number': row[10],
-            'send_attempts': row[11]
-        })
+    jobs = [_history_row(row) for row in cursor.fetchall()]
     
     conn.close()
     
@@ -158,13 +430,56 @@ def get_job_history(page=1, per_page=50, order_number='', start_date='', end_dat
         }
     }
 
+def _stream_rows(conn, cursor, fetch_size):
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _history_row(row)
+    finally:
+        conn.close()
+
+def iter_job_history(order_number='', start_date='', end_date='', status='', fetch_size=None):
+    """
+    Stream the whole filtered job history, newest first
+
+    The query runs straight away, so database errors are raised here rather
+    than halfway through a response. Rows are then read from the forward-only
+    cursor fetch_size at a time (RW_EXPORT_FETCH_SIZE), so memory stays flat
+    however many jobs match. The connection is closed when the returned
+    generator finishes or is closed.
+
+    Returns:
+        generator: One dict per job, keyed by HISTORY_COLUMNS
+    """
+    if fetch_size is None:
+        fetch_size = int(os.getenv('RW_EXPORT_FETCH_SIZE', '1000'))
+    
+    where_sql, params = _history_filters(order_number, start_date, end_date, status)
+    
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {', '.join(HISTORY_COLUMNS)}
+            FROM RwAutomator_Log
+            {where_sql}
+            ORDER BY requested_at DESC
+        """, params)
+    except Exception:
+        conn.close()
+        raise
+    return _stream_rows(conn, cursor, fetch_size)
+
 def get_job_record(job_id):
     """Get full job record by job_id"""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT job_id, job_type, order_number, distribution_center, rw_user,
-               status, result_message, requested_at, started_at, completed_at, send_attempts
+               status, result_message, requested_at, started_at, completed_at, send_attempts, batch_id
         FROM RwAutomator_Log
         WHERE job_id = ?
     """, (job_id,))
@@ -183,37 +498,170 @@ def get_job_record(job_id):
             'requested_at': row[7].isoformat() if row[7] else None,
             'started_at': row[8].isoformat() if row[8] else None,
             'completed_at': row[9].isoformat() if row[9] else None,
-            'send_attempts': row[10]
+            'send_attempts': row[10],
+            'batch_id': row[11]
+        }
+    return None
+
+def save_checkpoint(job_id, step, ship_total=None):
+    """Persist the last confirmed step of a job's workflow"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE RwAutomator_Log 
+        SET checkpoint_step = ?, checkpoint_ship_total = COALESCE(?, checkpoint_ship_total), checkpoint_at = GETDATE()
+        WHERE job_id = ?
+    """, (step, ship_total, job_id))
+    
+    conn.commit()
+    conn.close()
+
+def get_checkpoint(job_id):
+    """Last confirmed step of a job's workflow, or None if it has not got anywhere yet"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT checkpoint_step, checkpoint_ship_total, checkpoint_at,
+               DATEDIFF(second, checkpoint_at, GETDATE())
+        FROM RwAutomator_Log
+        WHERE job_id = ?
+    """, (job_id,))
+    
+    row = cursor.fetchone()
+    conn.close()
+    
+    if row and row[0]:
+        return {
+            'step': row[0],
+            'ship_total': row[1],
+            'checkpoint_at': row[2].isoformat() if row[2] else None,
+            'age_seconds': row[3]
         }
     return None
 
-def update_job_status(job_id, status, result_message=None, log_file_path=None, increment_attempts=False):
-    """Update job status and optionally set completion time"""
+def defer_job(job_id, reason, retry_in):
+    """Put a job back in the queue without using an attempt (e.g. host circuit open)"""
     conn = get_connection()
     cursor = conn.cursor()
     
-    job = get_job_record(job_id)
-    max_attempts = 3
+    cursor.execute("""
+        UPDATE RwAutomator_Log 
+        SET status = CASE WHEN status = 'error' THEN 'error' ELSE 'pending' END,
+            result_message = ?, next_attempt_at = DATEADD(second, ?, GETDATE())
+        WHERE job_id = ?
+    """, (reason, retry_in, job_id))
+    
+    conn.commit()
+    conn.close()
+
+# Batch counter each job status is counted under ('error' is waiting for a retry)
+BATCH_COUNTERS = {
+    'pending': 'pending',
+    'error': 'pending',
+    'processing': 'processing',
+    'success': 'success',
+    'failed': 'failed',
+}
+
+def _adjust_batch_counters(cursor, batch_id, old_status, new_status):
+    """Move a job between its batch's counters, in the caller's transaction"""
+    old_counter = BATCH_COUNTERS.get(old_status)
+    new_counter = BATCH_COUNTERS.get(new_status)
+    if not batch_id or old_counter == new_counter:
+        return
+    
+    sets = ['updated_at = GETDATE()']
+    if old_counter:
+        sets.append(f'{old_counter} = {old_counter} - 1')
+    if new_counter:
+        sets.append(f'{new_counter} = {new_counter} + 1')
+    if new_counter == 'processing':
+        sets.append('first_started_at = COALESCE(first_started_at, GETDATE())')
+    if new_counter in ('success', 'failed'):
+        sets.append('last_completed_at = GETDATE()')
+    
+    cursor.execute(f"UPDATE RwAutomator_Batch SET {', '.join(sets)} WHERE batch_id = ?", (batch_id,))
+
+def update_job_status(job_id, status, result_message=None, log_file_path=None, increment_attempts=False,
+                      worker_id=None, response_data=None):
+    """
+    Update job status and optionally set completion time.
+    
+    'processing' records which worker_id claimed the job, for the watchdog.
+    'success' stores response_data (the structured result of the job) when given.
+
+    An 'error' is classified by lib.retry: if the job still has attempts left
+    for its failure class it is scheduled again via next_attempt_at, otherwise
+    it is marked 'failed'.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # Read the current status under an update lock in this transaction, so concurrent
+    # transitions of the same job move it between batch counters one after the other
+    cursor.execute("""
+        SELECT status, batch_id, send_attempts
+        FROM RwAutomator_Log WITH (UPDLOCK, ROWLOCK)
+        WHERE job_id = ?
+    """, (job_id,))
+    row = cursor.fetchone()
+    job = {'status': row[0], 'batch_id': row[1], 'send_attempts': row[2]} if row else None
+    new_status = status
     
     if status == 'processing':
         if increment_attempts:
             cursor.execute("""
                 UPDATE RwAutomator_Log 
-                SET status = ?, started_at = GETDATE(), send_attempts = send_attempts + 1
+                SET status = ?, started_at = GETDATE(), send_attempts = send_attempts + 1, worker_id = ?
                 WHERE job_id = ?
-            """, (status, job_id))
+            """, (status, worker_id, job_id))
         else:
             cursor.execute("""
                 UPDATE RwAutomator_Log 
-                SET status = ?, started_at = GETDATE() 
+                SET status = ?, started_at = GETDATE(), worker_id = ?
                 WHERE job_id = ?
-            """, (status, job_id))
-    elif status in ('success', 'error'):
+            """, (status, worker_id, job_id))
+    elif status == 'success':
         cursor.execute("""
             UPDATE RwAutomator_Log 
-            SET status = ?, result_message = ?, log_file_path = ?, completed_at = GETDATE()
+            SET status = ?, result_message = ?, log_file_path = ?, completed_at = GETDATE(),
+                next_attempt_at = NULL, failure_class = NULL, dedupe_key = NULL,
+                response_data = COALESCE(?, response_data)
             WHERE job_id = ?
-        """, (status, result_message, log_file_path, job_id))
+        """, (status, result_message, log_file_path, response_data, job_id))
+    elif status == 'error':
+        current_attempts = job['send_attempts'] if job else 0
+        if increment_attempts:
+            current_attempts += 1
+        
+        failure_class = classify_failure(result_message)
+        max_attempts = get_max_attempts(failure_class)
+        
+        if current_attempts >= max_attempts:
+            append_message = f" Maximum attempts ({max_attempts}) reached."
+            if failure_class == PERMANENT:
+                append_message = " Not retried (permanent failure)."
+            if result_message:
+                result_message += append_message
+            else:
+                result_message = append_message.strip()
+            new_status = 'failed'
+            cursor.execute("""
+                UPDATE RwAutomator_Log 
+                SET status = 'failed', result_message = ?, log_file_path = ?, completed_at = GETDATE(),
+                    next_attempt_at = NULL, failure_class = ?, dedupe_key = NULL
+                WHERE job_id = ?
+            """, (result_message, log_file_path, failure_class, job_id))
+        else:
+            retry_delay = get_retry_delay(current_attempts)
+            cursor.execute("""
+                UPDATE RwAutomator_Log 
+                SET status = 'error', result_message = ?, log_file_path = ?, completed_at = GETDATE(),
+                    next_attempt_at = DATEADD(second, ?, GETDATE()), failure_class = ?
+                WHERE job_id = ?
+            """, (result_message, log_file_path, retry_delay, failure_class, job_id))
     else:
         if increment_attempts:
             cursor.execute("""
@@ -227,22 +675,9 @@ def update_job_status(job_id, status, result_message=None, log_file_path=None, i
                 SET status = ?
                 WHERE job_id = ?
             """, (status, job_id))
-            
-    current_attempts = job['send_attempts'] if job else 0
-    if increment_attempts:
-        current_attempts += 1
-        
-    if current_attempts >= max_attempts and status != 'success':
-        append_message = f" Maximum attempts ({max_attempts}) reached."
-        if result_message:
-            result_message += append_message
-        else:
-            result_message = append_message.strip()
-        cursor.execute("""
-            UPDATE RwAutomator_Log 
-            SET status = 'failed', result_message = ?, completed_at = GETDATE()
-            WHERE job_id = ?
-        """, (result_message, job_id))
+    
+    if job:
+        _adjust_batch_counters(cursor, job['batch_id'], job['status'], new_status)
 
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
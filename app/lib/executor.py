@@ -0,0 +1,261 @@
+"""
+Executor Pool
+Preforked, pre-warmed processes that run jobs handed to them over a pipe.
+
+Each executor imports pexpect, the database driver and the RealWorld processes once at
+start-up, then runs jobs until it has done RW_EXECUTOR_MAX_JOBS of them and
+is replaced. Jobs no longer pay interpreter start-up and import cost, and a
+crashing or leaking job only takes its executor down with it.
+
+Executors also keep warm RealWorld sessions between jobs (lib.sessions) and
+report which companies they are in, so the pool can route each job to an
+executor already in its DC.
+"""
+
+import os
+import signal
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+from lib.host_guard import session_owner
+
+def _warm_up():
+    """Import everything a job needs before the first job arrives"""
+    import pexpect  # noqa: F401
+    from lib.backends import get_backend
+    get_backend().load_driver()
+    import lib.processes.reset_order  # noqa: F401
+    import lib.processes.inspect_order  # noqa: F401
+    import lib.jobs  # noqa: F401
+    import lib.sessions  # noqa: F401
+    from lib.timing import get_timing_store
+    get_timing_store()  # Learned screen timings, loaded before the first job
+
+def _executor_main(conn, worker_id):
+    """Executor process loop: receive a job, run it, send the outcome back"""
+    # Own process group, so a hung job can be killed together with anything it forked
+    # directly. Telnet children are not in it: pexpect starts them in a session of their
+    # own on a pty, and they get SIGHUP when the executor dies and the pty closes.
+    os.setsid()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    _warm_up()
+
+    from lib.jobs import run_job, ERROR
+    from lib.sessions import SessionCache
+    from lib.profiling import JOBS, profiled
+
+    sessions = SessionCache(owner=session_owner(worker_id, os.getpid()))
+
+    while True:
+        try:
+            # Warm sessions hold their leases while idle; keep them renewed and close stale ones
+            while not conn.poll(sessions.settings['housekeeping_seconds']):
+                try:
+                    sessions.expire()
+                except Exception as e:
+                    print(f"Warning: Session housekeeping failed: {e}")
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        try:
+            label = f"{job['distribution_center']}_{job['order_number']}_{job['job_id']}"
+            with profiled(JOBS, label, job.get('profile', False)):
+                outcome, message = run_job(job['job_type'], job['order_number'], job['distribution_center'],
+                                           job['job_id'], worker_id, sessions)
+        except Exception as e:
+            outcome, message = ERROR, f'Executor error: {e}'
+
+        conn.send({'job_id': job['job_id'], 'outcome': outcome, 'message': message,
+                   'session_dcs': sessions.warm_dcs()})
+
+    sessions.close_all()
+    # Keep the screen timings observed since the last flush
+    from lib.timing import get_timing_store
+    get_timing_store().sync(force=True)
+    conn.close()
+
+
+class Executor:
+    """One warm executor process and the pipe to it"""
+
+    def __init__(self, context, worker_id=None):
+        self.worker_id = worker_id
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_executor_main, args=(child_conn, worker_id), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job = None
+        self.started_job_at = None
+        self.jobs_run = 0
+        self.session_dcs = []  # Companies of the executor's warm sessions, as of its last job
+
+    @property
+    def idle(self):
+        return self.job is None
+
+    def submit(self, job):
+        self.job = job
+        self.started_job_at = time.time()
+        self.conn.send(job)
+
+    @property
+    def owner(self):
+        """Owner of the executor's session leases (lib.host_guard.session_owner)"""
+        return session_owner(self.worker_id, self.process.pid)
+
+    def kill(self):
+        """
+        Kill the executor and its process group
+
+        Its telnet sessions end with it: killing the executor closes their pty
+        masters, which hangs up the telnet processes (SIGHUP).
+        """
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ExecutorPool:
+    """Fixed-size pool of warm executors"""
+
+    def __init__(self, size=None, max_jobs=None, worker_id=None):
+        self.size = size or int(os.getenv('RW_WORKER_CONCURRENCY', '1'))
+        self.max_jobs = max_jobs or int(os.getenv('RW_EXECUTOR_MAX_JOBS', '100'))
+        self.worker_id = worker_id
+        self.jobs_completed = 0
+        self.context = multiprocessing.get_context('fork')
+        self.executors = [Executor(self.context, worker_id) for _ in range(self.size)]
+
+    def busy_job_ids(self):
+        """Job IDs currently running in an executor"""
+        return {e.job['job_id'] for e in self.executors if e.job}
+
+    def idle_executor(self):
+        """An executor with no job, or None"""
+        for executor in self.executors:
+            if executor.idle:
+                return executor
+        return None
+
+    def idle_session_dcs(self):
+        """Companies idle executors have warm sessions in"""
+        return {dc for e in self.executors if e.idle for dc in e.session_dcs}
+
+    def executor_for(self, distribution_center):
+        """
+        The idle executor best placed to run a job for a DC: one already in
+        that company, else one without warm sessions, else any idle one
+        """
+        idle = [e for e in self.executors if e.idle]
+        for executor in idle:
+            if distribution_center in executor.session_dcs:
+                return executor
+        for executor in idle:
+            if not executor.session_dcs:
+                return executor
+        return idle[0] if idle else None
+
+    def submit(self, job):
+        """
+        Hand a job to an idle executor, preferring one already in the job's company
+
+        Returns:
+            bool: False if every executor is busy
+        """
+        executor = self.executor_for(job['distribution_center'])
+        if not executor:
+            return False
+        executor.submit(job)
+        return True
+
+    def collect(self, timeout=0):
+        """
+        Wait up to timeout seconds for jobs to finish
+
+        Returns:
+            list: Result dicts (job_id, outcome, message) of finished jobs
+        """
+        busy = {e.conn: e for e in self.executors if e.job}
+        if not busy:
+            if timeout:
+                time.sleep(timeout)
+            return []
+
+        results = []
+        for conn in wait(list(busy), timeout):
+            executor = busy[conn]
+            try:
+                result = conn.recv()
+            except (EOFError, OSError):
+                # Executor died mid-job
+                executor.process.join(timeout=1)
+                result = {'job_id': executor.job['job_id'], 'outcome': 'error', 'crashed': True,
+                          'job_type': executor.job['job_type'], 'owner': executor.owner,
+                          'message': f'Executor exited with code {executor.process.exitcode}'}
+                self._replace(executor)
+                results.append(result)
+                continue
+
+            executor.job = None
+            executor.started_job_at = None
+            executor.session_dcs = result.get('session_dcs', [])
+            executor.jobs_run += 1
+            self.jobs_completed += 1
+            results.append(result)
+
+            if executor.jobs_run >= self.max_jobs:
+                self._replace(executor)
+
+        return results
+
+    def kill_overdue(self, timeout):
+        """
+        Kill executors whose job has run longer than timeout seconds
+
+        An executor whose result is already waiting in its pipe is left for the
+        next collect(), so a job that finished at the deadline keeps its result.
+
+        Returns:
+            list: Result dicts for the killed jobs (marked 'timed_out')
+        """
+        results = []
+        now = time.time()
+        for executor in list(self.executors):
+            if executor.job and now - executor.started_job_at > timeout:
+                if executor.conn.poll():
+                    continue
+                results.append({'job_id': executor.job['job_id'], 'outcome': 'error', 'timed_out': True,
+                                'job_type': executor.job['job_type'], 'owner': executor.owner,
+                                'message': f'Timed out waiting for RealWorld (job exceeded {timeout}s hard timeout)'})
+                executor.kill()
+                executor.job = None
+                self.executors[self.executors.index(executor)] = Executor(self.context, self.worker_id)
+        return results
+
+    def _replace(self, executor):
+        """Swap an executor for a fresh one"""
+        executor.job = None
+        executor.stop()
+        self.executors[self.executors.index(executor)] = Executor(self.context, self.worker_id)
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.stop()
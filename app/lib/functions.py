@@ -1,11 +1,42 @@
 import os
-import pexpect
 import logging
 import time
 from datetime import datetime
-from dotenv import load_dotenv
 
 
+def spawn_telnet(host, port, secrets=(), timeout=30):
+    """
+    Open a telnet session to RealWorld, recorded when RW_SESSION_RECORD_DIR is set
+
+    Args:
+        host: RealWorld host
+        port: Telnet port
+        secrets: Passwords to mask in the recording
+        timeout: Default pexpect timeout
+
+    Returns:
+        pexpect.spawn: Telnet connection object, with its SessionRecording (or
+                       None) as child.recording; close it with close_telnet()
+    """
+    import pexpect
+    from lib.session_recording import start_recording
+
+    child = pexpect.spawn(f'telnet {host} {port}', encoding='utf-8', timeout=timeout)
+    child.recording = start_recording(host, port, secrets)
+    if child.recording:
+        child.recording.attach(child)
+    return child
+
+def close_telnet(child):
+    """Close a session from spawn_telnet() and its recording; never raises"""
+    try:
+        child.close()
+    except Exception:
+        pass
+    recording = getattr(child, 'recording', None)
+    if recording:
+        recording.close()
+
 def get_real_world_connection():
     """
     Establish a telnet connection to RealWorld system with enhanced logging
@@ -13,6 +44,8 @@ def get_real_world_connection():
     Returns:
         pexpect.spawn: Telnet connection object
     """
+    import pexpect
+    
     try:
         # Get connection details from environment variables
         host = os.getenv('RW_HOST', '192.168.0.5')
@@ -25,11 +58,12 @@ def get_real_world_connection():
         logger.info(f'Attempting to connect to {host}:{port}')
         
         # Create the spawn connection with increased timeout
-        child = pexpect.spawn(f'telnet {host} {port}', encoding='utf-8', timeout=30)
+        child = spawn_telnet(host, port)
         
-        # Enable logging of all interactions
-        log_file = open('/tmp/telnet_interaction.log', 'wb')
-        child.logfile = log_file
+        # Without a session recording, tee all interactions to a plain log
+        if child.logfile_read is None:
+            log_file = open('/tmp/telnet_interaction.log', 'w')
+            child.logfile = log_file
         
         # Additional logging to help diagnose connection issues
         print("Telnet connection initiated")
@@ -46,6 +80,7 @@ def get_real_world_connection():
 
 def load_env_if_needed():
     if not os.getenv('RW_EMPLOYEE_NUMBER'):
+        from dotenv import load_dotenv
         load_dotenv()
 
 
@@ -0,0 +1,61 @@
+"""
+History Export
+Job history as CSV or NDJSON, encoded incrementally from lib.db.iter_job_history
+so an export of any size streams out in constant memory.
+"""
+
+import io
+import csv
+import json
+from itertools import islice
+from lib.db import HISTORY_COLUMNS, iter_job_history
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows encoded per chunk handed to the response
+CHUNK_ROWS = 500
+
+def _chunks(jobs):
+    while True:
+        chunk = list(islice(jobs, CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+def _csv(jobs):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=HISTORY_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    for chunk in _chunks(jobs):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+def _ndjson(jobs):
+    for chunk in _chunks(jobs):
+        yield ''.join(json.dumps(job) + '\n' for job in chunk)
+
+def export_job_history(export_format='csv', **filters):
+    """
+    Encode the filtered job history
+
+    Args:
+        export_format: 'csv' or 'ndjson'
+        **filters: order_number, start_date, end_date and status, as for get_job_history
+
+    Returns:
+        generator: str chunks of the encoded export
+
+    Raises:
+        ValueError: If the format is not one of FORMATS
+        Exception: Database errors, before anything has been encoded
+    """
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(FORMATS)}")
+    jobs = iter_job_history(**filters)
+    return _csv(jobs) if export_format == 'csv' else _ndjson(jobs)
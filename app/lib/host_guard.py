@@ -0,0 +1,486 @@
+"""
+Host Guard
+Circuit breaker and rate limiting for the RealWorld telnet host.
+
+State lives in MSSQL so the worker, every rw_automate.py process and the
+API all see the same breaker:
+    RwAutomator_HostState   - breaker state and login token bucket, one row per host
+    RwAutomator_HostSession - one leased row per open telnet session, held from
+                              login until the session is closed, with the
+                              credential (lib.credentials) it runs under, the
+                              job it is busy with and the executor holding it
+    RwAutomator_Credential  - logins, jobs and failures per credential
+"""
+
+import os
+import uuid
+from lib.db import get_connection
+from lib.credentials import load_credentials
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Failures that say something about the host rather than about the order
+HOST_FAILURES = [
+    'Timed out waiting for RealWorld',
+    'RealWorld host unreachable',
+    'RealWorld connection closed',
+]
+
+def get_host():
+    """RealWorld host the automation connects to"""
+    return os.getenv('RW_HOST', '')
+
+def get_limits():
+    """
+    Breaker and rate limit settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'max_sessions': int(os.getenv('RW_MAX_SESSIONS', '2')),
+        'logins_per_minute': float(os.getenv('RW_LOGINS_PER_MINUTE', '6')),
+        'login_burst': float(os.getenv('RW_LOGIN_BURST', '3')),
+        'failure_threshold': int(os.getenv('RW_BREAKER_FAILURE_THRESHOLD', '3')),
+        'cooldown_seconds': int(os.getenv('RW_BREAKER_COOLDOWN_SECONDS', '60')),
+        'lease_seconds': int(os.getenv('RW_SESSION_LEASE_SECONDS', '600')),
+    }
+
+def is_host_failure(message):
+    """True if a failure message points at the host being down or slow"""
+    message = message or ''
+    return any(pattern in message for pattern in HOST_FAILURES)
+
+def _lock_host_row(cursor, host, limits):
+    """Lock (creating if needed) the state row for a host and return it with the DB time"""
+    cursor.execute("""
+        SELECT breaker_state, consecutive_failures, open_until, login_tokens,
+               tokens_updated_at, GETDATE()
+        FROM RwAutomator_HostState WITH (UPDLOCK, HOLDLOCK)
+        WHERE host = ?
+    """, (host,))
+    row = cursor.fetchone()
+    if row:
+        return row
+
+    cursor.execute("""
+        INSERT INTO RwAutomator_HostState
+        (host, breaker_state, consecutive_failures, login_tokens, tokens_updated_at, updated_at)
+        VALUES (?, 'closed', 0, ?, GETDATE(), GETDATE())
+    """, (host, limits['login_burst']))
+    return _lock_host_row(cursor, host, limits)
+
+def session_owner(worker_id, pid):
+    """Owner recorded with the session leases of one executor process"""
+    return f"{worker_id or 'manual'}:{pid}"
+
+def _active_sessions(cursor, host, limits):
+    """
+    Drop expired session leases and count the rest
+
+    Returns:
+        tuple: (dict active leases per credential name, int leases busy with a job)
+    """
+    cursor.execute("""
+        DELETE FROM RwAutomator_HostSession
+        WHERE host = ? AND leased_at < DATEADD(second, -?, GETDATE())
+    """, (host, limits['lease_seconds']))
+    cursor.execute("""
+        SELECT credential, COUNT(*), SUM(CASE WHEN job_id IS NULL THEN 0 ELSE 1 END)
+        FROM RwAutomator_HostSession
+        WHERE host = ?
+        GROUP BY credential
+    """, (host,))
+    rows = cursor.fetchall()
+    return {credential: count for credential, count, _ in rows}, sum(busy or 0 for _, _, busy in rows)
+
+def _pick_credential(credentials, active):
+    """
+    Credential with room for another session: the least loaded relative to its limit
+
+    active counts every open session of the host, warm and idle ones in any
+    executor included, so a credential is never given to a new login while
+    its max_sessions sessions are open anywhere.
+
+    Returns:
+        dict: The credential, or None if all are at their limit
+    """
+    available = [c for c in credentials if active.get(c['name'], 0) < c['max_sessions']]
+    if not available:
+        return None
+    return min(available, key=lambda c: active.get(c['name'], 0) / c['max_sessions'])
+
+def _record_usage(cursor, host, credential, column):
+    """Add one to a usage counter of a credential (logins, jobs or failures)"""
+    cursor.execute(f"""
+        UPDATE RwAutomator_Credential SET {column} = {column} + 1, last_used_at = GETDATE()
+        WHERE host = ? AND name = ?
+    """, (host, credential))
+    if cursor.rowcount == 0:
+        # Serialised by the lock on the host row
+        cursor.execute(f"""
+            INSERT INTO RwAutomator_Credential (host, name, {column}, last_used_at)
+            VALUES (?, ?, 1, GETDATE())
+        """, (host, credential))
+
+def _check_breaker(cursor, host, state, open_until, now, busy):
+    """
+    Circuit breaker check for starting a job, in the caller's transaction
+
+    Moves an open breaker whose cooldown is over to half open, where a single
+    job (the probe) may run.
+
+    Returns:
+        dict: Denial with 'reason' and 'retry_in', or None if a job may start
+    """
+    if state == OPEN:
+        if open_until and now < open_until:
+            retry_in = max(int((open_until - now).total_seconds()), 1)
+            return {'reason': f'Circuit open for RealWorld host {host} until {open_until.isoformat()}',
+                    'retry_in': retry_in}
+        # Cooldown over: let one probe session through
+        state = HALF_OPEN
+        cursor.execute("""
+            UPDATE RwAutomator_HostState SET breaker_state = 'half_open', updated_at = GETDATE()
+            WHERE host = ?
+        """, (host,))
+
+    if state == HALF_OPEN and busy > 0:
+        return {'reason': f'Circuit half open for RealWorld host {host}, waiting on probe session',
+                'retry_in': 10}
+    return None
+
+def acquire_session(host, job_id=None, owner=None):
+    """
+    Ask for permission to log in a new telnet session against a host
+
+    Leases a credential from the pool along with the session and takes a
+    login token. The lease is held for as long as the session stays open
+    (see lib.sessions), warm and idle or not, and is what RW_MAX_SESSIONS and
+    the credentials' max_sessions are counted against.
+
+    Args:
+        host: RealWorld host
+        job_id: Job the session is opened for (the lease is busy while it has one)
+        owner: Executor holding the session (session_owner), so its leases can
+            be released if it is killed
+
+    Returns:
+        tuple: (lease, None) when allowed, where lease is a dict with
+               'session_id' and 'credential' (the credential name), or
+               (None, denial) where denial is a dict with 'reason', 'retry_in'
+               (seconds) and 'at_limit' when open sessions are what is in the way
+    """
+    limits = get_limits()
+    credentials = load_credentials()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        state, failures, open_until, tokens, tokens_updated_at, now = _lock_host_row(cursor, host, limits)
+        leases, busy = _active_sessions(cursor, host, limits)
+        active = sum(leases.values())
+
+        denial = _check_breaker(cursor, host, state, open_until, now, busy)
+        if denial:
+            conn.commit()
+            return None, denial
+
+        # Concurrent session limit
+        if active >= limits['max_sessions']:
+            conn.commit()
+            return None, {'reason': f'RealWorld session limit reached ({active}/{limits["max_sessions"]})',
+                          'retry_in': 5, 'at_limit': True}
+
+        # Per-credential session limits
+        credential = _pick_credential(credentials, leases)
+        if not credential:
+            conn.commit()
+            return None, {'reason': f'All RealWorld credentials in use ({active} sessions)',
+                          'retry_in': 5, 'at_limit': True}
+
+        # Login token bucket
+        rate = limits['logins_per_minute'] / 60.0
+        elapsed = (now - tokens_updated_at).total_seconds() if tokens_updated_at else 0
+        tokens = min(limits['login_burst'], (tokens or 0) + elapsed * rate)
+        if tokens < 1:
+            retry_in = max(int((1 - tokens) / rate) if rate > 0 else 60, 1)
+            cursor.execute("""
+                UPDATE RwAutomator_HostState SET login_tokens = ?, tokens_updated_at = GETDATE()
+                WHERE host = ?
+            """, (tokens, host))
+            conn.commit()
+            return None, {'reason': f'RealWorld login rate limit ({limits["logins_per_minute"]:g}/min)',
+                          'retry_in': retry_in}
+
+        session_id = str(uuid.uuid4())
+        cursor.execute("""
+            UPDATE RwAutomator_HostState SET login_tokens = ?, tokens_updated_at = GETDATE(), updated_at = GETDATE()
+            WHERE host = ?
+        """, (tokens - 1, host))
+        cursor.execute("""
+            INSERT INTO RwAutomator_HostSession (session_id, host, job_id, credential, owner, leased_at)
+            VALUES (?, ?, ?, ?, ?, GETDATE())
+        """, (session_id, host, job_id, credential['name'], owner))
+        _record_usage(cursor, host, credential['name'], 'logins')
+        conn.commit()
+        return {'session_id': session_id, 'credential': credential['name']}, None
+
+    finally:
+        conn.close()
+
+def claim_session(session_id, host, job_id):
+    """
+    Start a job on an open session that already holds a lease
+
+    Takes no login token, but the circuit breaker still decides whether the
+    job may run.
+
+    Returns:
+        tuple: (bool claimed, denial) where claimed is False with no denial if
+               the lease has expired (the session must be closed)
+    """
+    limits = get_limits()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        state, failures, open_until, tokens, tokens_updated_at, now = _lock_host_row(cursor, host, limits)
+        leases, busy = _active_sessions(cursor, host, limits)
+
+        denial = _check_breaker(cursor, host, state, open_until, now, busy)
+        if denial:
+            conn.commit()
+            return False, denial
+
+        cursor.execute("""
+            UPDATE RwAutomator_HostSession SET job_id = ?, leased_at = GETDATE()
+            WHERE session_id = ?
+        """, (job_id, session_id))
+        claimed = cursor.rowcount > 0
+        conn.commit()
+        return claimed, None
+
+    finally:
+        conn.close()
+
+def touch_sessions(session_ids, job_id=None):
+    """
+    Renew the leases of open sessions and set the job they are busy with
+    (None for idle warm sessions)
+
+    Returns:
+        set: The session_ids whose lease is gone (expired and dropped by
+             another process); those sessions are no longer counted against
+             their credential and must be closed
+    """
+    if not session_ids:
+        return set()
+    conn = get_connection()
+    cursor = conn.cursor()
+    placeholders = ', '.join('?' for _ in session_ids)
+    cursor.execute(f"""
+        UPDATE RwAutomator_HostSession SET job_id = ?, leased_at = GETDATE()
+        WHERE session_id IN ({placeholders})
+    """, [job_id] + list(session_ids))
+    cursor.execute(f"SELECT session_id FROM RwAutomator_HostSession WHERE session_id IN ({placeholders})",
+                   list(session_ids))
+    held = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    conn.close()
+    return set(session_ids) - held
+
+def release_session(session_id, host=None):
+    """Return the lease of a closed session"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM RwAutomator_HostSession WHERE session_id = ?", (session_id,))
+    conn.commit()
+    conn.close()
+
+def record_job(host, credential, failure_message=None):
+    """
+    Count a job against its credential and feed its outcome to the circuit breaker
+
+    Args:
+        host: RealWorld host
+        credential: Name of the credential the job ran under
+        failure_message: Failure message of the job, or None on success
+    """
+    limits = get_limits()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        state, failures, open_until, tokens, tokens_updated_at, now = _lock_host_row(cursor, host, limits)
+        if credential:
+            _record_usage(cursor, host, credential, 'jobs')
+            if failure_message:
+                _record_usage(cursor, host, credential, 'failures')
+
+        if is_host_failure(failure_message):
+            failures = (failures or 0) + 1
+            if state == HALF_OPEN or failures >= limits['failure_threshold']:
+                cursor.execute("""
+                    UPDATE RwAutomator_HostState
+                    SET breaker_state = 'open', consecutive_failures = ?, opened_at = GETDATE(),
+                        open_until = DATEADD(second, ?, GETDATE()), updated_at = GETDATE()
+                    WHERE host = ?
+                """, (failures, limits['cooldown_seconds'], host))
+            else:
+                cursor.execute("""
+                    UPDATE RwAutomator_HostState SET consecutive_failures = ?, updated_at = GETDATE()
+                    WHERE host = ?
+                """, (failures, host))
+        else:
+            # The host answered, whatever happened to the order
+            cursor.execute("""
+                UPDATE RwAutomator_HostState
+                SET breaker_state = 'closed', consecutive_failures = 0, open_until = NULL, updated_at = GETDATE()
+                WHERE host = ?
+            """, (host,))
+
+        conn.commit()
+    finally:
+        conn.close()
+
+def release_job_sessions(job_id, failure_message=None, owner=None):
+    """
+    Release the session leases of a job whose executor was killed or lost,
+    and record the job's failure
+
+    Args:
+        job_id: The job
+        failure_message: Why the job ended
+        owner: Owner (session_owner) or owner prefix (worker_id + ':') whose
+            leases go too, idle warm sessions included; their telnet sessions
+            died with the executor
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT host, credential FROM RwAutomator_HostSession WHERE job_id = ?", (job_id,))
+    leases = cursor.fetchall()
+    cursor.execute("DELETE FROM RwAutomator_HostSession WHERE job_id = ?", (job_id,))
+    if owner and owner.endswith(':'):
+        cursor.execute("DELETE FROM RwAutomator_HostSession WHERE owner LIKE ?", (owner + '%',))
+    elif owner:
+        cursor.execute("DELETE FROM RwAutomator_HostSession WHERE owner = ?", (owner,))
+    conn.commit()
+    conn.close()
+
+    for host, credential in leases:
+        record_job(host, credential, failure_message)
+
+def get_host_status(host=None):
+    """
+    Current breaker and rate limit state of a host, for job status responses
+
+    Returns:
+        dict: Breaker state, active sessions and limits
+    """
+    host = host or get_host()
+    limits = get_limits()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT breaker_state, consecutive_failures, opened_at, open_until, login_tokens, tokens_updated_at, GETDATE()
+        FROM RwAutomator_HostState
+        WHERE host = ?
+    """, (host,))
+    row = cursor.fetchone()
+    cursor.execute("""
+        SELECT COUNT(*) FROM RwAutomator_HostSession
+        WHERE host = ? AND leased_at >= DATEADD(second, -?, GETDATE())
+    """, (host, limits['lease_seconds']))
+    active = cursor.fetchone()[0]
+    conn.close()
+
+    status = {
+        'host': host,
+        'breaker_state': CLOSED,
+        'consecutive_failures': 0,
+        'opened_at': None,
+        'open_until': None,
+        'login_tokens': limits['login_burst'],
+        'active_sessions': active,
+        'max_sessions': limits['max_sessions'],
+        'logins_per_minute': limits['logins_per_minute'],
+    }
+    if row:
+        rate = limits['logins_per_minute'] / 60.0
+        elapsed = (row[6] - row[5]).total_seconds() if row[5] else 0
+        status.update({
+            'breaker_state': row[0],
+            'consecutive_failures': row[1],
+            'opened_at': row[2].isoformat() if row[2] else None,
+            'open_until': row[3].isoformat() if row[3] else None,
+            'login_tokens': round(min(limits['login_burst'], (row[4] or 0) + elapsed * rate), 2),
+        })
+        if row[0] == OPEN and row[3] and row[6] >= row[3]:
+            status['breaker_state'] = HALF_OPEN
+    return status
+
+def get_credential_status(host=None):
+    """
+    Credentials in the pool with their active sessions and usage
+
+    Returns:
+        list: Dicts with name, username, employee_number, max_sessions,
+              active_sessions, logins, jobs, failures and last_used_at
+    """
+    from lib.credentials import describe
+
+    host = host or get_host()
+    limits = get_limits()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT credential, COUNT(*) FROM RwAutomator_HostSession
+        WHERE host = ? AND leased_at >= DATEADD(second, -?, GETDATE())
+        GROUP BY credential
+    """, (host, limits['lease_seconds']))
+    active = {credential: count for credential, count in cursor.fetchall()}
+    cursor.execute("""
+        SELECT name, logins, jobs, failures, last_used_at
+        FROM RwAutomator_Credential
+        WHERE host = ?
+    """, (host,))
+    usage = {row[0]: row for row in cursor.fetchall()}
+    conn.close()
+
+    status = []
+    for credential in load_credentials():
+        row = usage.get(credential['name'])
+        entry = describe(credential)
+        entry.update({
+            'active_sessions': active.get(credential['name'], 0),
+            'logins': row[1] if row else 0,
+            'jobs': row[2] if row else 0,
+            'failures': row[3] if row else 0,
+            'last_used_at': row[4].isoformat() if row and row[4] else None,
+        })
+        status.append(entry)
+    return status
+
+def host_accepting_sessions(host=None):
+    """
+    Cheap pre-check for the worker and public job status: False while the
+    breaker is open (True again once it is due for a half-open probe)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT breaker_state, open_until, GETDATE()
+        FROM RwAutomator_HostState
+        WHERE host = ?
+    """, (host or get_host(),))
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row or row[0] != OPEN:
+        return True
+    return bool(row[1] and row[2] >= row[1])
@@ -0,0 +1,216 @@
+"""
+Job Runner
+Runs one queued job end to end: host guard, status updates and the RealWorld process.
+Shared by rw_automate.py (one process per job) and the worker's executor pool.
+"""
+
+RESET_ORDER_JOB_TYPES = ['reset_order', 'ResetOrder', 'Reset Single Order', 'Reset Batch Order']
+INSPECT_ORDER_JOB_TYPES = ['inspectOrder', 'Inspect Single Order', 'Inspect Batch Order']
+JOB_TYPES = RESET_ORDER_JOB_TYPES + INSPECT_ORDER_JOB_TYPES
+
+# Job kinds: what a job does to an order, whatever its job_type is called
+RESET = 'reset'
+INSPECT = 'inspect'
+
+SUCCESS = 'success'
+ERROR = 'error'
+DEFERRED = 'deferred'
+
+def job_kind(job_type):
+    """RESET or INSPECT for a job type (unknown types are resets, as they always were)"""
+    return INSPECT if job_type in INSPECT_ORDER_JOB_TYPES else RESET
+
+def failure_message(job_type, message):
+    """Error message of a job that failed, prefixed with what the job was doing"""
+    failed = 'Inspection failed' if job_kind(job_type) == INSPECT else 'Reset failed'
+    return f'{failed}: {message}'
+
+def run_job(job_type, order_number, distribution_center, job_id=None, worker_id=None, sessions=None):
+    """Run a queued job with the runner for its kind"""
+    if job_kind(job_type) == INSPECT:
+        return run_inspect_order_job(order_number, distribution_center, job_id, worker_id, sessions)
+    return run_reset_order_job(order_number, distribution_center, job_id, worker_id, sessions)
+
+def _lease_session(distribution_center, job_id, sessions):
+    """
+    Ask the host guard for a session and a credential before touching the job,
+    deferring the job when it says no. With a session cache this is a warm
+    session (no login) or a lease for a new one; without one, a lease for the
+    session the job opens and closes itself.
+
+    Returns:
+        tuple: (host, lease, denial reason) where lease has the 'credential' name
+    """
+    from lib.db import defer_job
+    from lib.host_guard import get_host, acquire_session
+
+    host = get_host()
+    if sessions is not None:
+        credential, denial = sessions.reserve(distribution_center, job_id)
+        lease = {'session_id': None, 'credential': credential} if credential else None
+    else:
+        lease, denial = acquire_session(host, job_id)
+    if not lease:
+        print(f"Deferred: {denial['reason']} (retry in {denial['retry_in']}s)")
+        if job_id:
+            defer_job(job_id, denial['reason'], denial['retry_in'])
+        return host, None, denial['reason']
+    return host, lease, None
+
+def _new_recorder(job_id):
+    """Screen recorder for a job, or None when snapshots are off or there is no job to keep them with"""
+    from lib.snapshots import ScreenRecorder, get_snapshot_settings
+    settings = get_snapshot_settings()
+    if not job_id or not settings['enabled']:
+        return None
+    return ScreenRecorder(settings)
+
+def _save_snapshots(job_id, recorder):
+    if not recorder:
+        return
+    try:
+        recorder.save(job_id)
+    except Exception as e:
+        print(f"Warning: Could not save screen snapshots: {e}")
+
+def _release_session(host, lease, failure_message, sessions):
+    """Record the job's outcome with the host guard and give back what the job did not keep open"""
+    from lib.host_guard import release_session, record_job
+    try:
+        if sessions is not None:
+            sessions.release_reservation()
+        else:
+            release_session(lease['session_id'], host)
+        record_job(host, lease['credential'], failure_message)
+    except Exception as e:
+        print(f"Warning: Could not release host session: {e}")
+
+def run_reset_order_job(order_number, distribution_center, job_id=None, worker_id=None, sessions=None):
+    """
+    Reset an order and record the outcome on its job
+
+    Args:
+        order_number: The order number to reset
+        distribution_center: Distribution center ID
+        job_id: RwAutomator_Log job to update (optional for manual runs)
+        worker_id: Worker running the job, recorded for the watchdog
+        sessions: lib.sessions.SessionCache of the executor running the job (optional)
+
+    Returns:
+        tuple: (outcome, message) where outcome is SUCCESS, ERROR or DEFERRED
+    """
+    from lib.db import update_job_status, get_checkpoint, save_checkpoint
+    from lib.processes.reset_order import reset_order
+
+    print(f"Starting reset process for order: {order_number} (DC: {distribution_center})")
+
+    host, lease, denial = _lease_session(distribution_center, job_id, sessions)
+    if not lease:
+        return DEFERRED, denial
+
+    # Update status to processing if we have a job_id
+    if job_id:
+        try:
+            update_job_status(job_id, 'processing', increment_attempts=True, worker_id=worker_id)
+        except Exception as e:
+            print(f"Warning: Could not update job status: {e}")
+
+    # Resume from whatever a previous attempt confirmed
+    checkpoint = None
+    on_checkpoint = None
+    if job_id:
+        checkpoint = get_checkpoint(job_id)
+        if checkpoint:
+            print(f"Resuming job {job_id} from checkpoint {checkpoint['step']}")
+        on_checkpoint = lambda step, ship_total=None: save_checkpoint(job_id, step, ship_total)
+
+    # Run the reset
+    result, message = False, 'Reset failed'
+    recorder = _new_recorder(job_id)
+    try:
+        result, message = reset_order(order_number, distribution_center, checkpoint, on_checkpoint, sessions,
+                                      lease['credential'], recorder)
+    finally:
+        _release_session(host, lease, None if result else message, sessions)
+        _save_snapshots(job_id, recorder)
+
+    # Update final status
+    if job_id:
+        try:
+            if result:
+                log_path = f"/app/process-logs/reset_order_{distribution_center}_{order_number}_*.log"
+                update_job_status(job_id, 'success',
+                                f'Reset completed successfully',
+                                log_path)
+            else:
+                update_job_status(job_id, 'error',
+                                f'Reset failed: {message}')
+        except Exception as e:
+            print(f"Warning: Could not update final job status: {e}")
+
+    if result:
+        print(f"✓ Order {order_number} reset completed successfully")
+        return SUCCESS, message
+
+    print(f"✗ Order {order_number} :: reset failed: {message}")
+    return ERROR, message
+
+def run_inspect_order_job(order_number, distribution_center, job_id=None, worker_id=None, sessions=None):
+    """
+    Look up an order without changing it and record what was found on its job
+
+    The result (status found or not_on_file, and the ship total) is stored as
+    JSON in the job's response_data. Orders the order source (lib.order_source)
+    answers take no session, login or host guard lease at all; the rest run on
+    the executor's warm session one after another, so a batch costs one login
+    per executor.
+
+    Returns:
+        tuple: (outcome, message) where outcome is SUCCESS, ERROR or DEFERRED
+    """
+    import json
+    from lib.db import update_job_status
+    from lib.processes.inspect_order import inspect_order, inspect_order_from_source
+
+    print(f"Starting inspection of order: {order_number} (DC: {distribution_center})")
+
+    answered = inspect_order_from_source(order_number, distribution_center)
+    host, lease = None, None
+    if not answered:
+        host, lease, denial = _lease_session(distribution_center, job_id, sessions)
+        if not lease:
+            return DEFERRED, denial
+
+    if job_id:
+        try:
+            update_job_status(job_id, 'processing', increment_attempts=True, worker_id=worker_id)
+        except Exception as e:
+            print(f"Warning: Could not update job status: {e}")
+
+    if answered:
+        result, message, details = answered
+    else:
+        result, message, details = False, 'Inspection failed', None
+        recorder = _new_recorder(job_id)
+        try:
+            result, message, details = inspect_order(order_number, distribution_center, sessions,
+                                                     lease['credential'], recorder)
+        finally:
+            _release_session(host, lease, None if result else message, sessions)
+            _save_snapshots(job_id, recorder)
+
+    if job_id:
+        try:
+            if result:
+                update_job_status(job_id, 'success', message, response_data=json.dumps(details))
+            else:
+                update_job_status(job_id, 'error', f'Inspection failed: {message}')
+        except Exception as e:
+            print(f"Warning: Could not update final job status: {e}")
+
+    if result:
+        print(f"✓ Order {order_number} inspected: {message}")
+        return SUCCESS, message
+
+    print(f"✗ Order {order_number} :: inspection failed: {message}")
+    return ERROR, message
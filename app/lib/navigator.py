@@ -0,0 +1,268 @@
+"""
+Screen Navigator
+Works out which RealWorld screen a telnet session is on and how to get from
+there to a known menu.
+
+Screens are identified from the last rendered screen in the session buffer.
+Prompt screens have their own text ("Ship total", "Order not on file", ...);
+menus all share the same selection prompt, so which menu we're on comes from
+the position the navigator has been tracking. Moving between screens is a
+shortest path over TRANSITIONS, and recover() uses the same graph to bring a
+session that landed somewhere unexpected back to the main menu without
+logging in again.
+"""
+
+import os
+import re
+from collections import deque
+from lib.timing import Pacer
+
+# Positions
+TOP_MENU = 'top_menu'                  # After telnet login, before entering a company
+MAIN_MENU = 'main_menu'                # Company main menu
+ORDER_ENTRY_MENU = 'order_entry_menu'  # 3
+VIEW_ORDER = 'view_order'              # 3/2, order number prompt
+ORDER_TOTALS = 'order_totals'          # 3/2 F3 totals screen
+ORDER_NOT_ON_FILE = 'order_not_on_file'
+RESET_MENU = 'reset_menu'              # 8
+RESET_ORDER = 'reset_order'            # 8/22
+PROCEDURE_COMPLETE = 'procedure_complete'
+LOGIN = 'login'
+MESSAGE = 'message'                    # "Press ENTER to continue"
+MENU = 'menu'                          # Some menu; which one depends on the tracked position
+
+MENUS = [TOP_MENU, MAIN_MENU, ORDER_ENTRY_MENU, RESET_MENU]
+
+# Screen text that identifies a screen, most specific first
+SCREEN_MARKERS = [
+    (ORDER_NOT_ON_FILE, re.compile(r'Order not on file')),
+    (PROCEDURE_COMPLETE, re.compile(r'Procedure complete', re.IGNORECASE)),
+    (ORDER_TOTALS, re.compile(r'Ship total')),
+    (LOGIN, re.compile(r'login:\s*$|Password:\s*$')),
+    (MESSAGE, re.compile(r'Press ENTER to continue')),
+    (MENU, re.compile(r'your selection[^\n]*\Z', re.IGNORECASE)),  # Prompt on the last line
+]
+
+# Key used to leave a menu or entry screen for its parent
+BACK = 'BACK'
+
+# position -> {next position: [(keys, settle seconds), ...]}
+# The settle seconds are used until lib.timing has learned the transition
+TRANSITIONS = {
+    MAIN_MENU: {
+        ORDER_ENTRY_MENU: [('3\r', 1)],
+        RESET_MENU: [('8\r', 2)],
+        TOP_MENU: [(BACK, 1)],
+    },
+    ORDER_ENTRY_MENU: {
+        VIEW_ORDER: [('2\r', 1), ('\r\r', 1)],
+        MAIN_MENU: [(BACK, 1)],
+    },
+    VIEW_ORDER: {
+        ORDER_ENTRY_MENU: [(BACK, 1)],
+    },
+    ORDER_TOTALS: {
+        MAIN_MENU: [('\t\t\r\t\t', 3)],  # TAB TAB ENTER TAB TAB
+    },
+    ORDER_NOT_ON_FILE: {
+        VIEW_ORDER: [('\r', 1)],
+    },
+    RESET_MENU: {
+        RESET_ORDER: [('22\r', 2)],
+        MAIN_MENU: [(BACK, 1)],
+    },
+    RESET_ORDER: {
+        RESET_MENU: [(BACK, 1)],
+    },
+    PROCEDURE_COMPLETE: {
+        RESET_ORDER: [('\r', 1)],
+    },
+}
+
+class NavigationError(Exception):
+    """The session is on a screen the navigator can't place or leave"""
+
+
+def screen_marker(position):
+    """Pattern the screen at a position is known by, or None if it has none of its own"""
+    screen = MENU if position in MENUS else position
+    return dict(SCREEN_MARKERS).get(screen)
+
+def get_back_key():
+    """Key sequence that backs out of a RealWorld menu or entry screen (ESC by default)"""
+    return os.getenv('RW_MENU_BACK_KEY', '\x1b').encode().decode('unicode_escape')
+
+def strip_ansi_codes(text):
+    """Remove ANSI escape sequences from text"""
+    return re.sub(r'\x1b\[[0-9;?]*[a-zA-Z]', '', text)
+
+def last_screen(buffer):
+    """The text of the last screen drawn in a buffer (after the last clear screen)"""
+    buffer = buffer or ''
+    cut = max(buffer.rfind('\x1b[2J'), buffer.rfind('\x1b[H\x1b[J'))
+    if cut >= 0:
+        buffer = buffer[cut:]
+    return strip_ansi_codes(buffer)
+
+def identify_screen(buffer):
+    """
+    Identify the screen from session output
+
+    Returns:
+        str: A position constant, MENU for an unspecified menu, or None if unknown
+    """
+    screen = last_screen(buffer)
+    for name, marker in SCREEN_MARKERS:
+        if marker.search(screen):
+            return name
+    return None
+
+def shortest_path(start, target):
+    """
+    Shortest key path between two positions
+
+    Returns:
+        list: (next position, steps) hops, [] if already there, or None if there's no path
+    """
+    if start == target:
+        return []
+
+    previous = {start: None}
+    queue = deque([start])
+    while queue:
+        position = queue.popleft()
+        for next_position, steps in TRANSITIONS.get(position, {}).items():
+            if next_position in previous:
+                continue
+            previous[next_position] = (position, steps)
+            if next_position == target:
+                path = []
+                while next_position != start:
+                    position, steps = previous[next_position]
+                    path.append((next_position, steps))
+                    next_position = position
+                return list(reversed(path))
+            queue.append(next_position)
+    return None
+
+
+class Navigator:
+    """Tracks where a telnet session is and moves it between screens"""
+
+    def __init__(self, child, logger, position=None, pacer=None):
+        self.child = child
+        self.logger = logger
+        self.position = position
+        self.pacer = pacer or Pacer(child)
+
+    def read_screen(self, timeout=0.5):
+        """Collect whatever the host has sent and identify the screen"""
+        import pexpect
+        self.child.expect([pexpect.TIMEOUT], timeout=timeout)
+        return identify_screen(self.child.before)
+
+    def send(self, keys, settle=1, step='keys', marker=None):
+        """Send keys (BACK for the back key) and wait for the screen to draw, or for marker"""
+        self.pacer.send(get_back_key() if keys == BACK else keys)
+        self.pacer.wait(step, settle, marker=marker)
+
+    def _consistent(self, screen, position):
+        """Whether an identified screen agrees with the position we think we're at"""
+        if screen is None:
+            return True  # Nothing recognisable on screen; trust the tracked position
+        if screen == MENU:
+            return position in MENUS
+        return screen == position
+
+    def sync(self, timeout=0.5):
+        """
+        Re-check the tracked position against the screen
+
+        Returns:
+            bool: True if the position is known after the check
+        """
+        screen = self.read_screen(timeout)
+        if self._consistent(screen, self.position):
+            return self.position is not None
+        self.logger.warning(f"Navigator: expected {self.position}, screen shows {screen}")
+        if screen in TRANSITIONS:
+            self.position = screen
+            return True
+        self.position = screen if screen == LOGIN else None
+        return False
+
+    def goto(self, target, verify=True):
+        """
+        Walk the shortest key path from the tracked position to target
+
+        Args:
+            target: Position to reach
+            verify: Check the screen once there
+
+        Returns:
+            bool: True if the session is at target
+        """
+        path = shortest_path(self.position, target) if self.position else None
+        if path is None:
+            self.logger.warning(f"Navigator: no path from {self.position} to {target}")
+            return False
+
+        for next_position, steps in path:
+            for i, (keys, settle) in enumerate(steps):
+                step = f'{self.position}>{next_position}' + (f'#{i + 1}' if i else '')
+                marker = screen_marker(next_position) if i == len(steps) - 1 else None
+                self.send(keys, settle, step, marker)
+            self.position = next_position
+
+        if verify and path and not self.sync():
+            return False
+        return self.position == target
+
+    def ensure(self, target):
+        """
+        goto() target, recovering in place once if the session went astray
+
+        Raises:
+            NavigationError: If target can't be reached
+        """
+        if self.goto(target):
+            return
+        if self.recover(MAIN_MENU) and self.goto(target):
+            return
+        raise NavigationError(f'Lost track of RealWorld screen (wanted {target}, at {self.position})')
+
+    def recover(self, target=MAIN_MENU, attempts=3):
+        """
+        Bring the session back to a known screen in place
+
+        Acknowledges messages and re-identifies the screen, then walks back to
+        target. Gives up (the caller should drop the session) when the screen
+        can't be placed or the host logged us out.
+
+        Returns:
+            bool: True if the session is at target
+        """
+        for _ in range(attempts):
+            screen = self.read_screen()
+            if screen == LOGIN:
+                self.logger.warning("Navigator: session is back at the login prompt")
+                self.position = LOGIN
+                return False
+            if screen == MESSAGE:
+                self.send('\r', step='message')
+                continue
+            if screen and screen != MENU:
+                self.position = screen
+            elif screen == MENU and self.position not in MENUS:
+                # A menu, but we can't tell which one
+                self.logger.warning(f"Navigator: lost on an unknown menu (last known {self.position})")
+                self.position = None
+                return False
+
+            if self.position is None:
+                return False
+            if self.goto(target):
+                self.logger.info(f"Navigator: recovered to {target}")
+                return True
+
+        return False
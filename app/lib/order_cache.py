@@ -0,0 +1,113 @@
+"""
+Order Lookup Cache
+Remembers ship totals and "Order not on file" results per (distribution_center, order_number)
+so retries and repeat submissions can skip the View Order / F3 screens.
+
+Entries live in RwAutomator_OrderCache and are shared by every worker process.
+"""
+
+import os
+from lib.db import get_connection, integrity_error
+
+def get_cache_ttls():
+    """
+    Cache lifetimes in seconds, from RW_ORDER_CACHE_TTL / RW_ORDER_CACHE_NEGATIVE_TTL (0 disables)
+
+    Returns:
+        tuple: (ship_total_ttl, not_on_file_ttl)
+    """
+    return (
+        int(os.getenv('RW_ORDER_CACHE_TTL', '900')),
+        int(os.getenv('RW_ORDER_CACHE_NEGATIVE_TTL', '300')),
+    )
+
+def get_cached_orders(distribution_center, order_numbers):
+    """
+    Look up fresh cache entries for several orders at once
+
+    Args:
+        distribution_center: Distribution center code
+        order_numbers: List of order numbers
+
+    Returns:
+        dict: order_number -> {'not_on_file', 'ship_total', 'cached_at'} for fresh entries only
+    """
+    ship_total_ttl, not_on_file_ttl = get_cache_ttls()
+    order_numbers = list(order_numbers)
+    if not order_numbers or (ship_total_ttl <= 0 and not_on_file_ttl <= 0):
+        return {}
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    entries = {}
+    # Stay well below the SQL Server parameter limit
+    for i in range(0, len(order_numbers), 500):
+        chunk = order_numbers[i:i + 500]
+        placeholders = ', '.join('?' for _ in chunk)
+        cursor.execute(f"""
+            SELECT order_number, not_on_file, ship_total, cached_at
+            FROM RwAutomator_OrderCache
+            WHERE distribution_center = ?
+            AND order_number IN ({placeholders})
+            AND ((not_on_file = 0 AND cached_at >= DATEADD(second, -?, GETDATE()))
+              OR (not_on_file = 1 AND cached_at >= DATEADD(second, -?, GETDATE())))
+        """, [distribution_center] + chunk + [ship_total_ttl, not_on_file_ttl])
+
+        for row in cursor.fetchall():
+            entries[row[0]] = {
+                'not_on_file': bool(row[1]),
+                'ship_total': row[2],
+                'cached_at': row[3].isoformat() if row[3] else None
+            }
+
+    conn.close()
+    return entries
+
+def get_cached_order(distribution_center, order_number):
+    """Fresh cache entry for one order, or None"""
+    return get_cached_orders(distribution_center, [order_number]).get(order_number)
+
+def _store(distribution_center, order_number, not_on_file, ship_total):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        UPDATE RwAutomator_OrderCache
+        SET not_on_file = ?, ship_total = ?, cached_at = GETDATE()
+        WHERE distribution_center = ? AND order_number = ?
+    """, (not_on_file, ship_total, distribution_center, order_number))
+
+    if cursor.rowcount == 0:
+        try:
+            cursor.execute("""
+                INSERT INTO RwAutomator_OrderCache (distribution_center, order_number, not_on_file, ship_total, cached_at)
+                VALUES (?, ?, ?, ?, GETDATE())
+            """, (distribution_center, order_number, not_on_file, ship_total))
+        except integrity_error():
+            # Another worker cached it first; theirs is just as fresh
+            pass
+
+    conn.commit()
+    conn.close()
+
+def cache_ship_total(distribution_center, order_number, ship_total):
+    """Remember the ship total scraped for an order"""
+    _store(distribution_center, order_number, 0, ship_total)
+
+def cache_not_on_file(distribution_center, order_number):
+    """Remember that RealWorld reported "Order not on file" for an order"""
+    _store(distribution_center, order_number, 1, None)
+
+def invalidate_order(distribution_center, order_number):
+    """Forget a cached order, e.g. once it has been reset"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        DELETE FROM RwAutomator_OrderCache
+        WHERE distribution_center = ? AND order_number = ?
+    """, (distribution_center, order_number))
+
+    conn.commit()
+    conn.close()
@@ -0,0 +1,177 @@
+"""
+Order Data Source
+Ship totals and order existence read from a SQL replica or reporting view of
+RealWorld, so a reset only needs a telnet session for the reset itself.
+
+Sources are configured per DC in the JSON file named by RW_ORDER_SOURCE_FILE,
+with "*" for every DC not listed and null to always use the F3 scrape:
+
+    {
+        "*":  {"connection": "DRIVER={ODBC Driver 18 for SQL Server};SERVER=rw-replica;...",
+               "view": "dbo.RwOrderTotals"},
+        "07": {"query": "SELECT ord_no, ship_amt FROM rpt.Orders WHERE company = ? AND ord_no IN ({orders})",
+               "not_on_file_when_missing": true},
+        "09": null
+    }
+
+connection is an ODBC connection string; without one the job store
+connection (lib.db) is used. view must have distribution_center,
+order_number and ship_total columns; query replaces it and takes the DC as
+its first parameter and the order numbers as {orders}. An order missing from
+the source is only treated as "not on file" with not_on_file_when_missing,
+since a replica may lag behind orders entered moments ago; otherwise the
+order is looked up on screen.
+
+Any error (replica down, timeout, bad query) falls back to the F3 scrape, and
+the source is left alone for RW_ORDER_SOURCE_RETRY_SECONDS before it is tried
+again.
+"""
+
+import os
+import json
+import logging
+import time
+from decimal import Decimal
+
+FOUND = 'found'
+NOT_ON_FILE = 'not_on_file'
+
+DEFAULT_QUERY = "SELECT order_number, ship_total FROM {view} WHERE distribution_center = ? AND order_number IN ({orders})"
+
+_cache = {}  # (path, mtime) -> sources
+_failed_until = {}  # DC key -> time the source may be tried again
+
+def load_sources():
+    """
+    Configured sources by DC key ('*' for the default)
+
+    The file is re-read when it changes.
+
+    Returns:
+        dict: DC key -> source dict, or None for scrape only
+
+    Raises:
+        ValueError: If a source has neither a view nor a query
+    """
+    path = os.getenv('RW_ORDER_SOURCE_FILE', '')
+    if not path:
+        return {}
+
+    key = (path, os.path.getmtime(path))
+    if key in _cache:
+        return _cache[key]
+
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, dict):
+        raise ValueError(f'{path} must hold an object of sources by distribution center')
+
+    sources = {}
+    for dc, entry in entries.items():
+        if entry is None:
+            sources[dc] = None
+            continue
+        if not entry.get('view') and not entry.get('query'):
+            raise ValueError(f'{path}: source for {dc} needs a view or a query')
+        sources[dc] = {
+            'connection': entry.get('connection', ''),
+            'query': entry.get('query') or DEFAULT_QUERY.replace('{view}', entry['view']),
+            'not_on_file_when_missing': bool(entry.get('not_on_file_when_missing', False)),
+            'timeout': int(entry.get('timeout_seconds', 5)),
+        }
+
+    _cache.clear()
+    _cache[key] = sources
+    return sources
+
+def get_source(distribution_center):
+    """
+    The source for a DC
+
+    Returns:
+        tuple: (DC key the source is configured under, source dict), or (None, None) to scrape
+    """
+    sources = load_sources()
+    for key in (distribution_center, '*'):
+        if key in sources:
+            return (key, sources[key]) if sources[key] else (None, None)
+    return None, None
+
+def _connect(source):
+    if not source['connection']:
+        from lib.db import get_connection
+        return get_connection()
+    from lib.backends.mssql import load_driver
+    return load_driver().connect(source['connection'], timeout=source['timeout'])
+
+def _format_total(value):
+    """Ship total as the F3 screen shows it (digits and a decimal point)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return f'{Decimal(str(value)):.2f}'
+    return str(value).strip().replace(',', '') or None
+
+def lookup_orders(distribution_center, order_numbers, logger=None):
+    """
+    Look up ship totals of several orders of one DC in the configured source
+
+    Args:
+        distribution_center: Distribution center ID
+        order_numbers: Order numbers to look up
+        logger: Logger for fallbacks (this module's logger without one)
+
+    Returns:
+        dict: order_number -> {'status': FOUND or NOT_ON_FILE, 'ship_total': str or None}
+              for the orders the source could answer; orders left out are to be
+              looked up on screen. Empty when there is no source or it failed.
+    """
+    warn = (logger or logging.getLogger(__name__)).warning
+    order_numbers = [str(order_number) for order_number in order_numbers]
+    try:
+        key, source = get_source(distribution_center)
+    except Exception as e:
+        warn(f"Order source configuration unusable, using screen lookups: {e}")
+        return {}
+    if not source or not order_numbers:
+        return {}
+    if _failed_until.get(key, 0) > time.time():
+        return {}
+
+    results = {}
+    conn = None
+    try:
+        conn = _connect(source)
+        cursor = conn.cursor()
+        # Stay well below the SQL Server parameter limit
+        for i in range(0, len(order_numbers), 500):
+            chunk = order_numbers[i:i + 500]
+            query = source['query'].replace('{orders}', ', '.join('?' for _ in chunk))
+            cursor.execute(query, [distribution_center] + chunk)
+            for row in cursor.fetchall():
+                results[str(row[0]).strip()] = {'status': FOUND, 'ship_total': _format_total(row[1])}
+    except Exception as e:
+        retry = int(os.getenv('RW_ORDER_SOURCE_RETRY_SECONDS', '60'))
+        _failed_until[key] = time.time() + retry
+        warn(f"Order source for {distribution_center} unavailable, using screen lookups for {retry}s: {e}")
+        return {}
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    if source['not_on_file_when_missing']:
+        for order_number in order_numbers:
+            results.setdefault(order_number, {'status': NOT_ON_FILE, 'ship_total': None})
+    return results
+
+def lookup_order(distribution_center, order_number, logger=None):
+    """
+    Look up one order in the configured source
+
+    Returns:
+        dict: {'status', 'ship_total'}, or None to look the order up on screen
+    """
+    return lookup_orders(distribution_center, [order_number], logger).get(str(order_number))
@@ -0,0 +1,213 @@
+"""
+Inspect Order Process
+Read-only lookup of orders in RealWorld: whether each order is on file and
+its ship total, from the same View Order / F3 screens reset_order() reads.
+Nothing on the order is changed.
+
+inspect_orders() walks any number of orders of one company in a single
+session, so inspecting 1,000 orders costs one login. Orders the configured
+order source (lib.order_source) can answer are not looked up on screen at
+all, and when it answers every order no session is opened.
+"""
+
+import os
+from lib.functions import setup_logger, get_valid_distribution_centers, spawn_telnet, close_telnet
+from lib.order_cache import cache_ship_total, cache_not_on_file
+from lib.order_source import lookup_orders
+from lib.navigator import Navigator, NavigationError, MAIN_MENU
+from lib.timing import Pacer, get_timing_store
+from lib.credentials import get_credential
+from lib.snapshots import FINAL
+from lib.processes.reset_order import login_to_company, lookup_ship_total
+
+FOUND = 'found'
+NOT_ON_FILE = 'not_on_file'
+ERROR = 'error'
+
+def _inspect(nav, order_number, distribution_center, logger):
+    """Look up one order on an open session and cache what was found"""
+    found, ship_total = lookup_ship_total(nav.child, order_number, logger, nav)
+    return _cache_result(order_number, FOUND if found else NOT_ON_FILE, ship_total, distribution_center, logger)
+
+def _cache_result(order_number, status, ship_total, distribution_center, logger):
+    """Cache one order's lookup and return its result"""
+    found = status == FOUND
+    try:
+        if not found:
+            cache_not_on_file(distribution_center, order_number)
+        elif ship_total:
+            cache_ship_total(distribution_center, order_number, ship_total)
+    except Exception as e:
+        logger.warning(f"Could not cache order lookup: {e}")
+
+    if not found:
+        logger.info(f'Order {order_number} not on file')
+        return {'order_number': order_number, 'status': NOT_ON_FILE, 'ship_total': None}
+    logger.info(f'Order {order_number} ship total: {ship_total}')
+    return {'order_number': order_number, 'status': FOUND, 'ship_total': ship_total}
+
+def inspect_orders(order_numbers, distribution_center="00", sessions=None, credential=None, on_result=None,
+                   recorder=None):
+    """
+    Look up orders in RealWorld without changing them
+
+    Args:
+        order_numbers: Order numbers to look up, all in one company
+        distribution_center: Distribution center ID (default: "00")
+        sessions: lib.sessions.SessionCache to take a warm session from and
+            return it to; without one a session is opened for the call
+        credential: Name of the lib.credentials credential to log in with
+            when there is no session cache
+        on_result: Called with each order's result as soon as it is known
+        recorder: lib.snapshots.ScreenRecorder to capture the screens in
+
+    Returns:
+        tuple: (bool success, str message, list results) where each result is a dict
+               with order_number, status (found, not_on_file or error) and ship_total.
+               On a session failure the remaining orders are reported as errors.
+    """
+    import pexpect  # Imported on first use so importing this module stays cheap
+
+    if not order_numbers:
+        return True, 'No orders to inspect', []
+
+    label = order_numbers[0] if len(order_numbers) == 1 else f'{len(order_numbers)}_orders'
+    logger = setup_logger(distribution_center, label, "inspect_order")
+    results = []
+    child = None
+    session = None
+    pacer = None
+    healthy = False
+
+    def report(result):
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    def fail_remaining(message):
+        done = {result['order_number'] for result in results}
+        for order_number in [o for o in order_numbers if o not in done]:
+            report({'order_number': order_number, 'status': ERROR, 'ship_total': None, 'message': message})
+        return False, message, results
+
+    if distribution_center not in get_valid_distribution_centers():
+        logger.error(f"Invalid distribution center: {distribution_center}. Aborting inspection.")
+        return fail_remaining('Invalid company / distribution center')
+
+    # Orders the SQL source answers need no screens; the rest are read from F3
+    source = lookup_orders(distribution_center, order_numbers, logger)
+    remaining = []
+    for order_number in order_numbers:
+        answer = source.get(str(order_number))
+        if answer and (answer['status'] == NOT_ON_FILE or answer['ship_total']):
+            report(_cache_result(order_number, answer['status'], answer['ship_total'], distribution_center, logger))
+        else:
+            remaining.append(order_number)
+    if source:
+        logger.info(f'Order source answered {len(results)} of {len(order_numbers)} orders')
+    if not remaining:
+        found = sum(1 for r in results if r['status'] == FOUND)
+        return True, f'Inspected {len(results)} orders ({found} found)', results
+
+    host = os.getenv('RW_HOST', '')
+    port = os.getenv('RW_PORT', '23')
+
+    try:
+        if sessions is not None:
+            session, message = sessions.checkout(distribution_center, logger)
+            if not session:
+                return fail_remaining(message)
+            nav, pacer = session.nav, session.pacer
+            pacer.recorder = recorder
+        else:
+            login = get_credential(credential)
+            if not login:
+                return fail_remaining('Unknown RealWorld credential')
+
+            logger.info(f"Connecting to RealWorld at {host}:{port} with user {login['username']}")
+            child = spawn_telnet(host, port, (login['password'], login['employee_password']))
+            pacer = Pacer(child, get_timing_store(host))
+            pacer.recorder = recorder
+            logged_in, message = login_to_company(child, distribution_center, login['username'], login['password'],
+                                                  login['employee_number'], login['employee_password'], logger, pacer)
+            if not logged_in:
+                return fail_remaining(message)
+            nav = Navigator(child, logger, MAIN_MENU, pacer)
+
+        healthy = True
+        for order_number in remaining:
+            report(_inspect(nav, order_number, distribution_center, logger))
+        nav.ensure(MAIN_MENU)
+
+        found = sum(1 for r in results if r['status'] == FOUND)
+        return True, f'Inspected {len(results)} orders ({found} found)', results
+
+    except NavigationError as e:
+        healthy = False
+        logger.error(str(e))
+        return fail_remaining(str(e))
+
+    except pexpect.TIMEOUT as e:
+        healthy = False
+        logger.error(f"Timed out waiting for RealWorld: {e}")
+        return fail_remaining('Timed out waiting for RealWorld')
+
+    except pexpect.EOF as e:
+        healthy = False
+        output = child.before if child and isinstance(child.before, str) else str(e)
+        if 'Unable to connect' in output or 'Connection refused' in output or 'No route to host' in output:
+            logger.error(f"RealWorld host unreachable: {output.strip()}")
+            return fail_remaining('RealWorld host unreachable')
+        logger.error(f"RealWorld connection closed: {e}")
+        return fail_remaining('RealWorld connection closed')
+
+    except Exception as e:
+        healthy = False
+        logger.error(f"Exception during inspection: {e}")
+        return fail_remaining('Inspection failed')
+
+    finally:
+        if pacer and recorder:
+            recorder.capture(FINAL)
+            pacer.recorder = None
+        if session:
+            sessions.checkin(session, healthy)
+        elif child:
+            close_telnet(child)
+
+def _describe(result):
+    if result['status'] == NOT_ON_FILE:
+        return 'Order not found in system'
+    return f"Ship total {result['ship_total']}"
+
+def inspect_order_from_source(order_number, distribution_center="00"):
+    """
+    Answer an order from the configured order source alone, without a session
+
+    Returns:
+        tuple: (True, str message, dict result), or None when the order has to
+               be looked up on screen
+    """
+    if distribution_center not in get_valid_distribution_centers():
+        return None
+    logger = setup_logger(distribution_center, order_number, "inspect_order")
+    answer = lookup_orders(distribution_center, [order_number], logger).get(str(order_number))
+    if not answer or (answer['status'] == FOUND and not answer['ship_total']):
+        return None
+    logger.info(f'Order source answered order {order_number}')
+    result = _cache_result(order_number, answer['status'], answer['ship_total'], distribution_center, logger)
+    return True, _describe(result), result
+
+def inspect_order(order_number, distribution_center="00", sessions=None, credential=None, recorder=None):
+    """
+    Look up one order in RealWorld without changing it
+
+    Returns:
+        tuple: (bool success, str message, dict result)
+    """
+    success, message, results = inspect_orders([order_number], distribution_center, sessions, credential,
+                                               recorder=recorder)
+    result = results[0]
+    if not success:
+        return False, message, result
+    return True, _describe(result), result
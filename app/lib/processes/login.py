@@ -3,21 +3,11 @@ Reset Order Process
 Handles the complete workflow to reset an order in RealWorld
 """
 
-import pexpect
 import time
 import re
 import os
-import sys
-from dotenv import load_dotenv
-from lib.functions import setup_logger
-load_dotenv()
+from lib.functions import setup_logger, spawn_telnet, close_telnet
 
-# Force allocation of a PTY for pexpect
-if not sys.stdin.isatty():
-    # Running without a TTY (like from Flask), create a pseudo-terminal
-    import pty
-    master, slave = pty.openpty()
-    os.environ['PEXPECT_FORCE_TTY'] = '1'
 
 def rwlogin(username, user_password):
     """
@@ -30,6 +20,7 @@ def rwlogin(username, user_password):
     Returns:
         bool: True if reset was successful, False otherwise
     """
+    
     logger = setup_logger("login_process")
     child = None
     
@@ -40,7 +31,7 @@ def rwlogin(username, user_password):
         # Connect to RealWorld via Telnet
         logger.info(f"Connecting to RealWorld at {host}:{port} with user {username}")
         # print(f"\n=== Starting Reset Process for Order: {host} (DC: {distribution_center}) ===\n")
-        child = pexpect.spawn(f'telnet {host} {port}', encoding='utf-8', timeout=30)
+        child = spawn_telnet(host, port, (user_password,))
         
         # Login
         logger.info("Logging into RealWorld system")
@@ -65,7 +56,4 @@ def rwlogin(username, user_password):
     
     finally:
         if child:
-            try:
-                child.close()
-            except:
-                pass
+            close_telnet(child)
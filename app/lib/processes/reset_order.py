@@ -3,40 +3,64 @@ Reset Order Process
 Handles the complete workflow to reset an order in RealWorld
 """
 
-import pexpect
-import time
-import re
 import os
-import sys
-from dotenv import load_dotenv
-from lib.functions import setup_logger, get_valid_distribution_centers
-load_dotenv()
+from lib.functions import setup_logger, get_valid_distribution_centers, spawn_telnet, close_telnet
+from lib.order_cache import get_cache_ttls, get_cached_order, cache_ship_total, cache_not_on_file, invalidate_order
+from lib.order_source import lookup_order, NOT_ON_FILE
+from lib.navigator import (Navigator, NavigationError, MAIN_MENU, VIEW_ORDER, ORDER_TOTALS, RESET_ORDER,
+                           ORDER_NOT_ON_FILE, PROCEDURE_COMPLETE, identify_screen, screen_marker,
+                           strip_ansi_codes)
+from lib.timing import Pacer, get_timing_store, HOST_LEVEL
+from lib.credentials import get_credential
+from lib.snapshots import FINAL
 
-# Force allocation of a PTY for pexpect
-if not sys.stdin.isatty():
-    # Running without a TTY (like from Flask), create a pseudo-terminal
-    import pty
-    master, slave = pty.openpty()
-    os.environ['PEXPECT_FORCE_TTY'] = '1'
 
-def reset_order(order_number, distribution_center="00"):
+# Checkpoints persisted per job so a retry can resume instead of starting over;
+# a captured ship total is trusted for RW_ORDER_CACHE_TTL like a cached one
+SHIP_TOTAL_CAPTURED = 'ship_total_captured'
+RESET_SUBMITTED = 'reset_submitted'
+RESET_COMPLETED = 'reset_completed'
+
+def reset_order(order_number, distribution_center="00", checkpoint=None, on_checkpoint=None, sessions=None,
+                credential=None, recorder=None):
     """
     Reset an order in RealWorld system using pexpect
     
     Args:
         order_number: The order number to reset
         distribution_center: Distribution center ID (default: "00")
-        employee_number: Employee number for login (default: "543")
-        employee_password: Employee password (default: system default)
-        host: Telnet host (default: 192.168.0.5)
-        username: Telnet login username 
-        user_password: Telnet login password
+        checkpoint: Last checkpoint of a previous attempt, {'step': ..., 'ship_total': ...,
+            'age_seconds': ...}; a captured ship total older than RW_ORDER_CACHE_TTL
+            is looked up again rather than trusted
+        on_checkpoint: Called as on_checkpoint(step, ship_total) when a step is confirmed.
+            RESET_SUBMITTED is recorded before the final confirmation is sent,
+            so an exception from the callback stops the reset.
+        sessions: lib.sessions.SessionCache to take a warm session from and return
+            it to; without one a session is opened and closed for this order.
+        credential: Name of the lib.credentials credential to log in with when
+            there is no session cache (the one leased from the host guard; the
+            pool's first by default). A cached session runs under the
+            credential the cache reserved it with.
+        recorder: lib.snapshots.ScreenRecorder to capture the screens in; the
+            final screen is captured however the reset ends
+    
+    The host comes from RW_HOST and RW_PORT.
     
     Returns:
-        bool: True if reset was successful, False otherwise
+        tuple: (bool success, str message)
     """
+    import pexpect  # Imported on first use so importing this module stays cheap
+    
     logger = setup_logger(distribution_center, order_number, "reset_order")
     child = None
+    session = None
+    pacer = None
+    healthy = False
+    checkpoint = checkpoint or {}
+    
+    def record(step, ship_total=None):
+        if on_checkpoint:
+            on_checkpoint(step, ship_total)
     
     # Dictionary of valid distribution centers 
     valid_distribution_centers = get_valid_distribution_centers()
@@ -44,175 +68,355 @@ def reset_order(order_number, distribution_center="00"):
     if distribution_center not in valid_distribution_centers:
         logger.error(f"Invalid distribution center: {distribution_center}. Aborting reset.")
         return False, 'Invalid company / distribution center'
+    
+    if checkpoint.get('step') == RESET_COMPLETED:
+        logger.info(f"Checkpoint shows order {order_number} was already reset, nothing to do")
+        return True, 'Reset completed successfully'
+    
+    # A previous attempt that sent the final confirmation may have reset the order
+    # even though we never saw "Procedure complete"; check before resubmitting
+    verify_previous_reset = checkpoint.get('step') == RESET_SUBMITTED
+    
+    # The ship total from an earlier attempt, or a recent lookup of this order,
+    # lets us skip the View Order screens (or the whole session)
+    ship_total = None
+    resumed = False
+    if checkpoint.get('step') == SHIP_TOTAL_CAPTURED and checkpoint.get('ship_total'):
+        age = checkpoint.get('age_seconds')
+        if age is not None and age < get_cache_ttls()[0]:
+            ship_total = checkpoint['ship_total']
+            resumed = True
+            logger.info(f'Resuming from checkpoint, ship total for order {order_number}: {ship_total}')
+        else:
+            logger.info(f'Ship total checkpoint for order {order_number} is {age}s old, looking it up again')
+    if ship_total is None and not verify_previous_reset:
+        try:
+            cached = get_cached_order(distribution_center, order_number)
+        except Exception as e:
+            logger.warning(f"Order cache unavailable: {e}")
+            cached = None
+        
+        if cached and cached['not_on_file']:
+            logger.error(f'Order {order_number} not found in system (cached {cached["cached_at"]}). Aborting reset.')
+            return False, 'Order not found in system'
+        if cached and cached['ship_total']:
+            ship_total = cached['ship_total']
+            logger.info(f'Using cached ship total for order {order_number}: {ship_total} (cached {cached["cached_at"]})')
 
-    current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        if ship_total is None:
+            # The SQL source answers without a session; anything it cannot answer is read from F3
+            source = lookup_order(distribution_center, order_number, logger)
+            if source and source['status'] == NOT_ON_FILE:
+                logger.error(f'Order {order_number} not found in order source. Aborting reset.')
+                try:
+                    cache_not_on_file(distribution_center, order_number)
+                except Exception as e:
+                    logger.warning(f"Could not cache order lookup: {e}")
+                return False, 'Order not found in system'
+            if source and source['ship_total'] and source['ship_total'] != '0.00':
+                ship_total = source['ship_total']
+                logger.info(f'Ship total for order {order_number} from order source: {ship_total}')
+                try:
+                    cache_ship_total(distribution_center, order_number, ship_total)
+                except Exception as e:
+                    logger.warning(f"Could not cache order lookup: {e}")
 
     host = os.getenv('RW_HOST', '')
     port = os.getenv('RW_PORT', '23')
-    username = os.getenv('RW_USERNAME', '')
-    user_password = os.getenv('RW_PASSWORD', '')
-    employee_number = os.getenv('RW_EMPLOYEE_NUMBER', '')
-    employee_password = os.getenv('RW_EMPLOYEE_PASSWORD', '')
 
     try:
-        # Connect to RealWorld via Telnet
-        logger.info(f"Connecting to RealWorld at {host}:{port} with user {username}, employee {employee_number}")
-        # print(f"\n=== Starting Reset Process for Order: {host} (DC: {distribution_center}) ===\n")
-        child = pexpect.spawn(f'telnet {host} {port}', encoding='utf-8', timeout=30)
-        
-        # Login
-        logger.info("Logging into RealWorld system")
-        # print("=== Logging in ===")
-        child.expect('login:')
-        child.sendline(username)
-        child.expect('Password:')
-        child.sendline(user_password)
-        time.sleep(3.5)
-        
-        if('Login incorrect' in child.before):
-            logger.error("Login incorrect. Aborting reset.")
-            return False, 'Login incorrect'
-        
-        # Wait for main menu
-        # child.expect('your selection', timeout=40)
-        child.expect([pexpect.TIMEOUT], timeout=2)
-        time.sleep(1)
-        
-        # Navigate to accounting
-        child.send('1\n')
-        time.sleep(1)
-        
-        # print('\n=== FINAL OUTPUT ===\n')
-        # print(child.before)
-        # child.close()
-        # print('\n=== END FINAL OUTPUT ===\n')
-        # return False
-        
-        child.expect('company-ID', timeout=10)
-        time.sleep(0.8)
-        child.send(f'{distribution_center}\r')
-        child.expect('Right company', timeout=5)
-        child.send('\r')
-        child.expect('Press ENTER to continue', timeout=5)
-        child.send('\r')
-        
-        # Enter employee details
-        child.expect('employee #', timeout=5)
-        time.sleep(0.75)
-        child.send(f'{employee_number}\r')
-        child.expect('Any change', timeout=5)
-        child.send('\r')
-        child.expect('Please enter password', timeout=5)
-        time.sleep(0.75)
-        child.send(f'{employee_password}\r')
-        time.sleep(1)
-        
-        # Get order total
-        logger.info("Retrieving Ship Total")
-        # print('=== Retrieving Ship Total ===')
-        child.send('3\r')  # Order Entry
-        time.sleep(1)
-        child.send('2\r')  # View Order
-        time.sleep(1)
-        child.send('\r\r')  # Enter twice
-        time.sleep(1)
-        child.send(f'{order_number}\r')  # Order number    
-        time.sleep(1.25)
-        
-        # does the screen say Order not on file ?
-        child.expect([pexpect.TIMEOUT], timeout=2)
-        if 'Order not on file' in child.before:
-            logger.error(f'Order {order_number} not found in system. Aborting reset.')
-            # print(f'*** ERROR: Order {order_number} not found in system. Aborting reset. ***')
-            return False, 'Order not found in system'
-        
-        child.send('\x1b[13~')  # F3
-        time.sleep(1.5)
-        
-        # Parse ship total
-        child.expect([pexpect.TIMEOUT], timeout=1)
-
-        ship_total = extract_ship_total(child.before)
-        
-        # if ship_total is not true 
-        if not ship_total or ship_total == '0.00':
-            logger.error(f'Could not retrieve valid ship total for order {order_number}. Aborting reset.')
-            # print(f'*** ERROR: Could not retrieve valid ship total for order {order_number}. Aborting reset. ***')
-            return False, 'Could not find a ship total'
-        
-        # print(f'Ship Total for Order {order_number}: {ship_total}\n')
-        logger.info(f'Ship total for order {order_number}: {ship_total}')
-        
-        # Navigate back to menu
-        # print('=== Navigating back to reset menu ===')
-        logger.info("Navigating back to reset menu")
-        child.send('\t\t\r\t\t')  # TAB TAB ENTER TAB TAB
-        time.sleep(3)
+        if sessions is not None:
+            session, message = sessions.checkout(distribution_center, logger)
+            if not session:
+                return False, message
+            child, nav, pacer = session.child, session.nav, session.pacer
+            pacer.recorder = recorder
+        else:
+            login = get_credential(credential)
+            if not login:
+                logger.error(f"Unknown RealWorld credential {credential}. Aborting reset.")
+                return False, 'Unknown RealWorld credential'
+            username, user_password = login['username'], login['password']
+            employee_number, employee_password = login['employee_number'], login['employee_password']
+            
+            # Connect to RealWorld via Telnet
+            logger.info(f"Connecting to RealWorld at {host}:{port} with user {username}, employee {employee_number}")
+            child = spawn_telnet(host, port, (user_password, employee_password))
+            pacer = Pacer(child, get_timing_store(host))
+            pacer.recorder = recorder
+            
+            logged_in, message = login_to_company(child, distribution_center, username, user_password,
+                                                   employee_number, employee_password, logger, pacer)
+            if not logged_in:
+                return False, message
+            nav = Navigator(child, logger, MAIN_MENU, pacer)
         
-        # Go to reset menu
-        # print('=== Going to reset menu ===')
-        logger.info("Navigating to reset order menu")
-        child.send('8\r')
-        time.sleep(2)
-        child.send('22\r')
-        time.sleep(2)
+        # Anything that returns from here on leaves the session usable
+        healthy = True
         
-        # Enter order details
-        # print('=== Entering order for reset ===')
-        logger.info("Entering order details for reset")
-        child.send('\r')  # Move to next field
-        time.sleep(1)
-        child.send(f'{order_number}\r')  # Order number
-        time.sleep(2)
-        child.send('\r\r')  # ENTER twice
-        time.sleep(2)
+        if ship_total is None:
+            found, ship_total = lookup_ship_total(child, order_number, logger, nav)
+            
+            if not found:
+                logger.error(f'Order {order_number} not found in system. Aborting reset.')
+                try:
+                    cache_not_on_file(distribution_center, order_number)
+                except Exception as e:
+                    logger.warning(f"Could not cache order lookup: {e}")
+                return False, 'Order not found in system'
+            
+            if verify_previous_reset and ship_total == '0.00':
+                # The order's ship total is now zero: the submitted reset went through.
+                # No total at all is a missed read, not a confirmation, and fails below.
+                logger.info(f'Order {order_number} shows a zero ship total after a submitted reset, treating it as completed')
+                record(RESET_COMPLETED)
+                return True, 'Reset completed successfully (confirmed on retry)'
+            
+            # if ship_total is not true 
+            if not ship_total or ship_total == '0.00':
+                logger.error(f'Could not retrieve valid ship total for order {order_number}. Aborting reset.')
+                return False, 'Could not find a ship total'
+            
+            if verify_previous_reset:
+                logger.info(f'Order {order_number} still has ship total {ship_total}, previous reset did not apply')
+            
+            logger.info(f'Ship total for order {order_number}: {ship_total}')
+            record(SHIP_TOTAL_CAPTURED, ship_total)
+            try:
+                cache_ship_total(distribution_center, order_number, ship_total)
+            except Exception as e:
+                logger.warning(f"Could not cache order lookup: {e}")
         
-        # Confirm and enter ship total
-        # print('=== Confirming and entering ship total ===')
-        logger.info("Confirming reset and entering ship total")
-        child.send('Y\r')  # Yes to confirmation
-        time.sleep(2)
-        child.send(f'{ship_total}\r')  # Enter ship total
-        time.sleep(2)
-        child.send('Y\r')  # Final confirmation
-        time.sleep(3)
+            # Navigate back to menu
+            logger.info("Navigating back to main menu")
+            nav.ensure(MAIN_MENU)
+        elif not resumed:
+            # Recording it again would make a resumed checkpoint look fresh
+            record(SHIP_TOTAL_CAPTURED, ship_total)
         
-        # Check for completion
-        # print('=== Checking for completion ===')
-        logger.info("Checking for reset completion")
-        child.expect([pexpect.TIMEOUT], timeout=10)
-        final_output = child.before
+        final_output = submit_reset(child, order_number, ship_total, logger,
+                                    before_confirm=lambda: record(RESET_SUBMITTED, ship_total), nav=nav)
 
         if 'Procedure complete' in final_output or 'Procedure Complete' in final_output:
             print('SUCCESS! Order reset completed!')
             logger.info("Order reset completed successfully")
+            record(RESET_COMPLETED, ship_total)
+            try:
+                invalidate_order(distribution_center, order_number)
+            except Exception as e:
+                logger.warning(f"Could not invalidate cached order: {e}")
             return True, 'Reset completed successfully'
         else:
             # print('WARNING: Did not find "Procedure Complete"')
             logger.warning('Did not find "Procedure Complete"')
-            logger.warning(f"Final output received:\n\n{final_output}")
-            # print('\n=== FINAL OUTPUT ===')
-            # print(final_output)
+            try:
+                # The ship total may have been stale; look it up again next attempt
+                invalidate_order(distribution_center, order_number)
+            except Exception as e:
+                logger.warning(f"Could not invalidate cached order: {e}")
+            if recorder:
+                logger.warning("Final screen stored with the job's snapshots")
+            else:
+                logger.warning(f"Final output received:\n\n{final_output}")
             return False, 'Reset failed'
     
+    except NavigationError as e:
+        healthy = False
+        logger.error(str(e))
+        return False, str(e)
+    
+    except pexpect.TIMEOUT as e:
+        healthy = False
+        logger.error(f"Timed out waiting for RealWorld: {e}")
+        return False, 'Timed out waiting for RealWorld'
+    
+    except pexpect.EOF as e:
+        healthy = False
+        output = child.before if child and isinstance(child.before, str) else str(e)
+        if 'Unable to connect' in output or 'Connection refused' in output or 'No route to host' in output:
+            logger.error(f"RealWorld host unreachable: {output.strip()}")
+            return False, 'RealWorld host unreachable'
+        logger.error(f"RealWorld connection closed: {e}")
+        return False, 'RealWorld connection closed'
+    
     except Exception as e:
+        healthy = False
         print(f"Error during reset process: {e}")
         logger.error(f"Exception during reset process: {e}")
         return False, 'Reset failed'
     
     finally:
-        if child:
-            try:
-                child.close()
-            except:
-                pass
-            
-def strip_ansi_codes(text):
-    """Remove ANSI escape sequences from text"""
-    # Pattern matches: ESC [ ... m  or  ESC [ ... H  etc.
-    ansi_escape = re.compile(r'\x1b\[[0-9;]*[a-zA-Z]')
-    return ansi_escape.sub('', text)
+        if pacer and recorder:
+            recorder.capture(FINAL)
+            pacer.recorder = None
+        if session:
+            sessions.checkin(session, healthy)
+        elif child:
+            close_telnet(child)
+
+def login_to_company(child, distribution_center, username, user_password, employee_number, employee_password, logger,
+                     pacer=None):
+    """
+    Log in on a fresh telnet session and enter a company as an employee
+    
+    Leaves the session on the main menu of the company.
+    
+    Returns:
+        tuple: (bool success, str message)
+    """
+    logged_in, message = telnet_login(child, username, user_password, logger, pacer)
+    if not logged_in:
+        return False, message
+    return enter_company(child, distribution_center, employee_number, employee_password, logger, pacer)
+
+def telnet_login(child, username, user_password, logger, pacer=None):
+    """
+    Log in on a fresh telnet session, leaving it on the top menu
+    
+    Args:
+        pacer: lib.timing.Pacer timing the screens (fixed waits without one)
+    
+    Returns:
+        tuple: (bool success, str message)
+    """
+    pacer = pacer or Pacer(child)
+    pacer.distribution_center = HOST_LEVEL
+    
+    # Login
+    logger.info("Logging into RealWorld system")
+    pacer.expect('connect', 'login:', 30)
+    child.sendline(username)
+    pacer.expect('password_prompt', 'Password:', 30)
+    pacer.send(f'{user_password}\n')
+    
+    # Wait for the top menu
+    output = pacer.wait('login', 6.5, timeout=40)
+    
+    if 'Login incorrect' in output:
+        logger.error("Login incorrect. Aborting reset.")
+        return False, 'Login incorrect'
+    
+    return True, 'Logged in'
 
+def enter_company(child, distribution_center, employee_number, employee_password, logger, pacer=None):
+    """
+    Enter a company as an employee from the top menu
+    
+    Used right after login and to switch company on an open session.
+    Leaves the session on the main menu of the company.
+    
+    Args:
+        pacer: lib.timing.Pacer timing the screens (fixed waits without one)
+    
+    Returns:
+        tuple: (bool success, str message)
+    """
+    pacer = pacer or Pacer(child)
+    pacer.distribution_center = HOST_LEVEL  # Company screens don't depend on which company
+    
+    # Navigate to accounting
+    logger.info(f"Entering company {distribution_center}")
+    child.send('1\n')
+    
+    pacer.expect('company_id', 'company-ID', 11, settle=0.8)
+    child.send(f'{distribution_center}\r')
+    pacer.expect('right_company', 'Right company', 5)
+    child.send('\r')
+    pacer.expect('press_enter', 'Press ENTER to continue', 5)
+    child.send('\r')
+    
+    # Enter employee details
+    pacer.expect('employee_number', 'employee #', 5, settle=0.75)
+    child.send(f'{employee_number}\r')
+    pacer.expect('any_change', 'Any change', 5)
+    child.send('\r')
+    pacer.expect('employee_password', 'Please enter password', 5, settle=0.75)
+    pacer.send(f'{employee_password}\r')
+    
+    pacer.distribution_center = distribution_center
+    pacer.wait('main_menu', 1, marker=screen_marker(MAIN_MENU))
+    
+    return True, 'Logged in'
+
+def lookup_ship_total(child, order_number, logger, nav=None):
+    """
+    Open the order in View Order and scrape the ship total from the F3 screen
+    
+    Starts from the main menu and leaves the session on the F3 totals screen
+    (or on the "Order not on file" message).
+    
+    Args:
+        nav: Navigator tracking the session (a new one is assumed on the main menu)
+    
+    Returns:
+        tuple: (bool order found, str ship total or None)
+    """
+    
+    nav = nav or Navigator(child, logger, MAIN_MENU)
+    
+    # Get order total
+    logger.info("Retrieving Ship Total")
+    nav.ensure(VIEW_ORDER)  # Order Entry, View Order, Enter twice
+    nav.pacer.send(f'{order_number}\r')  # Order number
+    output = nav.pacer.wait('view_order_lookup', 3.25)
+    
+    # does the screen say Order not on file ?
+    if 'Order not on file' in output:
+        nav.position = ORDER_NOT_ON_FILE
+        return False, None
+    
+    nav.pacer.send('\x1b[13~')  # F3
+    output = nav.pacer.wait('order_totals', 2.5, marker=screen_marker(ORDER_TOTALS))
+    
+    # Parse ship total
+    nav.position = ORDER_TOTALS
+    
+    return True, extract_ship_total(output)
+
+def submit_reset(child, order_number, ship_total, logger, before_confirm=None, nav=None):
+    """
+    Run the reset on the 8/22 screen, starting from the main menu
+    
+    Args:
+        before_confirm: Called right before the final confirmation is sent
+        nav: Navigator tracking the session (a new one is assumed on the main menu)
+    
+    Returns:
+        str: Screen output received after the final confirmation
+    """
+    
+    nav = nav or Navigator(child, logger, MAIN_MENU)
+    pacer = nav.pacer
+    
+    # Go to reset menu
+    logger.info("Navigating to reset order menu")
+    nav.ensure(RESET_ORDER)  # 8, 22
+    
+    # Enter order details
+    logger.info("Entering order details for reset")
+    pacer.send('\r')  # Move to next field
+    output = pacer.wait('reset_warehouse', 1)
+    pacer.send(f'{order_number}\r')  # Order number
+    output += pacer.wait('reset_order_number', 2)
+    pacer.send('\r\r')  # ENTER twice
+    output += pacer.wait('reset_order_fields', 2)
+    
+    # Confirm and enter ship total
+    logger.info("Confirming reset and entering ship total")
+    pacer.send('Y\r')  # Yes to confirmation
+    output += pacer.wait('reset_confirm', 2)
+    pacer.send(f'{ship_total}\r')  # Enter ship total
+    output += pacer.wait('reset_ship_total', 2)
+    if before_confirm:
+        before_confirm()
+    pacer.send('Y\r')  # Final confirmation
+    
+    # Check for completion
+    logger.info("Checking for reset completion")
+    output += pacer.wait('reset_complete', 13, timeout=40, marker=screen_marker(PROCEDURE_COMPLETE))
+    nav.position = PROCEDURE_COMPLETE if identify_screen(output) == PROCEDURE_COMPLETE else None
+    return output
+            
 def extract_ship_total(text):
     """
     Extract ship total from given text.
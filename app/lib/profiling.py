@@ -0,0 +1,181 @@
+"""
+Profiling
+Opt-in cProfile capture of single jobs and API requests.
+
+A run is profiled when any of these asks for it:
+
+    RW_PROFILE=jobs, requests or all     every job / request of that kind
+    RW_PROFILE_SAMPLE=0.05               that fraction of them, at random
+    profile: true on a job submission    that job (RwAutomator_Log.profile)
+    X-Profile: 1 request header          that request (signed-in users only)
+
+Each profile is written to RW_PROFILE_DIR (/app/process-logs by default) as
+a .prof file for pstats/snakeviz and a .txt summary of the hottest functions
+by cumulative and own time, so a slow reset can be read straight from
+/api/profiles without copying files off the host.
+"""
+
+import io
+import os
+import re
+import time
+import random
+import pstats
+import cProfile
+from contextlib import contextmanager
+
+JOBS = 'jobs'
+REQUESTS = 'requests'
+ALL = 'all'
+
+PROFILE_NAME_PATTERN = re.compile(r'^profile_[A-Za-z0-9_.-]+\.(prof|txt)$')
+
+def get_profile_settings():
+    """
+    Profiling settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'mode': os.getenv('RW_PROFILE', '').strip().lower(),
+        'sample': float(os.getenv('RW_PROFILE_SAMPLE', '0')),
+        'directory': os.getenv('RW_PROFILE_DIR', '/app/process-logs'),
+        'keep': int(os.getenv('RW_PROFILE_KEEP', '200')),
+        'top': int(os.getenv('RW_PROFILE_TOP', '40')),
+    }
+
+def should_profile(kind, requested=False, settings=None):
+    """
+    True if a run of this kind (JOBS or REQUESTS) is to be profiled
+
+    Args:
+        kind: JOBS or REQUESTS
+        requested: The job or request asked for a profile itself
+    """
+    if requested:
+        return True
+    settings = settings or get_profile_settings()
+    if settings['mode'] in (kind, ALL):
+        return True
+    return settings['sample'] > 0 and random.random() < settings['sample']
+
+def _safe(label):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', str(label)).strip('-')[:80] or 'run'
+
+def _summary(profile, top):
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.strip_dirs()
+    stream.write('By cumulative time\n\n')
+    stats.sort_stats('cumulative').print_stats(top)
+    stream.write('\nBy own time\n\n')
+    stats.sort_stats('tottime').print_stats(top)
+    return stream.getvalue()
+
+def _prune(directory, keep):
+    """Delete the oldest profiles beyond the newest keep runs"""
+    runs = {}
+    for name in os.listdir(directory):
+        if PROFILE_NAME_PATTERN.match(name):
+            runs.setdefault(name.rsplit('.', 1)[0], []).append(os.path.join(directory, name))
+    stale = sorted(runs, key=lambda run: os.path.getmtime(runs[run][0]), reverse=True)[keep:]
+    for run in stale:
+        for path in runs[run]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def save_profile(profile, kind, label, elapsed, settings=None):
+    """
+    Write a finished profile and its text summary
+
+    Returns:
+        str: Path of the .prof file
+    """
+    settings = settings or get_profile_settings()
+    directory = settings['directory']
+    os.makedirs(directory, exist_ok=True)
+
+    timestamp = time.strftime('%Y%m%d_%H%M%S') + f'_{int(time.time() * 1000) % 1000:03d}'
+    base = os.path.join(directory, f'profile_{kind}_{_safe(label)}_{timestamp}')
+
+    profile.dump_stats(base + '.prof')
+    with open(base + '.txt', 'w') as f:
+        f.write(f'{kind} {label}: {elapsed:.3f}s wall time\n\n')
+        f.write(_summary(profile, settings['top']))
+
+    _prune(directory, settings['keep'])
+    return base + '.prof'
+
+@contextmanager
+def profiled(kind, label, requested=False):
+    """
+    Profile the body of the with block if should_profile() says so
+
+    Errors writing the profile are printed, never raised into the run.
+    """
+    settings = get_profile_settings()
+    if not should_profile(kind, requested, settings):
+        yield None
+        return
+
+    profile = cProfile.Profile()
+    start = time.time()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        try:
+            path = save_profile(profile, kind, label, time.time() - start, settings)
+            print(f"Profile written to {path}")
+        except Exception as e:
+            print(f"Warning: Could not write profile: {e}")
+
+def list_profiles(directory=None):
+    """
+    Profiles on disk, newest first
+
+    Returns:
+        list: Dicts with name (without extension), kind, size of the .prof
+              file, created_at and summary (whether a .txt summary exists)
+    """
+    directory = directory or get_profile_settings()['directory']
+    if not os.path.isdir(directory):
+        return []
+
+    profiles = []
+    for name in os.listdir(directory):
+        if not name.endswith('.prof') or not PROFILE_NAME_PATTERN.match(name):
+            continue
+        path = os.path.join(directory, name)
+        base = name[:-len('.prof')]
+        stat = os.stat(path)
+        profiles.append({
+            'modified': stat.st_mtime,
+            'name': base,
+            'kind': base.split('_')[1],
+            'size': stat.st_size,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(stat.st_mtime)),
+            'summary': os.path.exists(os.path.join(directory, base + '.txt')),
+        })
+    profiles.sort(key=lambda p: p['modified'], reverse=True)
+    for profile in profiles:
+        del profile['modified']
+    return profiles
+
+def get_profile_path(name, extension, directory=None):
+    """
+    Path of one profile file, or None if there is no such profile
+
+    The name is checked against PROFILE_NAME_PATTERN, so it cannot reach
+    outside the profile directory.
+    """
+    directory = directory or get_profile_settings()['directory']
+    filename = f'{name}.{extension}'
+    if not PROFILE_NAME_PATTERN.match(filename):
+        return None
+    path = os.path.join(directory, filename)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,68 @@
+"""
+Retry Policy
+Classifies job failures and decides whether, and when, a failed job runs again
+"""
+
+import os
+import random
+
+PERMANENT = 'permanent'
+TRANSIENT = 'transient'
+
+# Failures that will not go away by running the same job again. Anything
+# else (timeouts, lost sessions, a missed ship total, "Reset failed") is
+# caused by the RealWorld host or the telnet session and is retried.
+# Matched anywhere in the message, since every result message from
+# rw_automate.py starts with "Reset failed:".
+PERMANENT_FAILURES = [
+    'Invalid company / distribution center',
+    'Order not found in system',
+    'Login incorrect',
+]
+
+def classify_failure(message):
+    """
+    Classify a job failure message
+
+    Args:
+        message: The result message stored for the failed attempt
+
+    Returns:
+        str: PERMANENT or TRANSIENT (unrecognised failures are treated as transient)
+    """
+    message = message or ''
+    for pattern in PERMANENT_FAILURES:
+        if pattern in message:
+            return PERMANENT
+    return TRANSIENT
+
+def get_max_attempts(failure_class):
+    """
+    Attempt limit for a failure class, from RW_MAX_ATTEMPTS_PERMANENT / RW_MAX_ATTEMPTS_TRANSIENT
+
+    Returns:
+        int: Total number of attempts a job may use
+    """
+    if failure_class == PERMANENT:
+        return int(os.getenv('RW_MAX_ATTEMPTS_PERMANENT', '1'))
+    return int(os.getenv('RW_MAX_ATTEMPTS_TRANSIENT', '3'))
+
+def get_retry_delay(attempts):
+    """
+    Seconds to wait before the next attempt: exponential backoff with jitter
+
+    The window doubles with every attempt (RW_RETRY_BASE_SECONDS, capped at
+    RW_RETRY_MAX_SECONDS) and the delay is drawn from its upper half, so
+    retries never fire immediately but jobs that failed together spread out.
+
+    Args:
+        attempts: Number of attempts already made
+
+    Returns:
+        int: Delay in seconds
+    """
+    base = float(os.getenv('RW_RETRY_BASE_SECONDS', '30'))
+    cap = float(os.getenv('RW_RETRY_MAX_SECONDS', '900'))
+
+    window = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return int(window / 2 + random.uniform(0, window / 2))
@@ -0,0 +1,336 @@
+"""
+Job Scheduler
+Decides the order in which queued RwAutomator_Log jobs are handed to the worker,
+and holds deferred work until its window opens
+"""
+
+import os
+import re
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+# Priority classes, lower runs first
+PRIORITY_URGENT = 0
+PRIORITY_SINGLE = 1
+PRIORITY_BATCH = 2
+
+
+def job_priority(job_type, urgent=False):
+    """
+    Work out the priority class for a new job
+
+    Args:
+        job_type: Job type as submitted by the dashboard
+        urgent: True when the requester flagged the reset as urgent
+
+    Returns:
+        int: One of PRIORITY_URGENT, PRIORITY_SINGLE, PRIORITY_BATCH
+    """
+    if urgent:
+        return PRIORITY_URGENT
+    if job_type and 'Batch' in job_type:
+        return PRIORITY_BATCH
+    return PRIORITY_SINGLE
+
+def get_urgent_tickets():
+    """
+    Ticket numbers that should jump the queue, from RW_URGENT_TICKETS (comma separated)
+
+    Returns:
+        set: Urgent ticket numbers
+    """
+    tickets = os.getenv('RW_URGENT_TICKETS', '')
+    return {ticket.strip() for ticket in tickets.split(',') if ticket.strip()}
+
+def effective_priority(job, urgent_tickets=None):
+    """Priority class of a queued job, taking ticket urgency into account"""
+    if urgent_tickets is None:
+        urgent_tickets = get_urgent_tickets()
+
+    priority = job.get('priority')
+    if priority is None:
+        priority = job_priority(job.get('job_type'))
+
+    if job.get('ticket_number') and job['ticket_number'] in urgent_tickets:
+        priority = PRIORITY_URGENT
+
+    return priority
+
+def schedule_jobs(jobs):
+    """
+    Order queued jobs by priority class, then fair share.
+
+    Inside a priority class every rw_user gets one job per round, and each
+    user's own turns rotate over the distribution centers they have work in.
+    A user pasting 1,000 orders for one DC therefore only ever sits one job
+    ahead of anybody else in the same class.
+
+    Args:
+        jobs: List of job dicts (as returned by get_queued_jobs)
+
+    Returns:
+        list: The same jobs, in dispatch order
+    """
+    urgent_tickets = get_urgent_tickets()
+
+    # priority -> rw_user -> distribution_center -> jobs (oldest first)
+    queues = defaultdict(lambda: defaultdict(lambda: defaultdict(deque)))
+    for job in sorted(jobs, key=lambda j: j.get('requested_at') or ''):
+        priority = effective_priority(job, urgent_tickets)
+        user = job.get('rw_user') or ''
+        dc = job.get('distribution_center') or ''
+        queues[priority][user][dc].append(job)
+
+    keyed = []
+    for priority, users in queues.items():
+        for user, dcs in users.items():
+            # Round robin over this user's distribution centers
+            turn = 0
+            dc_queues = deque(dcs.values())
+            while dc_queues:
+                dc_queue = dc_queues.popleft()
+                job = dc_queue.popleft()
+                keyed.append(((priority, turn, job.get('requested_at') or ''), job))
+                turn += 1
+                if dc_queue:
+                    dc_queues.append(dc_queue)
+
+    keyed.sort(key=lambda item: item[0])
+    return [job for _, job in keyed]
+
+def get_affinity_settings():
+    """
+    DC affinity settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'lookahead': int(os.getenv('RW_AFFINITY_LOOKAHEAD', '20')),
+        'max_skip_seconds': int(os.getenv('RW_AFFINITY_MAX_SKIP_SECONDS', '300')),
+    }
+
+def _waited_seconds(job, now):
+    try:
+        return (now - datetime.fromisoformat(job['requested_at'])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+def next_job(jobs, exclude_job_ids=(), warm_dcs=()):
+    """
+    Pick the next job to dispatch
+
+    With warm_dcs, a job for a DC an idle session is already in may go ahead
+    of the job at the head of the queue, as long as it is in the same
+    priority class, within the first RW_AFFINITY_LOOKAHEAD jobs, and the head
+    job hasn't waited longer than RW_AFFINITY_MAX_SKIP_SECONDS.
+
+    Args:
+        jobs: List of queued job dicts
+        exclude_job_ids: Job IDs already handed to a worker
+        warm_dcs: Distribution centers with an idle warm session
+
+    Returns:
+        dict: The job to run next, or None if nothing is runnable
+    """
+    runnable = [job for job in schedule_jobs(jobs) if job['job_id'] not in exclude_job_ids]
+    if not runnable:
+        return None
+
+    head = runnable[0]
+    if not warm_dcs or head.get('distribution_center') in warm_dcs:
+        return head
+
+    settings = get_affinity_settings()
+    if _waited_seconds(head, datetime.now()) > settings['max_skip_seconds']:
+        return head
+
+    urgent_tickets = get_urgent_tickets()
+    head_priority = effective_priority(head, urgent_tickets)
+    for job in runnable[1:settings['lookahead']]:
+        if effective_priority(job, urgent_tickets) != head_priority:
+            break
+        if job.get('distribution_center') in warm_dcs:
+            return job
+    return head
+
+WINDOW_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$')
+
+def parse_window(window):
+    """
+    Parse a daily time window such as '22:00-06:00' (it may wrap past midnight)
+
+    Returns:
+        tuple: (start, end) in minutes after midnight
+
+    Raises:
+        ValueError: If the window is not HH:MM-HH:MM
+    """
+    match = WINDOW_PATTERN.match((window or '').strip())
+    if not match:
+        raise ValueError(f"Invalid time window '{window}', expected HH:MM-HH:MM")
+    start_hour, start_minute, end_hour, end_minute = (int(part) for part in match.groups())
+    if start_hour > 23 or end_hour > 23 or start_minute > 59 or end_minute > 59:
+        raise ValueError(f"Invalid time window '{window}', expected HH:MM-HH:MM")
+    return start_hour * 60 + start_minute, end_hour * 60 + end_minute
+
+def parse_schedule(not_before=None, execution_window=None, off_peak=False):
+    """
+    Validate the scheduling options of a job submission
+
+    Args:
+        not_before: ISO date/time the job may not start before, or None
+        execution_window: Daily 'HH:MM-HH:MM' window the job may start in, or None
+        off_peak: Use RW_OFF_PEAK_WINDOW when no execution_window is given
+
+    Returns:
+        tuple: (datetime not_before or None, str execution_window or None)
+
+    Raises:
+        ValueError: If a value is invalid
+    """
+    if not_before:
+        try:
+            not_before = datetime.fromisoformat(str(not_before).strip())
+        except ValueError:
+            raise ValueError(f"Invalid not_before '{not_before}', expected an ISO date/time")
+        if not_before.tzinfo:
+            # Stored and compared as server local time, like GETDATE()
+            not_before = not_before.astimezone().replace(tzinfo=None)
+    else:
+        not_before = None
+
+    if not execution_window and off_peak:
+        execution_window = os.getenv('RW_OFF_PEAK_WINDOW', '20:00-05:00')
+    if execution_window:
+        execution_window = execution_window.strip()
+        parse_window(execution_window)
+    else:
+        execution_window = None
+
+    return not_before, execution_window
+
+def in_window(window, now=None):
+    """True if now falls inside a daily HH:MM-HH:MM window"""
+    start, end = parse_window(window)
+    now = now or datetime.now()
+    minute = now.hour * 60 + now.minute
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+def get_blackout_windows(strict=False):
+    """
+    Per-DC blackout windows from RW_BLACKOUT_WINDOWS
+
+    Entries are separated by semicolons, each DC=HH:MM-HH:MM[,HH:MM-HH:MM...];
+    DC * applies to every distribution center, e.g. '*=07:00-17:00;05=06:00-18:30'.
+    Malformed entries and windows are skipped, so one typo cannot stall
+    dispatch; the worker checks the setting with strict=True at startup.
+
+    Returns:
+        dict: distribution_center -> list of windows
+
+    Raises:
+        ValueError: With strict=True, if an entry or window is malformed
+    """
+    blackouts = defaultdict(list)
+    for entry in os.getenv('RW_BLACKOUT_WINDOWS', '').split(';'):
+        if not entry.strip():
+            continue
+        if '=' not in entry:
+            if strict:
+                raise ValueError(f"Invalid RW_BLACKOUT_WINDOWS entry '{entry}', expected DC=HH:MM-HH:MM")
+            continue
+        dc, windows = entry.split('=', 1)
+        for window in windows.split(','):
+            if not window.strip():
+                continue
+            try:
+                parse_window(window)
+            except ValueError:
+                if strict:
+                    raise
+                continue
+            blackouts[dc.strip()].append(window.strip())
+    return dict(blackouts)
+
+def is_deferrable(job, urgent_tickets=None):
+    """
+    True for work that can wait for off-peak hours: batch-class jobs and jobs
+    submitted with a not_before time or an execution window
+    """
+    if job.get('not_before') or job.get('execution_window'):
+        return True
+    return effective_priority(job, urgent_tickets) == PRIORITY_BATCH
+
+def in_blackout(distribution_center, blackouts=None, now=None):
+    """True while a DC is inside one of its blackout windows"""
+    if blackouts is None:
+        blackouts = get_blackout_windows()
+    windows = blackouts.get('*', []) + blackouts.get(distribution_center, [])
+    return any(in_window(window, now) for window in windows)
+
+def releasable_jobs(jobs, now=None):
+    """
+    Drop queued jobs that may not start yet
+
+    A job with an execution window only starts inside it, and deferrable work
+    (see is_deferrable) for a DC in a blackout window waits for the blackout to
+    end. Single and urgent resets are never held by a blackout, so warehouse
+    staff still get interactive resets during shifts. not_before is already
+    applied by get_queued_jobs.
+
+    Args:
+        jobs: List of queued job dicts
+        now: Time to check against (default: now)
+
+    Returns:
+        list: Jobs that may be dispatched now
+    """
+    now = now or datetime.now()
+    blackouts = get_blackout_windows()
+    urgent_tickets = get_urgent_tickets()
+    released = []
+    for job in jobs:
+        try:
+            if job.get('execution_window') and not in_window(job['execution_window'], now):
+                continue
+        except ValueError:
+            pass  # An unparseable window never holds a job forever
+        if is_deferrable(job, urgent_tickets) and in_blackout(job.get('distribution_center'), blackouts, now):
+            continue
+        released.append(job)
+    return released
+
+
+class ReleaseThrottle:
+    """
+    Caps how many deferrable jobs are started per minute
+
+    When a window opens or a blackout ends, a large backlog becomes runnable at
+    once; the throttle ramps it onto the host instead of logging every executor
+    in within the same few seconds.
+    """
+
+    def __init__(self, per_minute=None):
+        if per_minute is None:
+            per_minute = int(os.getenv('RW_DEFERRED_RELEASE_PER_MINUTE', '30'))
+        self.per_minute = per_minute
+        self.released = deque()
+
+    def _expire(self, now):
+        while self.released and now - self.released[0] >= 60:
+            self.released.popleft()
+
+    def allows(self):
+        """True if another deferrable job may start now (always, with a limit of 0)"""
+        if self.per_minute <= 0:
+            return True
+        self._expire(time.time())
+        return len(self.released) < self.per_minute
+
+    def record(self):
+        """Count a deferrable job as started"""
+        self.released.append(time.time())
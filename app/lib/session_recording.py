@@ -0,0 +1,133 @@
+"""
+Session Recording
+Timestamped capture of telnet sessions for replay (bench/replay_realworld.py).
+
+With RW_SESSION_RECORD_DIR set, every telnet session spawned through
+lib.functions.spawn_telnet is written to its own session_<time>_<pid>_<n>.jsonl
+file in that directory: a header line, then one line per read or write:
+
+    {"version": 1, "host": "...", "port": "23", "started_at": "..."}
+    {"t": 0.412, "dir": "out", "data": "login: "}
+    {"t": 1.031, "dir": "in", "data": "rwuser1\r\n"}
+    {"t": 1.050, "dir": "in", "data": "********\r\n", "redacted": true}
+
+"out" is what the host drew (as pexpect read it), "in" is what the automation
+sent, and t is seconds since the session started. Passwords passed as secrets
+are masked before anything reaches the disk.
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+from datetime import datetime
+
+VERSION = 1
+OUT = 'out'
+IN = 'in'
+
+_counter = itertools.count(1)
+
+def get_recording_settings():
+    """
+    Session recording settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'directory': os.getenv('RW_SESSION_RECORD_DIR', ''),
+    }
+
+
+class _DirectionLog:
+    """File-like object pexpect writes one direction of a session to"""
+
+    def __init__(self, recording, direction):
+        self.recording = recording
+        self.direction = direction
+
+    def write(self, data):
+        self.recording.event(self.direction, data)
+
+    def flush(self):
+        pass
+
+
+class SessionRecording:
+    """One session's recording file"""
+
+    def __init__(self, path, host='', port='', secrets=()):
+        self.path = path
+        self.secrets = [secret for secret in secrets if secret]
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.file = open(path, 'w', encoding='utf-8', buffering=1)
+        self._write({
+            'version': VERSION,
+            'host': host,
+            'port': str(port),
+            'started_at': datetime.now().isoformat(),
+        })
+
+    def _write(self, record):
+        self.file.write(json.dumps(record) + '\n')
+
+    def event(self, direction, data):
+        if not data:
+            return
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='replace')
+        record = {'t': round(time.time() - self.started, 4), 'dir': direction, 'data': data}
+        if direction == IN:
+            for secret in self.secrets:
+                if secret in data:
+                    data = data.replace(secret, '*' * len(secret))
+                    record['data'] = data
+                    record['redacted'] = True
+        with self.lock:
+            if not self.file.closed:
+                self._write(record)
+
+    def attach(self, child):
+        """Record everything a pexpect child reads and sends"""
+        child.logfile_read = _DirectionLog(self, OUT)
+        child.logfile_send = _DirectionLog(self, IN)
+        return child
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+def start_recording(host, port, secrets=()):
+    """
+    Open a recording for a new session if RW_SESSION_RECORD_DIR is set
+
+    Returns:
+        SessionRecording: The recording, or None when recording is off
+    """
+    directory = get_recording_settings()['directory']
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    name = f"session_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{next(_counter)}.jsonl"
+    return SessionRecording(os.path.join(directory, name), host, port, secrets)
+
+def load_recording(path):
+    """
+    Read a recording
+
+    Returns:
+        tuple: (dict header, list of event dicts in time order)
+
+    Raises:
+        ValueError: If the file is not a recording of a known version
+    """
+    with open(path, encoding='utf-8') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('version') != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} session recording')
+        events = [json.loads(line) for line in f if line.strip()]
+    return header, events
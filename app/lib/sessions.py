@@ -0,0 +1,347 @@
+"""
+RealWorld Sessions
+Warm telnet sessions kept open between jobs, one cache per executor process.
+
+A job for a DC that a cached session is already in reuses it as is. A job for
+another DC switches the company on an open session (back to the top menu and
+through the company-ID prompt), which skips the telnet login and the host
+guard's login token. Only when no session can be reused or switched is a new
+one logged in. Sessions that fail, go idle or have run RW_SESSION_MAX_JOBS
+orders are closed.
+
+Every open session holds a host guard lease (lib.host_guard) from login until
+it is closed, idle warm sessions included, under the credential of the pool
+(lib.credentials) it logged in with. RW_MAX_SESSIONS and the credentials'
+max_sessions therefore count open telnet connections, and every login, also
+one made because a company switch failed, takes a login token first.
+"""
+
+import os
+import time
+from lib.navigator import Navigator, NavigationError, TOP_MENU, MAIN_MENU
+from lib.timing import Pacer, get_timing_store
+from lib.credentials import get_credential
+from lib.host_guard import get_host, acquire_session, claim_session, touch_sessions, release_session
+
+def get_session_settings():
+    """
+    Session cache settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'warm_sessions': int(os.getenv('RW_WARM_SESSIONS', '1')),
+        'idle_seconds': int(os.getenv('RW_SESSION_IDLE_SECONDS', '300')),
+        'max_jobs': int(os.getenv('RW_SESSION_MAX_JOBS', '200')),
+        'company_switch': os.getenv('RW_COMPANY_SWITCH', 'true').lower() in ('1', 'true', 'yes'),
+        'housekeeping_seconds': int(os.getenv('RW_SESSION_HOUSEKEEPING_SECONDS', '30')),
+    }
+
+
+class RealWorldSession:
+    """One logged-in telnet session, its lease, the credential it runs under and where it is"""
+
+    def __init__(self, logger, credential, session_id=None):
+        self.logger = logger
+        self.credential = credential
+        self.session_id = session_id
+        self.child = None
+        self.nav = None
+        self.pacer = None
+        self.distribution_center = None
+        self.opened_at = None
+        self.last_used_at = None
+        self.jobs_run = 0
+
+    @property
+    def alive(self):
+        return self.child is not None and self.child.isalive()
+
+    def use(self, logger):
+        """Log to the current job's logger from now on"""
+        self.logger = logger
+        if self.nav:
+            self.nav.logger = logger
+
+    def open(self, distribution_center):
+        """
+        Connect, log in and enter a company
+
+        Returns:
+            tuple: (bool success, str message)
+        """
+        from lib.functions import spawn_telnet
+        from lib.processes.reset_order import telnet_login
+
+        host = os.getenv('RW_HOST', '')
+        port = os.getenv('RW_PORT', '23')
+        username = self.credential['username']
+
+        self.logger.info(f"Connecting to RealWorld at {host}:{port} with user {username} "
+                         f"(credential {self.credential['name']})")
+        self.child = spawn_telnet(host, port, (self.credential['password'], self.credential['employee_password']))
+        self.pacer = Pacer(self.child, get_timing_store(host))
+        self.opened_at = time.time()
+
+        logged_in, message = telnet_login(self.child, username, self.credential['password'], self.logger, self.pacer)
+        if not logged_in:
+            return False, message
+        self.nav = Navigator(self.child, self.logger, TOP_MENU, self.pacer)
+        return self.enter_company(distribution_center)
+
+    def enter_company(self, distribution_center):
+        """Enter a company from the top menu"""
+        from lib.processes.reset_order import enter_company
+
+        entered, message = enter_company(self.child, distribution_center, self.credential['employee_number'],
+                                         self.credential['employee_password'], self.logger, self.pacer)
+        if entered:
+            self.distribution_center = distribution_center
+            self.nav.position = MAIN_MENU
+        return entered, message
+
+    def switch_company(self, distribution_center):
+        """
+        Move an open session to another company without logging in again
+
+        Returns:
+            tuple: (bool success, str message)
+        """
+        self.logger.info(f"Switching session from company {self.distribution_center} to {distribution_center}")
+        self.distribution_center = None
+        self.nav.ensure(TOP_MENU)
+        return self.enter_company(distribution_center)
+
+    def close(self):
+        from lib.functions import close_telnet
+        if self.child:
+            close_telnet(self.child)
+        self.child = None
+
+
+class SessionCache:
+    """Warm sessions of one executor, reused across jobs with DC affinity"""
+
+    def __init__(self, settings=None, owner=None):
+        self.settings = settings or get_session_settings()
+        self.owner = owner
+        self.host = get_host()
+        self.sessions = []
+        self.reserved = None  # Warm session claimed for the current job
+        self.reserved_lease = None  # Or the lease to log a new session in with
+        self.job_id = None
+
+    def warm_dcs(self):
+        """Companies the cached sessions are in"""
+        return [s.distribution_center for s in self.sessions]
+
+    def _close(self, session):
+        """Close a session and return its lease"""
+        session.close()
+        if session.session_id:
+            try:
+                release_session(session.session_id, self.host)
+            except Exception as e:
+                session.logger.warning(f"Could not release session lease: {e}")
+            session.session_id = None
+
+    def expire(self):
+        """
+        Close dead sessions and sessions idle for longer than RW_SESSION_IDLE_SECONDS,
+        and renew the leases of the rest (the executor calls this every
+        RW_SESSION_HOUSEKEEPING_SECONDS while it waits for jobs)
+        """
+        now = time.time()
+        for session in list(self.sessions):
+            if not session.alive or now - session.last_used_at > self.settings['idle_seconds']:
+                self.sessions.remove(session)
+                self._close(session)
+
+        lost = touch_sessions([s.session_id for s in self.sessions])
+        for session in [s for s in self.sessions if s.session_id in lost]:
+            # Another login may already have been given its credential slot
+            session.logger.warning(f"Lease of session {session.session_id} expired, closing it")
+            self.sessions.remove(session)
+            session.session_id = None
+            self._close(session)
+
+    def _warm_session(self, distribution_center):
+        """The cached session to run a job for a DC on, or None"""
+        for session in self.sessions:
+            if session.distribution_center == distribution_center:
+                return session
+        if self.sessions and self.settings['company_switch']:
+            # Least recently used session is the one to repurpose
+            return min(self.sessions, key=lambda s: s.last_used_at)
+        return None
+
+    def _lease(self, job_id):
+        """
+        Lease a new session, closing this executor's own idle sessions if they
+        are what holds the host or credential limits
+
+        Returns:
+            tuple: (lease, denial) as from lib.host_guard.acquire_session
+        """
+        lease, denial = acquire_session(self.host, job_id, self.owner)
+        while not lease and denial.get('at_limit') and self.sessions:
+            self._close(self.sessions.pop(self.sessions.index(min(self.sessions, key=lambda s: s.last_used_at))))
+            lease, denial = acquire_session(self.host, job_id, self.owner)
+        return lease, denial
+
+    def reserve(self, distribution_center, job_id=None):
+        """
+        Secure a session for a job before it starts: a warm session (no login)
+        or a lease for a new one (taking a login token)
+
+        Returns:
+            tuple: (credential name, None), or (None, denial) where denial has
+                   'reason' and 'retry_in' and the job is to be deferred
+        """
+        self.release_reservation()
+        self.expire()
+        self.job_id = job_id
+
+        session = self._warm_session(distribution_center)
+        while session:
+            claimed, denial = claim_session(session.session_id, self.host, job_id)
+            if denial:
+                return None, denial
+            if claimed:
+                self.reserved = session
+                return session.credential['name'], None
+            # Its lease expired under it; it no longer counts as open, so it may not stay open
+            self.sessions.remove(session)
+            session.session_id = None
+            self._close(session)
+            session = self._warm_session(distribution_center)
+
+        lease, denial = self._lease(job_id)
+        if not lease:
+            return None, denial
+        self.reserved_lease = lease
+        return lease['credential'], None
+
+    def release_reservation(self):
+        """Give back a reservation the job did not check out (e.g. it ended before logging in)"""
+        if self.reserved:
+            session, self.reserved = self.reserved, None
+            try:
+                if touch_sessions([session.session_id]):
+                    self.sessions.remove(session)
+                    session.session_id = None
+                    self._close(session)
+            except Exception as e:
+                session.logger.warning(f"Could not renew session lease: {e}")
+        if self.reserved_lease:
+            try:
+                release_session(self.reserved_lease['session_id'], self.host)
+            except Exception as e:
+                print(f"Warning: Could not release session lease: {e}")
+            self.reserved_lease = None
+
+    def _open(self, distribution_center, logger, lease):
+        """Log in a new session under a lease"""
+        credential = get_credential(lease['credential'])
+        if not credential:
+            release_session(lease['session_id'], self.host)
+            return None, 'Unknown RealWorld credential'
+        session = RealWorldSession(logger, credential, lease['session_id'])
+        try:
+            opened, message = session.open(distribution_center)
+        except BaseException:
+            # pexpect TIMEOUT/EOF while logging in: nothing else holds the child or the lease
+            self._close(session)
+            raise
+        if not opened:
+            self._close(session)
+            return None, message
+        return session, None
+
+    def checkout(self, distribution_center, logger):
+        """
+        Get a session on the main menu of a company, the one reserve() secured
+        for the job (reserving one now if the caller did not)
+
+        Exceptions from pexpect while logging in or switching company are
+        left to the caller, after the session they hit is closed and its lease
+        returned.
+
+        Returns:
+            tuple: (session, None), or (None, message) if no session could be had
+        """
+        if not self.reserved and not self.reserved_lease:
+            credential, denial = self.reserve(distribution_center, self.job_id)
+            if denial:
+                return None, denial['reason']
+
+        session, lease = self.reserved, self.reserved_lease
+        self.reserved = self.reserved_lease = None
+
+        if session:
+            self.sessions.remove(session)
+            session.use(logger)
+            if session.alive and session.distribution_center == distribution_center:
+                logger.info(f"Reusing warm session in company {distribution_center}")
+                return session, None
+            if session.alive:
+                try:
+                    switched, message = session.switch_company(distribution_center)
+                except NavigationError as e:
+                    logger.warning(f"Could not switch company in place: {e}")
+                    switched = False
+                except BaseException:
+                    self._close(session)
+                    raise
+                if switched:
+                    return session, None
+            self._close(session)
+
+            # A new login, counted and rate limited like any other
+            lease, denial = self._lease(self.job_id)
+            if not lease:
+                return None, denial['reason']
+
+        return self._open(distribution_center, logger, lease)
+
+    def checkin(self, session, healthy=True):
+        """
+        Return a session after a job; it is kept only if it can get back to the main menu
+        """
+        session.jobs_run += 1
+        session.last_used_at = time.time()
+        self.job_id = None
+
+        keep = (healthy and session.alive and self.settings['warm_sessions'] > 0
+                and session.jobs_run < self.settings['max_jobs'])
+        if keep:
+            try:
+                keep = session.nav.recover(MAIN_MENU)
+            except Exception as e:
+                session.logger.warning(f"Could not recover session: {e}")
+                keep = False
+
+        if not keep:
+            self._close(session)
+            return
+
+        self.sessions.append(session)
+        while len(self.sessions) > self.settings['warm_sessions']:
+            oldest = min(self.sessions, key=lambda s: s.last_used_at)
+            self.sessions.remove(oldest)
+            self._close(oldest)
+        try:
+            if touch_sessions([session.session_id]):
+                session.logger.warning(f"Lease of session {session.session_id} expired during the job, closing it")
+                self.sessions.remove(session)
+                session.session_id = None
+                self._close(session)
+        except Exception as e:
+            session.logger.warning(f"Could not renew session lease: {e}")
+
+    def close_all(self):
+        self.release_reservation()
+        for session in self.sessions:
+            self._close(session)
+        self.sessions = []
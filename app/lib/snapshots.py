@@ -0,0 +1,287 @@
+"""
+Screen Snapshots
+Rendered RealWorld screens kept with each job for diagnosing failures.
+
+A job's ScreenRecorder is fed everything the session's Pacer reads and keeps a
+24x80 rendering of the terminal, the way the screen looked to a user. The
+final screen of every job is captured, and with RW_SNAPSHOT_STEPS the screen
+after each step too.
+
+Screens are stored once in RwAutomator_Snapshot, zlib compressed and keyed by
+the SHA-256 of their text, so the same screen seen by thousands of jobs (a
+menu, "order not on file") costs one row. RwAutomator_JobSnapshot links each
+job to its screens in the order they were captured.
+"""
+
+import os
+import re
+import zlib
+import hashlib
+from lib.db import get_connection, integrity_error
+
+ROWS = 24
+COLUMNS = 80
+
+FINAL = 'final'
+
+CSI_PATTERN = re.compile(r'\x1b\[([0-9;?]*)([@-~])')
+PARTIAL_CSI_PATTERN = re.compile(r'\x1b\[[0-9;?]*$')
+
+def get_snapshot_settings():
+    """
+    Snapshot settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'enabled': os.getenv('RW_SNAPSHOTS', '1') == '1',
+        'steps': os.getenv('RW_SNAPSHOT_STEPS', '0') == '1',
+        'max_per_job': int(os.getenv('RW_SNAPSHOT_MAX_PER_JOB', '50')),
+    }
+
+
+class Screen:
+    """
+    Minimal VT100 screen: cursor addressing, erase and line controls, which is
+    all RealWorld draws with. Attributes and colours are dropped.
+    """
+
+    def __init__(self, rows=ROWS, columns=COLUMNS):
+        self.rows = rows
+        self.columns = columns
+        self.pending = ''
+        self.clear()
+
+    def clear(self):
+        self.lines = [[' '] * self.columns for _ in range(self.rows)]
+        self.row = 0
+        self.column = 0
+
+    def _move(self, row, column):
+        self.row = min(max(row, 0), self.rows - 1)
+        self.column = min(max(column, 0), self.columns - 1)
+
+    def _line_feed(self):
+        if self.row == self.rows - 1:
+            self.lines.pop(0)
+            self.lines.append([' '] * self.columns)
+        else:
+            self.row += 1
+
+    def _erase(self, row, start, end):
+        for column in range(start, end):
+            self.lines[row][column] = ' '
+
+    def _control(self, params, final):
+        values = [int(p) if p.isdigit() else 0 for p in params.lstrip('?').split(';')] if params else []
+        first = values[0] if values else 0
+        count = first or 1
+
+        if final in 'Hf':
+            row = values[0] if values and values[0] else 1
+            column = values[1] if len(values) > 1 and values[1] else 1
+            self._move(row - 1, column - 1)
+        elif final == 'A':
+            self._move(self.row - count, self.column)
+        elif final == 'B':
+            self._move(self.row + count, self.column)
+        elif final == 'C':
+            self._move(self.row, self.column + count)
+        elif final == 'D':
+            self._move(self.row, self.column - count)
+        elif final == 'G':
+            self._move(self.row, count - 1)
+        elif final == 'd':
+            self._move(count - 1, self.column)
+        elif final == 'J':
+            if first == 2:
+                self.lines = [[' '] * self.columns for _ in range(self.rows)]
+            elif first == 1:
+                for row in range(self.row):
+                    self._erase(row, 0, self.columns)
+                self._erase(self.row, 0, self.column + 1)
+            else:
+                self._erase(self.row, self.column, self.columns)
+                for row in range(self.row + 1, self.rows):
+                    self._erase(row, 0, self.columns)
+        elif final == 'K':
+            if first == 2:
+                self._erase(self.row, 0, self.columns)
+            elif first == 1:
+                self._erase(self.row, 0, self.column + 1)
+            else:
+                self._erase(self.row, self.column, self.columns)
+
+    def feed(self, text):
+        """Apply terminal output to the screen"""
+        text = self.pending + (text or '')
+        self.pending = ''
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if char == '\x1b':
+                match = CSI_PATTERN.match(text, i)
+                if match:
+                    self._control(*match.groups())
+                    i = match.end()
+                    continue
+                if i + 1 >= len(text) or PARTIAL_CSI_PATTERN.match(text, i):
+                    # Sequence split across reads; finish it with the next output
+                    self.pending = text[i:]
+                    return
+                # Other escapes: ESC ( B and friends take one more character
+                i += 3 if text[i + 1] in '()' else 2
+                continue
+            if char == '\r':
+                self.column = 0
+            elif char == '\n':
+                self._line_feed()
+            elif char == '\b':
+                self.column = max(self.column - 1, 0)
+            elif char == '\t':
+                self.column = min((self.column // 8 + 1) * 8, self.columns - 1)
+            elif char >= ' ':
+                if self.column >= self.columns:
+                    self.column = 0
+                    self._line_feed()
+                self.lines[self.row][self.column] = char
+                self.column += 1
+            i += 1
+
+    def render(self):
+        """Screen text with trailing blanks and blank lines trimmed"""
+        lines = [''.join(line).rstrip() for line in self.lines]
+        while lines and not lines[-1]:
+            lines.pop()
+        return '\n'.join(lines)
+
+def render_screen(buffer):
+    """Render terminal output, as the screen would show it once it is all drawn"""
+    screen = Screen()
+    screen.feed(buffer)
+    return screen.render()
+
+
+class ScreenRecorder:
+    """
+    Screens of one job
+
+    The Pacer of the job's session feeds it every output it reads (see
+    lib.timing.Pacer.recorder). Captures stay in memory until save().
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or get_snapshot_settings()
+        self.screen = Screen()
+        self.captures = []  # (step, text)
+
+    def feed(self, text):
+        self.screen.feed(text)
+
+    def step(self, step):
+        """Capture the screen after a step, if RW_SNAPSHOT_STEPS is on"""
+        if self.settings['steps']:
+            self.capture(step)
+
+    def capture(self, step):
+        """Capture the current screen, unless it is the same as the last capture"""
+        text = self.screen.render()
+        if not text or len(self.captures) >= self.settings['max_per_job']:
+            return
+        if self.captures and self.captures[-1][1] == text:
+            return
+        self.captures.append((step, text))
+
+    def save(self, job_id):
+        """Store the captures with a job; returns how many were stored"""
+        if not job_id or not self.captures:
+            return 0
+        count = save_snapshots(job_id, self.captures)
+        self.captures = []
+        return count
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def save_snapshots(job_id, captures):
+    """
+    Store screens and link them to a job, after any it already has (retries
+    append to the same job)
+
+    Args:
+        job_id: RwAutomator_Log job
+        captures: List of (step, screen text)
+
+    Returns:
+        int: Snapshots linked to the job
+    """
+    screens = {_digest(text): text for _, text in captures}
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    hashes = list(screens)
+    placeholders = ', '.join('?' for _ in hashes)
+    cursor.execute(f"SELECT content_hash FROM RwAutomator_Snapshot WHERE content_hash IN ({placeholders})", hashes)
+    stored = {row[0] for row in cursor.fetchall()}
+
+    for content_hash, text in screens.items():
+        if content_hash in stored:
+            continue
+        data = text.encode('utf-8')
+        try:
+            cursor.execute("""
+                INSERT INTO RwAutomator_Snapshot (content_hash, content, length, created_at)
+                VALUES (?, ?, ?, GETDATE())
+            """, (content_hash, zlib.compress(data, 9), len(data)))
+            conn.commit()
+        except integrity_error():
+            # Another job stored the same screen first
+            conn.rollback()
+
+    cursor.execute("SELECT MAX(seq) FROM RwAutomator_JobSnapshot WHERE job_id = ?", (job_id,))
+    seq = cursor.fetchone()[0] or 0
+    rows = []
+    for step, text in captures:
+        seq += 1
+        rows.append((job_id, seq, step[:100], _digest(text)))
+    cursor.executemany("""
+        INSERT INTO RwAutomator_JobSnapshot (job_id, seq, step, content_hash, captured_at)
+        VALUES (?, ?, ?, ?, GETDATE())
+    """, rows)
+
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+def get_job_snapshots(job_id):
+    """
+    Screens captured for a job, in capture order
+
+    Returns:
+        list: Dicts with seq, step, content_hash, captured_at and screen (the text)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT j.seq, j.step, j.content_hash, j.captured_at, s.content
+        FROM RwAutomator_JobSnapshot j
+        JOIN RwAutomator_Snapshot s ON s.content_hash = j.content_hash
+        WHERE j.job_id = ?
+        ORDER BY j.seq
+    """, (job_id,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [
+        {
+            'seq': row[0],
+            'step': row[1],
+            'content_hash': row[2],
+            'captured_at': row[3].isoformat() if row[3] else None,
+            'screen': zlib.decompress(bytes(row[4])).decode('utf-8'),
+        }
+        for row in rows
+    ]
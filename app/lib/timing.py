@@ -0,0 +1,475 @@
+"""
+Screen Timing
+Waits on RealWorld screens derived from how long the host actually takes.
+
+Every screen the automation waits on is a named step ('login', 'company_id',
+'main_menu>reset_menu', ...). Each wait measures how long the host took to
+answer and adds it to a decayed histogram per host, DC and step, so recent
+behaviour counts most and the percentiles follow the host through the day.
+Once a step has RW_TIMING_MIN_SAMPLES observations its waits come from them:
+
+    settle    a screen is taken as drawn once its marker shows up when the
+              step names one, otherwise once the host has answered with more
+              than the echo of the keys and output has gone quiet
+    timeout   p99 x RW_TIMING_TIMEOUT_FACTOR, between RW_TIMING_MIN_TIMEOUT_SECONDS
+              and RW_TIMING_MAX_TIMEOUT_SECONDS
+    poll      p50 / 5, between 50 and 500ms
+
+The response time measured is the time to the marker or to the first output
+that is not the echo of the keys sent with Pacer.send(). Until a step is
+learned (or with RW_TIMING_ADAPTIVE=false) the fixed waits the steps were
+written with are used, and still measured. Histograms are kept in
+RwAutomator_ScreenTiming; each process merges its new observations into the
+stored ones every RW_TIMING_FLUSH_SECONDS and picks up what the others
+recorded.
+"""
+
+import os
+import re
+import time
+import threading
+from lib.db import get_connection, integrity_error
+
+# Histogram bucket upper bounds in seconds; the last bucket counts everything above
+BUCKETS = [0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 4, 6, 8, 12, 20, 30, 60]
+OVERFLOW_SECONDS = 120
+
+MIN_POLL = 0.05
+MAX_POLL = 0.5
+COLD_POLL = 0.1
+
+# Steps timed before a company is entered are kept per host only
+HOST_LEVEL = ''
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_timing_settings():
+    """
+    Timing model settings
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'adaptive': os.getenv('RW_TIMING_ADAPTIVE', 'true').lower() in ('1', 'true', 'yes'),
+        'min_samples': int(os.getenv('RW_TIMING_MIN_SAMPLES', '20')),
+        'decay': float(os.getenv('RW_TIMING_DECAY', '0.99')),
+        'timeout_factor': float(os.getenv('RW_TIMING_TIMEOUT_FACTOR', '3')),
+        'min_timeout': float(os.getenv('RW_TIMING_MIN_TIMEOUT_SECONDS', '2')),
+        'max_timeout': float(os.getenv('RW_TIMING_MAX_TIMEOUT_SECONDS', '120')),
+        'quiet': int(os.getenv('RW_TIMING_QUIET_MS', '300')) / 1000.0,
+        'flush_seconds': int(os.getenv('RW_TIMING_FLUSH_SECONDS', '60')),
+    }
+
+def _bucket(seconds):
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            return i
+    return len(BUCKETS)
+
+def _parse_histogram(value):
+    weights = [float(w) for w in value.split(',')] if value else []
+    return weights + [0.0] * (len(BUCKETS) + 1 - len(weights))
+
+def _format_histogram(weights):
+    return ','.join(f'{w:.3f}'.rstrip('0').rstrip('.') for w in weights)
+
+def percentile(weights, fraction):
+    """
+    Estimate a percentile from histogram weights, interpolating within the bucket
+
+    Returns:
+        float: Seconds, or None without data
+    """
+    total = sum(weights)
+    if not total:
+        return None
+    target = total * fraction
+    running = 0.0
+    for i, weight in enumerate(weights):
+        if weight and running + weight >= target:
+            lower = BUCKETS[i - 1] if i else 0.0
+            upper = BUCKETS[i] if i < len(BUCKETS) else OVERFLOW_SECONDS
+            return lower + (upper - lower) * (target - running) / weight
+        running += weight
+    return OVERFLOW_SECONDS
+
+def _new_output(previous, current):
+    """
+    Output that arrived since previous
+
+    pexpect keeps adding to 'before' across timeouts until a pattern matches,
+    after which it starts over.
+    """
+    if previous and current.startswith(previous):
+        return current[len(previous):]
+    return current
+
+def _is_echo(text, keys):
+    """
+    Whether text can be nothing but the host echoing keys back
+
+    Escape sequences mean the host is drawing; line breaks are left out since
+    the echo of Enter varies.
+    """
+    if '\x1b' in text:
+        return False
+    printable = lambda value: ''.join(c for c in value if c.isprintable())
+    return printable(keys).startswith(printable(text))
+
+
+class TimingStore:
+    """Response-time histograms of one RealWorld host, shared by the sessions of a process"""
+
+    def __init__(self, host, settings=None):
+        self.host = host
+        self.settings = settings or get_timing_settings()
+        self.histograms = {}  # (dc, step) -> weights, stored plus local observations
+        self.samples = {}     # (dc, step) -> observations behind the weights
+        self.pending = {}     # (dc, step) -> [new weights, observations, timeouts] not yet stored
+        self.lock = threading.Lock()
+        self.synced_at = 0
+
+    def load(self):
+        """Read every step of the host from the database"""
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT distribution_center, step, histogram, observations
+            FROM RwAutomator_ScreenTiming
+            WHERE host = ?
+        """, (self.host,))
+        rows = cursor.fetchall()
+        conn.close()
+
+        with self.lock:
+            for dc, step, histogram, observations in rows:
+                key = (dc, step)
+                pending = self.pending.get(key)
+                weights = _parse_histogram(histogram)
+                if pending:
+                    # Observations not flushed yet stay in the local view
+                    weights = self._merge(weights, pending[0], pending[1])
+                self.histograms[key] = weights
+                self.samples[key] = observations + (pending[1] if pending else 0)
+
+    def _merge(self, weights, new_weights, count):
+        """Decay older weights once per newer observation and add the new ones"""
+        factor = self.settings['decay'] ** count
+        return [w * factor + n for w, n in zip(weights, new_weights)]
+
+    def observe(self, distribution_center, step, seconds, timed_out=False):
+        """Record how long a step took (for a timeout, how long we waited)"""
+        key = (distribution_center, step)
+        bucket = _bucket(seconds)
+        with self.lock:
+            weights = self.histograms.get(key) or [0.0] * (len(BUCKETS) + 1)
+            weights = [w * self.settings['decay'] for w in weights]
+            weights[bucket] += 1
+            self.histograms[key] = weights
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+            pending = self.pending.setdefault(key, [[0.0] * (len(BUCKETS) + 1), 0, 0])
+            pending[0] = [w * self.settings['decay'] for w in pending[0]]
+            pending[0][bucket] += 1
+            pending[1] += 1
+            pending[2] += 1 if timed_out else 0
+
+    def stats(self, distribution_center, step):
+        """
+        Learned percentiles of a step
+
+        Returns:
+            dict: p50, p90, p99 and samples, or None until there are enough samples
+        """
+        if not self.settings['adaptive']:
+            return None
+        key = (distribution_center, step)
+        with self.lock:
+            if self.samples.get(key, 0) < self.settings['min_samples']:
+                return None
+            weights = self.histograms[key]
+            return {
+                'p50': percentile(weights, 0.5),
+                'p90': percentile(weights, 0.9),
+                'p99': percentile(weights, 0.99),
+                'samples': self.samples[key],
+            }
+
+    def flush(self):
+        """Merge pending observations into the stored histograms"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        conn = get_connection()
+        cursor = conn.cursor()
+        failed = {}
+        for (dc, step), (new_weights, count, timeouts) in pending.items():
+            cursor.execute("""
+                SELECT histogram FROM RwAutomator_ScreenTiming WITH (UPDLOCK, HOLDLOCK)
+                WHERE host = ? AND distribution_center = ? AND step = ?
+            """, (self.host, dc, step))
+            row = cursor.fetchone()
+            try:
+                if row:
+                    weights = self._merge(_parse_histogram(row[0]), new_weights, count)
+                    cursor.execute("""
+                        UPDATE RwAutomator_ScreenTiming
+                        SET histogram = ?, observations = observations + ?, timeouts = timeouts + ?,
+                            updated_at = GETDATE()
+                        WHERE host = ? AND distribution_center = ? AND step = ?
+                    """, (_format_histogram(weights), count, timeouts, self.host, dc, step))
+                else:
+                    cursor.execute("""
+                        INSERT INTO RwAutomator_ScreenTiming
+                        (host, distribution_center, step, histogram, observations, timeouts, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, GETDATE())
+                    """, (self.host, dc, step, _format_histogram(new_weights), count, timeouts))
+                conn.commit()
+            except integrity_error():
+                # Another process stored the step first; merge into theirs next flush
+                conn.rollback()
+                failed[(dc, step)] = [new_weights, count, timeouts]
+        conn.close()
+
+        if failed:
+            with self.lock:
+                for key, values in failed.items():
+                    self.pending.setdefault(key, values)
+
+    def sync(self, force=False):
+        """Flush and reload every RW_TIMING_FLUSH_SECONDS; timing must never fail a job"""
+        if not force and time.time() - self.synced_at < self.settings['flush_seconds']:
+            return
+        self.synced_at = time.time()
+        try:
+            self.flush()
+            self.load()
+        except Exception as e:
+            print(f"Could not sync screen timings: {e}")
+
+def get_timing_store(host=None):
+    """Process-wide TimingStore for a host (RW_HOST by default), loaded on first use"""
+    host = host if host is not None else os.getenv('RW_HOST', '')
+    with _stores_lock:
+        store = _stores.get(host)
+        if store is None:
+            store = _stores[host] = TimingStore(host)
+    store.sync()
+    return store
+
+
+class Pacer:
+    """
+    Waits on the screens of one telnet session
+
+    Each wait names its step and the fixed timing it was written with; the
+    fixed timing is used until the store has learned the step. Keys sent with
+    send() are remembered so the wait after them can tell their echo from
+    the host's answer.
+
+    While a job runs, recorder is its lib.snapshots.ScreenRecorder and is fed
+    everything the pacer reads.
+    """
+
+    def __init__(self, child, store=None, distribution_center=HOST_LEVEL):
+        self.child = child
+        self.store = store
+        self.distribution_center = distribution_center
+        self.recorder = None
+        self.sent = ''
+
+    def send(self, keys):
+        """Send keys to the session ahead of a wait()"""
+        self.sent = keys
+        self.child.send(keys)
+
+    def _stats(self, step):
+        return self.store.stats(self.distribution_center, step) if self.store else None
+
+    def _observe(self, step, seconds, timed_out=False):
+        if self.store:
+            self.store.observe(self.distribution_center, step, seconds, timed_out)
+            self.store.sync()
+
+    def _record(self, step, text):
+        if self.recorder:
+            self.recorder.feed(text)
+            self.recorder.step(step)
+
+    def timeout(self, step, default):
+        """Timeout for a step: default until learned, then p99 x factor within the bounds"""
+        stats = self._stats(step)
+        if not stats:
+            return default
+        settings = self.store.settings
+        learned = stats['p99'] * settings['timeout_factor']
+        return min(max(learned, settings['min_timeout']), settings['max_timeout'])
+
+    def poll_interval(self, step):
+        stats = self._stats(step)
+        if not stats:
+            return COLD_POLL
+        return min(max(stats['p50'] / 5, MIN_POLL), MAX_POLL)
+
+    def _quiet(self, poll):
+        quiet = self.store.settings['quiet'] if self.store else get_timing_settings()['quiet']
+        return max(quiet, poll * 2)
+
+    def _collect(self, min_wait, timeout, poll, quiet, require_answer=False, marker=None):
+        """
+        Read output until at least min_wait has passed and nothing new has
+        arrived for quiet seconds, or until timeout
+
+        With require_answer it also keeps reading until the host has answered:
+        shown marker when one is given, otherwise sent something besides the
+        echo of the keys.
+
+        Returns:
+            tuple: (str output, float seconds to the answer or None, bool timed out)
+        """
+        import pexpect
+
+        start = time.time()
+        text = ''
+        before = self.child.before if isinstance(self.child.before, str) else ''
+        last_output = None
+        answered = None
+        while True:
+            now = time.time()
+            elapsed = now - start
+            response = None if answered is None else answered - start
+            if elapsed >= timeout:
+                return text, response, True
+            if (elapsed >= min_wait and now - (last_output or start) >= quiet
+                    and (answered is not None or not require_answer)):
+                return text, response, False
+
+            self.child.expect([pexpect.TIMEOUT], timeout=min(poll, max(timeout - elapsed, 0.01)))
+            current = self.child.before if isinstance(self.child.before, str) else ''
+            new = _new_output(before, current)
+            before = current
+            if new:
+                text += new
+                last_output = time.time()
+                if answered is None and (marker.search(text) if marker else not _is_echo(text, self.sent)):
+                    answered = last_output
+
+    def wait(self, step, settle, timeout=None, marker=None):
+        """
+        Wait for the screen after sending keys to be drawn
+
+        Before the step is learned this is the fixed settle wait. Once learned
+        it waits for marker when one is given, otherwise for the host's answer
+        to the keys (not only their echo) and for output to go quiet, never
+        longer than the learned timeout.
+
+        Args:
+            step: Step name the timing is learned under
+            settle: Fixed wait the step used before it was learned
+            timeout: Longest wait before it was learned (3 x settle by default)
+            marker: Pattern the screen is known by, if it has one
+
+        Returns:
+            str: Output received while waiting
+        """
+        timeout = self.timeout(step, timeout or settle * 3)
+        stats = self._stats(step)
+        poll = self.poll_interval(step)
+        if isinstance(marker, str):
+            marker = re.compile(marker)
+
+        text, response, timed_out = self._collect(0 if stats else settle, timeout, poll, self._quiet(poll),
+                                                  require_answer=bool(stats), marker=marker)
+        if timed_out:
+            self._observe(step, timeout, timed_out=True)
+        elif response is not None:
+            self._observe(step, response)
+        self.sent = ''
+        self._record(step, text)
+        return text
+
+    def expect(self, step, pattern, timeout, settle=0):
+        """
+        child.expect(pattern) with a learned timeout
+
+        Args:
+            step: Step name the timing is learned under
+            pattern: Text the screen is known by
+            timeout: Timeout before the step was learned
+            settle: Fixed wait after the match before it was learned; once
+                learned the rest of the screen is read until output goes quiet
+
+        Raises:
+            pexpect.TIMEOUT: If the screen does not show up in time
+
+        Returns:
+            str: Output before the match
+        """
+        import pexpect
+
+        timeout = self.timeout(step, timeout)
+        start = time.time()
+        try:
+            self.child.expect(pattern, timeout=timeout)
+        except pexpect.TIMEOUT:
+            self._observe(step, timeout, timed_out=True)
+            if self.recorder and isinstance(self.child.before, str):
+                self.recorder.feed(self.child.before)
+            raise
+        self._observe(step, time.time() - start)
+        before = self.child.before
+        text = before + self.child.after if isinstance(self.child.after, str) else before
+
+        if settle:
+            if self._stats(step):
+                poll = self.poll_interval(step)
+                text += self._collect(0, settle, poll, self._quiet(poll))[0]
+            else:
+                time.sleep(settle)
+        self._record(step, text)
+        return before
+
+def get_screen_timings(host=None):
+    """
+    Learned timings per step, for the API
+
+    Returns:
+        list: Dicts with host, distribution_center, step, observations, timeouts,
+              p50/p90/p99 and updated_at, slowest p90 first
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    query = """
+        SELECT host, distribution_center, step, histogram, observations, timeouts, updated_at
+        FROM RwAutomator_ScreenTiming
+    """
+    params = []
+    if host:
+        query += " WHERE host = ?"
+        params.append(host)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    conn.close()
+
+    timings = []
+    for row in rows:
+        weights = _parse_histogram(row[3])
+        p50, p90, p99 = (percentile(weights, f) for f in (0.5, 0.9, 0.99))
+        timings.append({
+            'host': row[0],
+            'distribution_center': row[1],
+            'step': row[2],
+            'observations': row[4],
+            'timeouts': row[5],
+            'p50': round(p50, 3) if p50 is not None else None,
+            'p90': round(p90, 3) if p90 is not None else None,
+            'p99': round(p99, 3) if p99 is not None else None,
+            'updated_at': row[6].isoformat() if row[6] else None,
+        })
+    timings.sort(key=lambda t: -(t['p90'] or 0))
+    return timings
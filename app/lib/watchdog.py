@@ -0,0 +1,150 @@
+"""
+Worker Watchdog
+Worker registration and heartbeats, and recovery of jobs stuck in 'processing'.
+
+A job is returned to the queue when the worker that claimed it has stopped
+heartbeating, or when it has been processing for longer than the hard job
+timeout (plus grace) no matter who owns it.
+"""
+
+import os
+import socket
+import uuid
+from lib.db import get_connection, update_job_status
+from lib.host_guard import release_job_sessions
+from lib.jobs import failure_message
+
+def get_watchdog_settings():
+    """
+    Heartbeat and timeout settings in seconds
+
+    Returns:
+        dict: Settings read from the environment
+    """
+    return {
+        'heartbeat_seconds': int(os.getenv('RW_HEARTBEAT_SECONDS', '15')),
+        'worker_stale_seconds': int(os.getenv('RW_WORKER_STALE_SECONDS', '90')),
+        'job_timeout_seconds': int(os.getenv('RW_JOB_TIMEOUT_SECONDS', '300')),
+        'watchdog_seconds': int(os.getenv('RW_WATCHDOG_SECONDS', '30')),
+    }
+
+def register_worker(concurrency):
+    """
+    Register a worker process
+
+    Args:
+        concurrency: Number of executors the worker runs
+
+    Returns:
+        str: The new worker_id
+    """
+    worker_id = str(uuid.uuid4())
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        INSERT INTO RwAutomator_Worker (worker_id, hostname, pid, concurrency, jobs_running, started_at, heartbeat_at)
+        VALUES (?, ?, ?, ?, 0, GETDATE(), GETDATE())
+    """, (worker_id, socket.gethostname(), os.getpid(), concurrency))
+
+    conn.commit()
+    conn.close()
+    return worker_id
+
+def heartbeat(worker_id, jobs_running, jobs_completed):
+    """Record that a worker is alive, with its current load"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        UPDATE RwAutomator_Worker
+        SET heartbeat_at = GETDATE(), jobs_running = ?, jobs_completed = ?
+        WHERE worker_id = ?
+    """, (jobs_running, jobs_completed, worker_id))
+
+    conn.commit()
+    conn.close()
+
+def get_workers():
+    """
+    Registered workers seen recently, newest heartbeat first
+
+    Returns:
+        list: Worker dicts with heartbeat age in seconds
+    """
+    settings = get_watchdog_settings()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT worker_id, hostname, pid, concurrency, jobs_running, jobs_completed, started_at, heartbeat_at,
+               DATEDIFF(second, heartbeat_at, GETDATE())
+        FROM RwAutomator_Worker
+        WHERE heartbeat_at >= DATEADD(hour, -24, GETDATE())
+        ORDER BY heartbeat_at DESC
+    """)
+
+    workers = []
+    for row in cursor.fetchall():
+        workers.append({
+            'worker_id': row[0],
+            'hostname': row[1],
+            'pid': row[2],
+            'concurrency': row[3],
+            'jobs_running': row[4],
+            'jobs_completed': row[5],
+            'started_at': row[6].isoformat() if row[6] else None,
+            'heartbeat_at': row[7].isoformat() if row[7] else None,
+            'heartbeat_age': row[8],
+            'alive': row[8] is not None and row[8] <= settings['worker_stale_seconds']
+        })
+
+    conn.close()
+    return workers
+
+def recover_stale_jobs():
+    """
+    Return 'processing' jobs whose worker died or which ran past the hard timeout
+
+    The attempt they used still counts, so a job that keeps hanging ends up
+    'failed' through the normal retry policy.
+
+    Returns:
+        list: job_ids that were recovered
+    """
+    settings = get_watchdog_settings()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT l.job_id,
+               CASE WHEN l.started_at < DATEADD(second, -?, GETDATE()) THEN 'timeout' ELSE 'worker' END,
+               l.worker_id, l.job_type
+        FROM RwAutomator_Log l
+        LEFT JOIN RwAutomator_Worker w ON w.worker_id = l.worker_id
+        WHERE l.status = 'processing'
+        AND (
+            l.started_at < DATEADD(second, -?, GETDATE())
+            OR (l.worker_id IS NOT NULL AND (w.worker_id IS NULL OR w.heartbeat_at < DATEADD(second, -?, GETDATE())))
+        )
+    """, (settings['job_timeout_seconds'] * 2,
+          settings['job_timeout_seconds'] * 2,
+          settings['worker_stale_seconds']))
+    stale = cursor.fetchall()
+    conn.close()
+
+    recovered = []
+    for job_id, reason, worker_id, job_type in stale:
+        owner = None
+        if reason == 'timeout':
+            message = failure_message(job_type, f"Timed out waiting for RealWorld (job exceeded "
+                                                f"{settings['job_timeout_seconds']}s, recovered by watchdog)")
+        else:
+            message = failure_message(job_type, 'Worker stopped responding (recovered by watchdog)')
+            # Its executors' warm sessions are gone with it
+            owner = f'{worker_id}:' if worker_id else None
+        update_job_status(job_id, 'error', message)
+        release_job_sessions(job_id, message, owner)
+        recovered.append(job_id)
+
+    return recovered
@@ -0,0 +1,904 @@
+function setLoggedInAs() {
+  const loggedInAsSpan = document.getElementById("LoggedInAs");
+  if (USERDATA && USERDATA.authenticated) {
+    loggedInAsSpan.textContent = `Logged in: ${USERDATA.username}`;
+  } else {
+    loggedInAsSpan.textContent = "";
+  }
+}
+function logout() {
+  window.location.href = "/logout";
+}
+
+const RefreshIntervalMs = 3000;
+const DcLocations = {
+  "00": "NASSAU CANDY DISTRIBUTORS INC",
+  "01": "NASSAU CANDY SOUTH",
+  "02": "NASSAU GOURMET FOODS",
+  "03": "STELLAR TRACKING COMPANY",
+  "04": "NASSAU CANDY MIDWEST",
+  "05": "NASSAU CANDY WEST-LA",
+  "06": "NC CHOCOLATE MANUFACTURING LLC",
+  "07": "NASSAU CANDY SOUTHWEST",
+  "08": "NASSAU CANDY WEST-SSF",
+  "09": "THE CHOCOLATE INN",
+  10: "NASSAU CANDY WEST-COPY",
+};
+// State management
+let CURRENT_HISTORY = [];
+let CURRENT_PAGE = 1;
+let CURRENT_FILTERS = {
+  order_number: "",
+  start_date: "",
+  end_date: "",
+  // status: "",
+};
+
+// Get current filter values from form inputs
+function getFilterValues() {
+  return {
+    order_number:
+      document.getElementById("search-input")?.value.trim() || "",
+    start_date: document.getElementById("start-date")?.value || "",
+    end_date: document.getElementById("end-date")?.value || "",
+    // status: document.getElementById('status-select')?.value || ''
+    status: "",
+  };
+}
+
+// Build query parameters for API call
+function buildQueryParams(page = 1, filters = {}) {
+  const params = new URLSearchParams({
+    page: page,
+    per_page: 20,
+  });
+
+  if (filters.order_number) {
+    params.append("order_number", filters.order_number);
+  }
+  if (filters.start_date) {
+    params.append("start_date", filters.start_date);
+  }
+  if (filters.end_date) {
+    params.append("end_date", filters.end_date);
+  }
+  if (filters.status) {
+    params.append("status", filters.status);
+  }
+
+  return params;
+}
+
+function orderHistorySearch() {
+  let searchValue = document.getElementById("search-input").value.trim();
+  if (searchValue === "") {
+    return;
+  }
+
+  document.getElementById("start-date").value = "";
+  document.getElementById("end-date").value = "";
+  CURRENT_FILTERS = {
+    order_number: searchValue,
+    start_date: "",
+    end_date: "",
+    status: "",
+  };
+  CURRENT_PAGE = 1;
+  refreshHistory();
+}
+
+// Apply filters (called by filter button or form submit)
+function applyFilters() {
+  CURRENT_FILTERS = getFilterValues();
+  CURRENT_PAGE = 1; // Reset to first page when filtering
+  refreshHistory();
+}
+
+// Change page (called by pagination buttons)
+function changePage(page) {
+  CURRENT_PAGE = page;
+  refreshHistory();
+}
+
+// Clear all filters
+function clearFilters() {
+  document.getElementById("search-input").value = "";
+  document.getElementById("start-date").value = "";
+  document.getElementById("end-date").value = "";
+
+  CURRENT_FILTERS = {
+    order_number: "",
+    start_date: "",
+    end_date: "",
+    status: "",
+  };
+  CURRENT_PAGE = 1;
+  refreshHistory();
+}
+
+// Display pagination controls
+function displayPagination(pagination) {
+  const paginationDiv = document.getElementById("pagination-controls");
+  if (!paginationDiv) return;
+
+  if (pagination.total_pages <= 1) {
+    paginationDiv.innerHTML = "";
+    return;
+  }
+
+  let paginationHTML = `
+    <nav class="pagination" role="navigation" aria-label="pagination">
+      <button class="pagination-previous button" 
+        ${!pagination.has_prev ? "disabled" : ""} 
+        onclick="changePage(${pagination.page - 1})">
+        Previous
+      </button>
+      <button class="pagination-next button" 
+        ${!pagination.has_next ? "disabled" : ""} 
+        onclick="changePage(${pagination.page + 1})">
+        Next
+      </button>
+      <ul class="pagination-list">
+  `;
+
+  // Always show first page
+  paginationHTML += `
+    <li>
+      <button class="pagination-link button ${
+        pagination.page === 1 ? "is-current" : ""
+      }" 
+        onclick="changePage(1)">1</button>
+    </li>
+  `;
+
+  // Show ellipsis if needed
+  if (pagination.page > 3) {
+    paginationHTML += `<li><span class="pagination-ellipsis">&hellip;</span></li>`;
+  }
+
+  // Show pages around current page
+  for (
+    let i = Math.max(2, pagination.page - 1);
+    i <= Math.min(pagination.total_pages - 1, pagination.page + 1);
+    i++
+  ) {
+    paginationHTML += `
+      <li>
+        <button class="pagination-link button ${
+          pagination.page === i ? "is-current" : ""
+        }" 
+          onclick="changePage(${i})">${i}</button>
+      </li>
+    `;
+  }
+
+  // Show ellipsis if needed
+  if (pagination.page < pagination.total_pages - 2) {
+    paginationHTML += `<li><span class="pagination-ellipsis">&hellip;</span></li>`;
+  }
+
+  // Always show last page (if more than 1 page)
+  if (pagination.total_pages > 1) {
+    paginationHTML += `
+      <li>
+        <button class="pagination-link button ${
+          pagination.page === pagination.total_pages ? "is-current" : ""
+        }" 
+          onclick="changePage(${pagination.total_pages})">${
+      pagination.total_pages
+    }</button>
+      </li>
+    `;
+  }
+
+  paginationHTML += `
+      </ul>
+    </nav>
+    <p class="has-text-centered mt-2">
+      Page ${pagination.page} of ${pagination.total_pages} 
+      (${pagination.total_records} total records)
+    </p>
+  `;
+
+  paginationDiv.innerHTML = paginationHTML;
+}
+
+// Main function to load history data
+async function refreshHistory() {
+  const loadingDiv = document.getElementById("history-loading");
+  const tableBody = document.getElementById("history-table-body");
+
+  loadingDiv.style.display = "block";
+
+  try {
+    const params = buildQueryParams(CURRENT_PAGE, CURRENT_FILTERS);
+    const response = await fetch(`/api/history?${params}`);
+    const data = await response.json();
+
+    if (data.status === "success" && data.jobs) {
+      CURRENT_HISTORY = data.jobs;
+
+      if (data.jobs.length === 0) {
+        tableBody.innerHTML = `
+          <tr>
+            <td colspan="8" class="has-text-centered">No jobs found</td>
+          </tr>
+        `;
+      } else {
+        tableBody.innerHTML = data.jobs
+          .map(
+            (job) => `
+          <tr class="jobrow jobrow-${job.status}" is-sizer-6>
+            <td>
+              <!-- select job checkbox -->
+              <input type="checkbox" 
+                id="select-${job.job_id}" 
+                name="select-job" 
+                value="${job.job_id}" />
+            </td>
+            <td>${job.distribution_center || "-"}</td>
+            <td>${job.order_number || "-"}</td>
+            <td><span class="status-badge status-${job.status}">${
+              job.status
+            }</span></td>
+            <td>${formatDate(job.requested_at)}</td>
+            <td>${
+              job.completed_at ? formatDate(job.completed_at) : "-"
+            }</td>
+            <td>${job.result_message || "-"}</td>
+          </tr>
+        `
+          )
+          .join("");
+      }
+
+      // Display pagination controls
+      if (data.pagination) {
+        displayPagination(data.pagination);
+      }
+    } else {
+      tableBody.innerHTML = `
+        <tr>
+          <td colspan="8" class="has-text-centered has-text-danger">
+            Error loading history
+          </td>
+        </tr>
+      `;
+    }
+  } catch (error) {
+    tableBody.innerHTML = `
+      <tr>
+        <td colspan="8" class="has-text-centered has-text-danger">
+          Error: ${error.message}
+        </td>
+      </tr>
+    `;
+  } finally {
+    loadingDiv.style.display = "none";
+  }
+}
+
+function loadDcLocations(inputId) {
+  const dcSelects = document.querySelectorAll(`select#${inputId}`);
+  const sortedKeys = Object.keys(DcLocations).sort();
+
+  dcSelects.forEach((select) => {
+    for (const code of sortedKeys) {
+      const name = DcLocations[code];
+      const option = document.createElement("option");
+      option.value = code;
+      option.textContent = `${code} - ${name}`;
+      select.appendChild(option);
+    }
+  });
+}
+
+function exportSelectedJobs() {
+  const selectedJobIds = Array.from(
+    document.querySelectorAll('input[name="select-job"]:checked')
+  ).map((checkbox) => checkbox.value);
+
+  if (selectedJobIds.length === 0) {
+    // use all jobs if none selected
+    CURRENT_HISTORY.forEach((job) => {
+      selectedJobIds.push(job.job_id);
+    });
+  }
+
+  // Create CSV content
+  let csvContent = "data:text/csv;charset=utf-8,";
+
+  // get headers from keys of first job
+  let firstJob = CURRENT_HISTORY[0];
+  let headers = [];
+  for (const key in firstJob) {
+    headers.push(key);
+  }
+
+  csvContent += headers.join(",") + "\n";
+
+  selectedJobIds.forEach((jobId) => {
+    const job = CURRENT_HISTORY.find((j) => j.job_id === jobId);
+    if (job) {
+      let row = [];
+      headers.forEach((header) => {
+        let value = job[header];
+        // escape quotes
+        if (typeof value === "string") {
+          value = value.replace(/"/g, '""');
+          // wrap in quotes if contains comma
+          if (value.indexOf(",") !== -1) {
+            value = `"${value}"`;
+          }
+        }
+        row.push(value);
+      });
+      csvContent += row.join(",") + "\n";
+    }
+  });
+
+  // Create download link and trigger download
+  const encodedUri = encodeURI(csvContent);
+  const link = document.createElement("a");
+  link.setAttribute("href", encodedUri);
+  link.setAttribute("download", "exported_jobs.csv");
+  document.body.appendChild(link);
+  link.click();
+  document.body.removeChild(link);
+}
+
+async function refreshPendingJobsStatus() {
+  let pendingJobRows = document.querySelectorAll(".jobrow");
+  let jobIds = Array.from(pendingJobRows).map((row) => {
+    let returnStatus = row.dataset.status;
+    const skipStatuses = ["success", "failed", "complete", "canceled"];
+    if (skipStatuses.includes(returnStatus)) {
+      return null;
+    }
+    return row.id.replace("jobrow-", "");
+  });
+
+  jobIds = jobIds.filter((id) => id !== null);
+
+  if (jobIds.length === 0) {
+    return;
+  }
+
+  document.getElementById("loading-indicator").style.display =
+    "inline-block";
+
+  fetch("/api/jobstatuses", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({ job_ids: jobIds }),
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      displayHostStatus(data.host);
+      const job_ids = Object.keys(data.job_statuses);
+      job_ids.forEach((job_id) => {
+        const job = data.job_statuses[job_id];
+        const row = document.getElementById(`jobrow-${job_id}`);
+        if (row) {
+          row.dataset.status = job.status;
+
+          // set row class to blank, then add jobrow and jobrow-{status}
+          row.className = "";
+          row.classList.add("jobrow");
+          row.classList.add(`jobrow-${job.status}`);
+
+          const statusCell = row.querySelector("td:nth-child(5)");
+          const messageCell = row.querySelector("td:nth-child(6)");
+          const attemptsCell = row.querySelector("td:nth-child(7)");
+          statusCell.innerHTML = `
+            <span class="status-badge status-${job.status}">${job.status}</span>`;
+          messageCell.innerHTML = job.message || "-";
+          attemptsCell.innerHTML = job.send_attempts || 0;
+        }
+      });
+    })
+    .catch((error) => {
+      console.error("Error refreshing pending jobs status:", error);
+    })
+    .finally(() => {
+      setTimeout(() => {
+        refreshPendingJobsStatus();
+      }, RefreshIntervalMs);
+      document.getElementById("loading-indicator").style.display = "none";
+      updateRefreshTime();
+    });
+}
+
+function displayHostStatus(host) {
+  if (!host) return;
+  let text = `${host.breaker_state} &middot; ${host.active_sessions}/${host.max_sessions} sessions`;
+  if (host.breaker_state === "open" && host.open_until) {
+    text += ` &middot; retrying at ${formatDate(host.open_until)}`;
+  }
+  document.getElementById("host-status").innerHTML = `
+    <span class="status-badge status-host-${host.breaker_state}">${text}</span>`;
+}
+
+function updateRefreshTime() {
+  let currentTime = new Date();
+  document.getElementById(
+    "last-refresh-time"
+  ).textContent = `${currentTime.toLocaleTimeString()}`;
+}
+
+function loadCurrentJobs() {
+  fetch("/api/currentjobs")
+    .then((response) => response.json())
+    .then((data) => {
+      displayHostStatus(data.host);
+      const tableContainer = document.querySelector(
+        ".tab-content#currentjobs-tab .table-container"
+      );
+      if (data.jobs && data.jobs.length > 0) {
+        let tableHtml = `
+          <table class="table is-fullwidth is-striped is-hoverable">
+            <thead>
+              <tr>
+                <th>Job Type</th>
+                <th>DC</th>
+                <th>Order #</th>
+                <th>Requested At</th>
+                <th>Status</th>
+                <th>Result Message</th>
+                <th>Attempts</th>
+              </tr>
+            </thead>
+            <tbody>
+        `;
+        data.jobs.forEach((job) => {
+          let classNameSuffix = "jobrow-" + job.status;
+
+          tableHtml += `
+            <tr id="jobrow-${job.job_id}" data-status="${
+            job.status
+          }" class="jobrow ${classNameSuffix}">
+              <td>${job.job_type}</td>
+              <td>${job.distribution_center}</td>
+              <td>${job.order_number}</td>
+              <td>${formatDate(job.requested_at)}</td>
+              <td><span class="status-badge status-${job.status}">${
+            job.status
+          }</span>
+          </td>
+              <td>${job.result_message || "-"}</td>
+              <td class="send-attempts">${job.send_attempts || 0}</td>
+            </tr>
+          `;
+        });
+        tableHtml += `
+            </tbody>
+          </table>
+        `;
+        tableContainer.innerHTML = tableHtml;
+        setTimeout(() => {
+          refreshPendingJobsStatus();
+        }, RefreshIntervalMs);
+      } else {
+        tableContainer.innerHTML = `
+          <div class="notification">
+            No current jobs found.
+          </div>
+        `;
+      }
+      updateRefreshTime();
+    })
+    .catch((error) => {
+      console.error("Error fetching current jobs:", error);
+    });
+}
+
+function confirmSuccess(elementId, message) {
+  const resultDiv = document.getElementById(elementId);
+  resultDiv.innerHTML = `
+    <div class="notification is-success">
+      ${message}
+    </div>
+  `;
+}
+
+function confirmError(elementId, message) {
+  const resultDiv = document.getElementById(elementId);
+  resultDiv.innerHTML = `
+    <div class="notification is-danger">
+      ${message}
+    </div>
+  `;
+}
+
+// Reused until a submit succeeds, so double clicks and retries are not queued twice
+let BatchIdempotencyKey = null;
+
+function newIdempotencyKey() {
+  return `${Date.now().toString(36)}-${Math.random()
+    .toString(36)
+    .slice(2)}`;
+}
+
+function precheckBatchOrders() {
+  const dc = document.getElementById("batch-dc").value;
+  const orders = document.getElementById("batch-orders").value;
+
+  if (!dc || !orders) {
+    confirmError(
+      "batch-result",
+      "Select a DC and enter order numbers to pre-check."
+    );
+    return;
+  }
+
+  fetch("/api/orders/validate", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      distribution_center: dc,
+      order_numbers: orders,
+    }),
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      if (data.status !== "success") {
+        confirmError("batch-result", data.message);
+        return;
+      }
+      const results = Object.entries(data.orders);
+      const notOnFile = results
+        .filter(([, order]) => order.status === "not_on_file")
+        .map(([orderNumber]) => orderNumber);
+      const found = results.filter(
+        ([, order]) => order.status === "found"
+      ).length;
+      const unknown = results.length - found - notOnFile.length;
+
+      let message = `${found} found, ${unknown} not yet looked up`;
+      if (notOnFile.length > 0) {
+        message += `, not on file: ${notOnFile.join(", ")}`;
+        confirmError("batch-result", message);
+      } else {
+        confirmSuccess("batch-result", message);
+      }
+    })
+    .catch((error) => {
+      confirmError("batch-result", "Error pre-checking orders: " + error.message);
+    });
+}
+
+function submitBatchReset() {
+  const submitButton = document.getElementById("BatchResetButton");
+
+  submitButton.classList.add("is-loading");
+
+  const dc = document.getElementById("batch-dc").value;
+  const ticketNumber = document.getElementById(
+    "batch-ticket-number"
+  ).value;
+  const orders = document.getElementById("batch-orders").value;
+
+  if (!dc || !ticketNumber || !orders) {
+    confirmError(
+      "batch-result",
+      "Please fill in all required fields before submitting."
+    );
+    submitButton.classList.remove("is-loading");
+    return;
+  }
+
+  if (!BatchIdempotencyKey) {
+    BatchIdempotencyKey = newIdempotencyKey();
+  }
+
+  // POST to /api/reset with JSON body
+  fetch("/api/reset", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "Idempotency-Key": BatchIdempotencyKey,
+    },
+    body: JSON.stringify({
+      order_number: orders,
+      distribution_center: dc,
+      ticket_number: ticketNumber,
+      job_type: "Reset Batch Order",
+    }),
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      console.log("Batch Reset Response:", data);
+      if (data.status === "error") {
+        confirmError("batch-result", data.message);
+        return;
+      }
+      BatchIdempotencyKey = null;
+      confirmSuccess(
+        "batch-result",
+        `Reset request submitted successfully. ${data.message || ""}`
+      );
+      setTimeout(() => {
+        setActiveTab("currentjobs");
+      }, 1200);
+    })
+    .catch((error) => {
+      console.error("Error submitting batch reset:", error);
+      confirmError(
+        "batch-result",
+        "Error submitting batch reset: " + error.message
+      );
+    })
+    .finally(() => {
+      submitButton.classList.remove("is-loading");
+    });
+}
+
+function submitUpload() {
+  const uploadButton = document.getElementById("UploadButton");
+  const file = document.getElementById("upload-file").files[0];
+
+  if (!file) {
+    confirmError("upload-result", "Choose a CSV file to upload.");
+    return;
+  }
+
+  const formData = new FormData();
+  formData.append("file", file);
+  formData.append("distribution_center", document.getElementById("upload-dc").value);
+  formData.append(
+    "ticket_number",
+    document.getElementById("upload-ticket-number").value
+  );
+
+  uploadButton.classList.add("is-loading");
+
+  fetch("/api/reset/upload", {
+    method: "POST",
+    body: formData,
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      if (data.status === "error") {
+        confirmError("upload-result", data.message);
+        return;
+      }
+      let message = data.message;
+      if (data.errors && data.errors.length > 0) {
+        message += "<br>" + data.errors
+          .slice(0, 10)
+          .map((e) => `Line ${e.line}: ${e.error}`)
+          .join("<br>");
+      }
+      confirmSuccess("upload-result", message);
+      if (data.queued > 0) {
+        watchBatchProgress(data.batch_id, "upload-progress");
+      }
+    })
+    .catch((error) => {
+      confirmError("upload-result", "Error uploading file: " + error.message);
+    })
+    .finally(() => {
+      uploadButton.classList.remove("is-loading");
+    });
+}
+
+let BatchProgressTimer = null;
+
+function formatEta(seconds) {
+  if (seconds === null || seconds === undefined) {
+    return "calculating";
+  }
+  const minutes = Math.floor(seconds / 60);
+  return minutes > 0 ? `${minutes}m ${seconds % 60}s` : `${seconds}s`;
+}
+
+function watchBatchProgress(batchId, elementId) {
+  clearTimeout(BatchProgressTimer);
+  fetch(`/api/batches/${batchId}`)
+    .then((response) => response.json())
+    .then((data) => {
+      if (data.status !== "success") {
+        return;
+      }
+      const batch = data.batch;
+      const throughput =
+        batch.throughput_per_minute !== null
+          ? `${batch.throughput_per_minute}/min`
+          : "-";
+      document.getElementById(elementId).innerHTML = `
+        <progress class="progress is-primary" value="${batch.completed}" max="${batch.total}">
+          ${batch.percent_complete}%
+        </progress>
+        <p class="is-size-7">
+          ${batch.completed} of ${batch.total} done (${batch.success} succeeded, ${batch.failed} failed),
+          ${batch.pending} pending, ${batch.processing} processing.
+          Throughput ${throughput}, ETA ${batch.done ? "done" : formatEta(batch.eta_seconds)}
+        </p>
+      `;
+      if (!batch.done) {
+        BatchProgressTimer = setTimeout(() => {
+          watchBatchProgress(batchId, elementId);
+        }, RefreshIntervalMs);
+      }
+    })
+    .catch((error) => {
+      console.error("Error fetching batch progress:", error);
+    });
+}
+
+document
+  .getElementById("upload-form")
+  .addEventListener("submit", (e) => {
+    e.preventDefault();
+    submitUpload();
+  });
+
+// Tab switching
+document.querySelectorAll(".tabs li").forEach((tab) => {
+  tab.addEventListener("click", () => {
+    const targetTab = tab.dataset.tab;
+
+    // Update active tab
+    document.querySelectorAll(".tabs li").forEach((t) => {
+      t.classList.remove("is-active");
+    });
+    tab.classList.add("is-active");
+
+    // Update active content
+    document.querySelectorAll(".tab-content").forEach((content) => {
+      content.classList.remove("is-active");
+    });
+    document
+      .getElementById(`${targetTab}-tab`)
+      .classList.add("is-active");
+
+    // Refresh  when switching to history tab
+    if (targetTab === "history") {
+      refreshHistory();
+    }
+
+    if (targetTab === "currentjobs") {
+      loadCurrentJobs();
+    }
+
+    if (targetTab === "analytics") {
+      loadAnalytics();
+    }
+  });
+});
+
+function setActiveTab(tabName) {
+  document.querySelectorAll(".tabs li").forEach((t) => {
+    t.classList.remove("is-active");
+    if (t.dataset.tab === tabName) {
+      t.classList.add("is-active");
+    }
+  });
+  document.querySelectorAll(".tab-content").forEach((content) => {
+    content.classList.remove("is-active");
+  });
+  document.getElementById(`${tabName}-tab`).classList.add("is-active");
+
+  if (tabName === "history") {
+    refreshHistory();
+  }
+  if (tabName === "currentjobs") {
+    loadCurrentJobs();
+  }
+  if (tabName === "analytics") {
+    loadAnalytics();
+  }
+}
+
+function formatSeconds(seconds) {
+  return seconds === null || seconds === undefined ? "-" : `${seconds}s`;
+}
+
+function formatRate(value, suffix = "") {
+  return value === null || value === undefined ? "-" : `${value}${suffix}`;
+}
+
+function loadAnalytics() {
+  const hours = document.getElementById("analytics-hours").value;
+  fetch(`/api/analytics?hours=${hours}`)
+    .then((response) => response.json())
+    .then((data) => {
+      if (data.status !== "success") {
+        confirmError("analytics-totals", data.message);
+        return;
+      }
+      const stats = data.analytics;
+      const totals = stats.totals;
+      document.getElementById("analytics-rolled-up-to").textContent =
+        `Rolled up to ${formatDate(stats.rolled_up_to)}`;
+      document.getElementById("analytics-totals").innerHTML = `
+        <div class="notification">
+          <strong>${totals.jobs}</strong> jobs,
+          <strong>${formatRate(totals.success_rate, "%")}</strong> success,
+          <strong>${formatRate(totals.orders_per_hour)}</strong> orders/hour,
+          <strong>${formatRate(totals.retries_per_job)}</strong> retries/job,
+          queue wait avg <strong>${formatSeconds(totals.wait_seconds.avg)}</strong>,
+          execution p50 / p95 <strong>${formatSeconds(totals.exec_seconds.p50)}
+          / ${formatSeconds(totals.exec_seconds.p95)}</strong>
+        </div>
+      `;
+
+      const tableBody = document.getElementById("analytics-table-body");
+      if (stats.by_group.length === 0) {
+        tableBody.innerHTML = `
+          <tr>
+            <td colspan="8" class="has-text-centered">No completed jobs in this period</td>
+          </tr>
+        `;
+        return;
+      }
+      tableBody.innerHTML = stats.by_group
+        .map(
+          (group) => `
+          <tr>
+            <td>${group.distribution_center}</td>
+            <td>${group.job_type}</td>
+            <td>${group.jobs}</td>
+            <td>${formatRate(group.success_rate, "%")}</td>
+            <td>${formatRate(group.retries_per_job)}</td>
+            <td>${formatRate(group.orders_per_hour)}</td>
+            <td>${formatSeconds(group.wait_seconds.p50)} / ${formatSeconds(group.wait_seconds.p95)}</td>
+            <td>${formatSeconds(group.exec_seconds.p50)} / ${formatSeconds(group.exec_seconds.p95)}
+              / ${formatSeconds(group.exec_seconds.p99)}</td>
+          </tr>
+        `
+        )
+        .join("");
+    })
+    .catch((error) => {
+      console.error("Error fetching analytics:", error);
+    });
+}
+
+function formatDate(dateString) {
+  if (!dateString) return "-";
+
+  const utcDate = new Date(dateString);
+  const localDate = new Date(
+    utcDate.getTime() - utcDate.getTimezoneOffset() * 60000
+  );
+  const timezoneAbbr =
+    new Intl.DateTimeFormat("en-US", {
+      timeZoneName: "short",
+    })
+      .formatToParts(localDate)
+      .find((part) => part.type === "timeZoneName")?.value || "";
+  return localDate.toLocaleString() + ` ${timezoneAbbr}`;
+}
+
+// Batch order form submission
+document
+  .getElementById("batch-form")
+  .addEventListener("submit", async (e) => {
+    e.preventDefault();
+    const resultDiv = document.getElementById("batch-result");
+    resultDiv.innerHTML = "";
+    submitBatchReset();
+  });
+
+//select-all-jobs
+document
+  .getElementById("select-all-jobs")
+  .addEventListener("change", (e) => {
+    const isChecked = e.target.checked;
+    document
+      .querySelectorAll('input[name="select-job"]')
+      .forEach((checkbox) => {
+        checkbox.checked = isChecked;
+      });
+  });
+
+setLoggedInAs();
+loadDcLocations("batch-dc");
+loadDcLocations("single-dc");
+loadDcLocations("upload-dc");
+loadCurrentJobs();
@@ -0,0 +1,59 @@
+"""
+Session cache tests, run against the SQLite job store:
+
+    cd app && python -m pytest -q tests
+"""
+
+import json
+import logging
+import os
+import sys
+
+import pexpect
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def job_store(tmp_path, monkeypatch):
+    credentials = tmp_path / 'credentials.json'
+    credentials.write_text(json.dumps([{'name': 'auto1', 'username': 'u1', 'max_sessions': 1}]))
+    monkeypatch.setenv('RW_DB_BACKEND', 'sqlite')
+    monkeypatch.setenv('RW_SQLITE_PATH', str(tmp_path / 'rwautomator.db'))
+    monkeypatch.setenv('RW_CREDENTIALS_FILE', str(credentials))
+    monkeypatch.setenv('RW_HOST', '127.0.0.1')
+    monkeypatch.setenv('RW_MAX_SESSIONS', '2')
+
+def lease_count():
+    from lib.db import get_connection
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM RwAutomator_HostSession")
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def test_login_timeout_returns_the_lease(job_store, monkeypatch):
+    from lib import sessions
+
+    closed = []
+
+    def timed_out_open(self, distribution_center):
+        self.child = object()  # Stands in for the spawned telnet child
+        raise pexpect.TIMEOUT('Timeout waiting for login:')
+
+    monkeypatch.setattr(sessions.RealWorldSession, 'open', timed_out_open)
+    monkeypatch.setattr(sessions.RealWorldSession, 'close', lambda self: closed.append(self.child))
+
+    cache = sessions.SessionCache(owner='worker:1')
+    credential, denial = cache.reserve('00', 'job-1')
+    assert credential == 'auto1' and denial is None
+    assert lease_count() == 1
+
+    with pytest.raises(pexpect.TIMEOUT):
+        cache.checkout('00', logging.getLogger('test'))
+
+    assert lease_count() == 0
+    assert len(closed) == 1
+    assert cache.reserve('00', 'job-2') == ('auto1', None)
@@ -1,50 +1,95 @@
+import os
 import time
 import sys
 sys.path.insert(0, '/app')
-from lib.db import get_pending_jobs 
-import subprocess
+from lib.db import get_queued_jobs, update_job_status
+from lib.scheduler import next_job, releasable_jobs, is_deferrable, get_blackout_windows, ReleaseThrottle
+from lib.host_guard import host_accepting_sessions, release_job_sessions
+from lib.jobs import JOB_TYPES, DEFERRED, job_kind, failure_message
+from lib.executor import ExecutorPool
+from lib.watchdog import get_watchdog_settings, register_worker, heartbeat, recover_stale_jobs
+from lib.analytics import get_analytics_settings, refresh_rollups
 
 print("Worker started, watching for pending jobs in database...")
 
+# Fail on a malformed RW_BLACKOUT_WINDOWS now; in the loop bad entries are skipped
+get_blackout_windows(strict=True)
+settings = get_watchdog_settings()
+analytics_settings = get_analytics_settings()
+concurrency = int(os.getenv('RW_WORKER_CONCURRENCY', '1'))
+worker_id = register_worker(concurrency)
+pool = ExecutorPool(size=concurrency, worker_id=worker_id)
+throttle = ReleaseThrottle()
+print(f"Registered worker {worker_id} with {pool.size} warm executor(s)")
+
+poll_wait = 0
+last_heartbeat = 0
+last_watchdog = 0
+last_rollup = 0
+
 while True:
     try:
-        pending_jobs = get_pending_jobs()
-        
-        for job in pending_jobs:
-            job_id = job['job_id']
-            job_type = job['job_type']
-            order_number = job['order_number']
-            dc = job['distribution_center']
-            current_status = job['status']
-            
-            if current_status == 'processing':
-                print(f"Skipping job {job_id} as it is already processing")
-                continue  
-            
-            print(f"Processing job: {job_id} ({job_type})")
-            
-            # Execute the job
-            reset_order_job_types = ['reset_order', 'ResetOrder', 'Reset Single Order', 'Reset Batch Order']
-            
-            if job_type in reset_order_job_types:
-                print(f"Attempt to reset order: {order_number} at DC: {dc}")
-                result = subprocess.run(
-                    ['python3', '/app/rw_automate.py', 'resetOrder', order_number, dc, job_id],
-                    capture_output=True,
-                    text=True
-                )
-                
-                print(f"Subprocess completed for job {job_id} with return code {result.returncode}")
-                
-                success = result.returncode == 0
-                output_message = result.stdout.strip()
-                
-                print(f"Job {job_id} {'completed' if success else 'failed'}")
-                print(f"Output: {output_message}")
-                
-
-        time.sleep(3)  # Poll every X seconds
+        # Pick up finished jobs, waiting up to poll_wait seconds for one
+        results = pool.collect(timeout=poll_wait)
+        results += pool.kill_overdue(settings['job_timeout_seconds'])
+
+        for result in results:
+            job_id = result['job_id']
+            if result.get('crashed') or result.get('timed_out'):
+                # The executor never got to record an outcome
+                update_job_status(job_id, 'error', failure_message(result['job_type'], result['message']))
+                release_job_sessions(job_id, result['message'], result.get('owner'))
+            if result['outcome'] == DEFERRED:
+                print(f"Job {job_id} deferred by host guard: {result['message']}")
+            else:
+                print(f"Job {job_id} {result['outcome']}: {result['message']}")
+
+        now = time.time()
+        if now - last_heartbeat >= settings['heartbeat_seconds']:
+            heartbeat(worker_id, len(pool.busy_job_ids()), pool.jobs_completed)
+            last_heartbeat = now
+
+        if now - last_watchdog >= settings['watchdog_seconds']:
+            for job_id in recover_stale_jobs():
+                print(f"Watchdog returned stale job {job_id} to the queue")
+            last_watchdog = now
+
+        if now - last_rollup >= analytics_settings['rollup_seconds']:
+            try:
+                refresh_rollups()
+            except Exception as e:
+                print(f"Analytics rollup error: {e}")
+            last_rollup = now
+
+        poll_wait = 3  # Poll every X seconds unless a job gets dispatched
+
+        if not pool.idle_executor():
+            continue
+
+        # Re-read the queue before every job so newly submitted urgent or
+        # single-order resets are not stuck behind the rest of a large batch
+        queued_jobs = releasable_jobs([j for j in get_queued_jobs() if j['job_type'] in JOB_TYPES])
+        if not throttle.allows():
+            # Deferred work ramps up at RW_DEFERRED_RELEASE_PER_MINUTE; single resets still go
+            queued_jobs = [j for j in queued_jobs if not is_deferrable(j)]
+        job = next_job(queued_jobs, exclude_job_ids=pool.busy_job_ids(), warm_dcs=pool.idle_session_dcs())
+
+        if not job:
+            continue
+
+        # Fail fast while the RealWorld host circuit is open instead of
+        # spawning telnet sessions that can only time out
+        if not host_accepting_sessions():
+            print("RealWorld host circuit open, holding queued jobs")
+            continue
+
+        print(f"Processing job: {job['job_id']} ({job['job_type']}, priority {job['priority']}, user {job['rw_user']})")
+        print(f"Attempt to {job_kind(job['job_type'])} order: {job['order_number']} at DC: {job['distribution_center']}")
+        pool.submit(job)
+        if is_deferrable(job):
+            throttle.record()
+        poll_wait = 0
 
     except Exception as e:
         print(f"Worker error: {e}")
-        time.sleep(5)
\ No newline at end of file
+        time.sleep(5)
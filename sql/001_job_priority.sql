@@ -0,0 +1,13 @@
+-- Priority class used by the worker scheduler (lib/scheduler.py)
+-- 0 = urgent, 1 = single order, 2 = batch
+ALTER TABLE RwAutomator_Log ADD priority TINYINT NOT NULL
+    CONSTRAINT DF_RwAutomator_Log_priority DEFAULT 1;
+GO
+
+UPDATE RwAutomator_Log SET priority = 2 WHERE job_type LIKE '%Batch%';
+GO
+
+CREATE INDEX IX_RwAutomator_Log_queue
+    ON RwAutomator_Log (status, priority, requested_at)
+    INCLUDE (job_type, order_number, distribution_center, rw_user, ticket_number);
+GO
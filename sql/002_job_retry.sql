@@ -0,0 +1,5 @@
+-- Retry policy (lib/retry.py): when an errored job may run again and why it failed
+ALTER TABLE RwAutomator_Log ADD
+    next_attempt_at DATETIME NULL,
+    failure_class VARCHAR(20) NULL;
+GO
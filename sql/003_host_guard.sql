@@ -0,0 +1,24 @@
+-- Circuit breaker and login token bucket per RealWorld host (lib/host_guard.py)
+CREATE TABLE RwAutomator_HostState (
+    host VARCHAR(100) NOT NULL PRIMARY KEY,
+    breaker_state VARCHAR(10) NOT NULL DEFAULT 'closed',
+    consecutive_failures INT NOT NULL DEFAULT 0,
+    opened_at DATETIME NULL,
+    open_until DATETIME NULL,
+    login_tokens FLOAT NOT NULL DEFAULT 0,
+    tokens_updated_at DATETIME NULL,
+    updated_at DATETIME NOT NULL DEFAULT GETDATE()
+);
+GO
+
+-- One leased row per open telnet session, expired after RW_SESSION_LEASE_SECONDS
+CREATE TABLE RwAutomator_HostSession (
+    session_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    host VARCHAR(100) NOT NULL,
+    job_id VARCHAR(36) NULL,
+    leased_at DATETIME NOT NULL DEFAULT GETDATE()
+);
+GO
+
+CREATE INDEX IX_RwAutomator_HostSession_host ON RwAutomator_HostSession (host, leased_at);
+GO
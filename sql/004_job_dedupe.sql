@@ -0,0 +1,24 @@
+-- In-flight deduplication and client idempotency keys for /api/reset
+ALTER TABLE RwAutomator_Log ADD
+    dedupe_key VARCHAR(100) NULL,
+    idempotency_key VARCHAR(200) NULL;
+GO
+
+-- Key the oldest in-flight job per order; later duplicates keep running without one
+WITH inflight AS (
+    SELECT dedupe_key, distribution_center, order_number,
+           ROW_NUMBER() OVER (PARTITION BY distribution_center, order_number ORDER BY requested_at) AS rn
+    FROM RwAutomator_Log
+    WHERE status NOT IN ('success', 'failed')
+)
+UPDATE inflight SET dedupe_key = 'reset:' + distribution_center + ':' + order_number WHERE rn = 1;
+GO
+
+-- dedupe_key is cleared when a job reaches success/failed
+CREATE UNIQUE INDEX UX_RwAutomator_Log_dedupe_key
+    ON RwAutomator_Log (dedupe_key) WHERE dedupe_key IS NOT NULL;
+GO
+
+CREATE UNIQUE INDEX UX_RwAutomator_Log_idempotency_key
+    ON RwAutomator_Log (idempotency_key) WHERE idempotency_key IS NOT NULL;
+GO
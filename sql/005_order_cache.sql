@@ -0,0 +1,10 @@
+-- Ship total / "Order not on file" lookup cache (lib/order_cache.py)
+CREATE TABLE RwAutomator_OrderCache (
+    distribution_center VARCHAR(10) NOT NULL,
+    order_number VARCHAR(50) NOT NULL,
+    not_on_file BIT NOT NULL DEFAULT 0,
+    ship_total VARCHAR(20) NULL,
+    cached_at DATETIME NOT NULL DEFAULT GETDATE(),
+    CONSTRAINT PK_RwAutomator_OrderCache PRIMARY KEY (distribution_center, order_number)
+);
+GO
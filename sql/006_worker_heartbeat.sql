@@ -0,0 +1,20 @@
+-- Worker registration and heartbeats (lib/watchdog.py)
+CREATE TABLE RwAutomator_Worker (
+    worker_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    hostname VARCHAR(100) NULL,
+    pid INT NULL,
+    concurrency INT NOT NULL DEFAULT 1,
+    jobs_running INT NOT NULL DEFAULT 0,
+    jobs_completed INT NOT NULL DEFAULT 0,
+    started_at DATETIME NOT NULL DEFAULT GETDATE(),
+    heartbeat_at DATETIME NOT NULL DEFAULT GETDATE()
+);
+GO
+
+-- Which worker claimed a 'processing' job
+ALTER TABLE RwAutomator_Log ADD worker_id VARCHAR(36) NULL;
+GO
+
+CREATE INDEX IX_RwAutomator_Log_processing
+    ON RwAutomator_Log (status, started_at) INCLUDE (worker_id);
+GO
@@ -0,0 +1,7 @@
+-- Step-level checkpoints of the reset workflow (lib/processes/reset_order.py)
+-- checkpoint_step: ship_total_captured, reset_submitted or reset_completed
+ALTER TABLE RwAutomator_Log ADD
+    checkpoint_step VARCHAR(30) NULL,
+    checkpoint_ship_total VARCHAR(20) NULL,
+    checkpoint_at DATETIME NULL;
+GO
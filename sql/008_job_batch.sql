@@ -0,0 +1,6 @@
+-- Jobs created by one batch submission or CSV upload share a batch_id
+ALTER TABLE RwAutomator_Log ADD batch_id VARCHAR(36) NULL;
+GO
+
+CREATE INDEX IX_RwAutomator_Log_batch_id ON RwAutomator_Log (batch_id) WHERE batch_id IS NOT NULL;
+GO
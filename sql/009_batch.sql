@@ -0,0 +1,19 @@
+-- One row per batch submission or CSV upload, with job counters kept
+-- up to date by update_job_status (lib/db.py) so progress never needs a GROUP BY
+CREATE TABLE RwAutomator_Batch (
+    batch_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    job_type VARCHAR(50) NULL,
+    distribution_center VARCHAR(10) NULL,
+    rw_user VARCHAR(100) NULL,
+    ticket_number VARCHAR(50) NULL,
+    total INT NOT NULL DEFAULT 0,
+    pending INT NOT NULL DEFAULT 0,
+    processing INT NOT NULL DEFAULT 0,
+    success INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL DEFAULT GETDATE(),
+    first_started_at DATETIME NULL,
+    last_completed_at DATETIME NULL,
+    updated_at DATETIME NOT NULL DEFAULT GETDATE()
+);
+GO
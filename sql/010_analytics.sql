@@ -0,0 +1,29 @@
+-- Hourly throughput/latency rollups per DC and job type (lib/analytics.py).
+-- Histograms are comma separated bucket counts, bounds defined in lib/analytics.py
+CREATE TABLE RwAutomator_HourlyStats (
+    hour_start DATETIME NOT NULL,
+    distribution_center VARCHAR(10) NOT NULL,
+    job_type VARCHAR(50) NOT NULL,
+    jobs INT NOT NULL DEFAULT 0,
+    succeeded INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    wait_seconds_sum BIGINT NOT NULL DEFAULT 0,
+    exec_seconds_sum BIGINT NOT NULL DEFAULT 0,
+    wait_histogram VARCHAR(200) NOT NULL DEFAULT '',
+    exec_histogram VARCHAR(200) NOT NULL DEFAULT '',
+    CONSTRAINT PK_RwAutomator_HourlyStats PRIMARY KEY (hour_start, distribution_center, job_type)
+);
+GO
+
+-- How far the rollups have been brought up to date
+CREATE TABLE RwAutomator_RollupState (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    rolled_up_to DATETIME NOT NULL
+);
+GO
+
+CREATE INDEX IX_RwAutomator_Log_completed_at
+    ON RwAutomator_Log (completed_at)
+    INCLUDE (status, distribution_center, job_type, requested_at, started_at, send_attempts);
+GO
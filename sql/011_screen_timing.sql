@@ -0,0 +1,14 @@
+-- Observed RealWorld response times per host, DC and screen step (lib/timing.py).
+-- histogram holds decayed bucket weights, bounds defined in lib/timing.py;
+-- distribution_center is '' for steps before a company is entered
+CREATE TABLE RwAutomator_ScreenTiming (
+    host VARCHAR(100) NOT NULL,
+    distribution_center VARCHAR(10) NOT NULL,
+    step VARCHAR(60) NOT NULL,
+    histogram VARCHAR(400) NOT NULL DEFAULT '',
+    observations INT NOT NULL DEFAULT 0,
+    timeouts INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT GETDATE(),
+    CONSTRAINT PK_RwAutomator_ScreenTiming PRIMARY KEY (host, distribution_center, step)
+);
+GO
@@ -0,0 +1,14 @@
+-- Credential pool (lib/credentials.py): which credential each session lease runs under
+ALTER TABLE RwAutomator_HostSession ADD credential VARCHAR(50) NULL;
+GO
+-- Usage per credential and host
+CREATE TABLE RwAutomator_Credential (
+    host VARCHAR(100) NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    logins INT NOT NULL DEFAULT 0,
+    jobs INT NOT NULL DEFAULT 0,
+    failures INT NOT NULL DEFAULT 0,
+    last_used_at DATETIME NULL,
+    CONSTRAINT PK_RwAutomator_Credential PRIMARY KEY (host, name)
+);
+GO
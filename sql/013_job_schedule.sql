@@ -0,0 +1,5 @@
+-- Deferred and windowed jobs (lib/scheduler.py): earliest start and daily HH:MM-HH:MM window
+ALTER TABLE RwAutomator_Log ADD not_before DATETIME NULL;
+GO
+ALTER TABLE RwAutomator_Log ADD execution_window VARCHAR(11) NULL;
+GO
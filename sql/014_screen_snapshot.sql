@@ -0,0 +1,19 @@
+-- Screen snapshots (lib/snapshots.py): each distinct screen once, zlib compressed, keyed by SHA-256 of its text
+CREATE TABLE RwAutomator_Snapshot (
+    content_hash CHAR(64) NOT NULL,
+    content VARBINARY(MAX) NOT NULL,
+    length INT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT GETDATE(),
+    CONSTRAINT PK_RwAutomator_Snapshot PRIMARY KEY (content_hash)
+);
+GO
+-- Screens captured for each job, in capture order
+CREATE TABLE RwAutomator_JobSnapshot (
+    job_id VARCHAR(36) NOT NULL,
+    seq INT NOT NULL,
+    step VARCHAR(100) NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    captured_at DATETIME NOT NULL DEFAULT GETDATE(),
+    CONSTRAINT PK_RwAutomator_JobSnapshot PRIMARY KEY (job_id, seq)
+);
+GO
@@ -0,0 +1,3 @@
+-- Per-job profiling flag (lib/profiling.py)
+ALTER TABLE RwAutomator_Log ADD profile BIT NOT NULL DEFAULT 0;
+GO
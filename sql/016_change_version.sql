@@ -0,0 +1,21 @@
+-- Change versions for HTTP caching (interface.py): bumped by a trigger on every write to the job table
+CREATE TABLE RwAutomator_ChangeVersion (
+    name VARCHAR(50) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at DATETIME NOT NULL DEFAULT GETDATE(),
+    CONSTRAINT PK_RwAutomator_ChangeVersion PRIMARY KEY (name)
+);
+GO
+INSERT INTO RwAutomator_ChangeVersion (name, version, changed_at) VALUES ('jobs', 0, GETDATE());
+GO
+CREATE TRIGGER TR_RwAutomator_Log_ChangeVersion ON RwAutomator_Log
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    -- Keeps the row counts callers see from their own statement
+    SET NOCOUNT ON;
+    IF NOT EXISTS (SELECT 1 FROM inserted) AND NOT EXISTS (SELECT 1 FROM deleted)
+        RETURN;
+    UPDATE RwAutomator_ChangeVersion SET version = version + 1, changed_at = GETDATE() WHERE name = 'jobs';
+END
+GO
@@ -0,0 +1,11 @@
+-- Job table version for HTTP caching (interface.py), derived from the rows themselves: SQL Server bumps a
+-- row's rowversion on every insert and update, so MAX(row_version) moves with every write to the table
+-- without the writers sharing a counter row. Jobs are never deleted, so the maximum covers every change.
+DROP TRIGGER TR_RwAutomator_Log_ChangeVersion;
+GO
+DROP TABLE RwAutomator_ChangeVersion;
+GO
+ALTER TABLE RwAutomator_Log ADD row_version ROWVERSION NOT NULL;
+GO
+CREATE INDEX IX_RwAutomator_Log_row_version ON RwAutomator_Log (row_version);
+GO
@@ -0,0 +1,7 @@
+-- Session leases are held for as long as a telnet session is open, warm sessions between jobs included
+-- (lib/host_guard.py). The owner is the executor process holding the session, so the worker can
+-- release its leases when it kills the executor; job_id is NULL while the session is idle.
+ALTER TABLE RwAutomator_HostSession ADD owner VARCHAR(100) NULL;
+GO
+CREATE INDEX IX_RwAutomator_HostSession_owner ON RwAutomator_HostSession (owner);
+GO